@@ -0,0 +1,3 @@
+# benchmarks - 性能基准测试套件
+# 用法 (在仓库根目录下): python -m benchmarks [--quick] [--filter 名称] [--save-baseline]
+# 正确性检查 (不计时): python -m benchmarks --check [--quick] [--filter 名称]
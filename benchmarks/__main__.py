@@ -0,0 +1,51 @@
+# __main__.py - 基准测试命令行入口: python -m benchmarks
+
+import sys
+import argparse
+from benchmarks.runner import (run_benchmarks, run_checks, save_results, load_results, compare,
+                               DEFAULT_BASELINE, DEFAULT_OUTPUT)
+# 导入各模块以注册基准测试
+from benchmarks import bench_maze, bench_entities, bench_draw # noqa: F401
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="运行性能基准测试并与基线比较")
+    parser.add_argument("--quick", action="store_true", help="只运行较小的参数矩阵")
+    parser.add_argument("--filter", default=None, help="只运行名称包含该字符串的基准")
+    parser.add_argument("--repeat", type=int, default=5, help="每项重复计时的轮数")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="结果 JSON 的输出路径")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="基线 JSON 的路径")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为新的基线")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许的变慢比例，超过则视为回归")
+    parser.add_argument("--check", action="store_true", help="不计时，只运行正确性检查 (优化实现与参考实现的结果对比)")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        failures = run_checks(quick=args.quick, name_filter=args.filter)
+        if failures:
+            print(f"\n{len(failures)} 项检查失败")
+            return 1
+        print("\n所有检查通过")
+        return 0
+
+    results = run_benchmarks(quick=args.quick, name_filter=args.filter, repeat=args.repeat)
+    save_results(results, args.output)
+    print(f"\n结果已写入 {args.output}")
+
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    baseline = load_results(args.baseline)
+    if baseline is None:
+        print(f"找不到基线文件 {args.baseline}，跳过比较 (使用 --save-baseline 生成)")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} 项性能回归 (超过基线 {args.tolerance:.0%})")
+        return 1
+    print("\n没有性能回归")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
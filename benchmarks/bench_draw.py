@@ -0,0 +1,129 @@
+# bench_draw.py - 绘制的基准测试 (绘制到离屏 Surface，不需要窗口)
+
+import random
+import pygame as pg
+from benchmarks.runner import benchmark
+from settings import *
+from maze import Maze
+from enemy import Enemy
+from main import Game
+from utils import draw_text, text_cache
+
+# 绘制基准只用较小的迷宫：预渲染图层的像素数与网格面积成正比
+DRAW_GRID_SIZES = [(20, 18), (60, 54), (100, 100)]
+
+def draw_params(quick):
+    sizes = DRAW_GRID_SIZES[:2] if quick else DRAW_GRID_SIZES
+    return [{"grid": f"{w}x{h}"} for w, h in sizes]
+
+def make_maze_and_target(grid):
+    w, h = (int(v) for v in grid.split("x"))
+    random.seed(0)
+    maze = Maze(w, h)
+    target = pg.Surface((w * TILE_SIZE, h * TILE_SIZE))
+    return maze, target
+
+@benchmark("maze_bake", draw_params)
+def bench_maze_bake(params):
+    """首次绘制 (或网格改变后)：把整个迷宫渲染到预渲染图层并 blit。"""
+    maze, target = make_maze_and_target(params["grid"])
+
+    def setup():
+        maze.invalidate_surface()
+
+    def run():
+        maze.draw(target)
+
+    return setup, run
+
+@benchmark("maze_draw", draw_params)
+def bench_maze_draw(params):
+    """每帧绘制：blit 已缓存的迷宫图层。"""
+    maze, target = make_maze_and_target(params["grid"])
+    maze.draw(target) # 预先生成缓存
+
+    def run():
+        target.fill(COLOR_FLOOR)
+        maze.draw(target)
+
+    return None, run
+
+# 开始界面的文本 (与 Game.show_start_screen 相同的字号和颜色)
+START_SCREEN_TEXT = [
+    (GAME_TITLE, 64, COLOR_WHITE), ("方向键或WASD移动", 30, COLOR_WHITE), ("按住 Shift 加速", 30, COLOR_WHITE),
+    ("按 空格键 射击", 30, COLOR_WHITE), ("到达蓝色方块获胜", 30, COLOR_EXIT), ("躲避黄色方块", 30, COLOR_ENEMY),
+    ("按 Enter 开始游戏", 35, COLOR_WHITE), ("按 E 进入无尽模式", 24, COLOR_WHITE),
+]
+
+@benchmark("start_screen_text", lambda quick: [{"cache": "warm"}, {"cache": "cold"}])
+def bench_start_screen_text(params):
+    """开始界面一帧的全部 draw_text 调用；cold 表示每帧都清空渲染缓存 (相当于每次都调用 font.render)。"""
+    pg.font.init()
+    target = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    cold = params["cache"] == "cold"
+
+    def run():
+        if cold:
+            text_cache.clear()
+        for i, (text, size, color) in enumerate(START_SCREEN_TEXT):
+            draw_text(target, text, size, color, SCREEN_WIDTH / 2, 40 + i * 60)
+
+    return None, run
+
+def frame_params(quick):
+    counts = (5, 50) if quick else (5, 50, 200)
+    return [{"enemies": n, "mode": mode} for n in counts for mode in ("dirty", "full")]
+
+@benchmark("game_draw", frame_params)
+def bench_game_draw(params):
+    """
+    Game.draw 一帧 (普通迷宫，敌人每帧移动 1 像素，虚拟显示驱动)。
+    dirty：脏矩形刷新；full：整屏重绘并 flip。虚拟驱动的提交几乎不耗时，真实显示器上整屏 flip 的差距更大。
+    """
+    random.seed(0)
+    game = Game()
+    game.reset_game()
+    game.level_prefetcher.close() # 只绘制同一关，不需要后台预生成 (否则每组参数都留下一个工作线程)
+    game.enemies = [Enemy(*coord) for coord in game.maze.sample_floor_coords(params["enemies"])]
+    if params["mode"] == "full":
+        game.dirty_rects = None
+    frame = [0]
+
+    def run():
+        step = 1 if frame[0] % 2 == 0 else -1
+        frame[0] += 1
+        for enemy in game.enemies:
+            enemy.rect.x += step
+        game.draw()
+
+    return None, run
+
+def entity_draw_params(quick):
+    counts = (10, 1000) if quick else (10, 1000, 10000)
+    return [{"entities": n, "mode": mode} for n in counts for mode in ("primitives", "sprites")]
+
+@benchmark("entity_draw", entity_draw_params)
+def bench_entity_draw(params):
+    """
+    绘制 N 个敌人 (随机位置)。primitives：每个敌人两次圆角 pg.draw.rect (原来的做法)；
+    sprites：预渲染精灵 + 一次 Surface.blits。按每个实体计时。
+    """
+    if pg.display.get_surface() is None: # 精灵需要转换为显示格式 (虚拟显示驱动)
+        pg.display.init()
+        pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    target = pg.display.get_surface().copy()
+    rng = random.Random(0)
+    enemies = [Enemy(rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT)) for _ in range(params["entities"])]
+    count = len(enemies)
+
+    if params["mode"] == "primitives":
+        def run():
+            for enemy in enemies:
+                Enemy.paint(target, enemy.rect)
+            return count
+    else:
+        def run():
+            target.blits(Enemy.blit_sequence(enemies))
+            return count
+
+    return None, run
@@ -0,0 +1,384 @@
+# bench_entities.py - 玩家/敌人更新与碰撞检测的基准测试
+
+import math
+import random
+import pygame as pg
+from benchmarks.runner import benchmark, check, grid_params, grid_entity_params, parse_grid, ENTITY_COUNTS, QUICK_ENTITY_COUNTS
+from settings import *
+from utils import KeyState, vec
+from maze import Maze
+from endless_maze import EndlessMaze
+from flow_field import FlowField
+from main import Game
+from player import Player
+from enemy import Enemy
+from headless import random_input_script
+import projectile_system
+import enemy_system
+import sharded_sim
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def make_game(grid, num_enemies=0):
+    """创建一个无界面的 Game，使用指定尺寸的迷宫，玩家放在起点。"""
+    w, h = parse_grid(grid)
+    random.seed(0)
+    game = Game(headless=True)
+    game._select_projectile_storage() # 与开局时相同的射弹存储
+    game.maze = Maze(w, h)
+    start_x, start_y = game.maze.get_start_pixel_pos()
+    offset = (TILE_SIZE - int(TILE_SIZE * PLAYER_SIZE_FACTOR)) // 2
+    game.player = Player(game, start_x + offset, start_y + offset)
+    game.enemies = [Enemy(*game.maze.get_random_floor_coord()) for _ in range(num_enemies)]
+    game.game_state = "PLAYING"
+    return game
+
+def state_digest(game):
+    """一个 tick 之后的状态摘要：游戏状态、玩家位置、所有敌人的位置和按发射顺序排列的射弹中心。"""
+    if game.use_enemy_system:
+        enemies = game.enemies.xy[:game.enemies.count].tolist()
+    else:
+        enemies = [list(enemy.rect.topleft) for enemy in game.enemies]
+    projectiles = game.projectiles
+    if game.use_projectile_pool:
+        centers = [rect.center for _, rect in projectiles._scalar_rects(projectiles._live())]
+    else:
+        centers = [projectile.rect.center for projectile in projectiles]
+    return game.game_state, game.player.rect.topleft, enemies, centers
+
+DIGEST_FIELDS = ("游戏状态", "玩家位置", "敌人位置", "射弹位置")
+
+def play_trace(grid, num_enemies, seed, ticks, use_enemy_system=False, use_projectile_pool=False, volley=0):
+    """
+    按随机输入脚本 (经常射击) 逐 tick 推进一局 (Game.simulate)，记录每个 tick 之后的状态摘要。
+    敌人和射弹按指定的存储方式创建，敌人追踪玩家 (覆盖流场分支)；玩家死亡或离开本关时停止。
+    :param volley: 开局时在随机地板上额外发射的射弹数 (方向随机)，让命中和撞墙足够多
+    :return: 状态摘要列表
+    """
+    game = make_game(grid)
+    game.enemy_chase = True
+    game.use_enemy_system = use_enemy_system
+    game.enemies = enemy_system.EnemySystem() if use_enemy_system else []
+    game.use_projectile_pool = use_projectile_pool
+    game.projectiles = projectile_system.ProjectileSystem() if use_projectile_pool else []
+    random.seed(seed)
+    game.spawn_enemies(num_enemies)
+    rng = random.Random(seed)
+    for _ in range(volley):
+        game.spawn_projectile(vec(game.maze.get_random_floor_coord()), vec(1, 0).rotate(rng.uniform(0, 360)))
+    script = random_input_script(seed, shoot_chance=0.8)
+    trace = []
+    for tick in range(ticks):
+        keys = script(tick)
+        game.simulate(1, lambda _: keys, auto_restart=False)
+        trace.append(state_digest(game))
+        if game.game_state != "PLAYING" or game.current_level != 1:
+            break
+    return trace
+
+def assert_same_trace(expected, actual, label):
+    """逐 tick 比较两条状态摘要序列，不一致时指出第一个不同的 tick 和字段。"""
+    for tick, (a, b) in enumerate(zip(expected, actual)):
+        if a != b:
+            field = next(name for name, x, y in zip(DIGEST_FIELDS, a, b) if x != y)
+            raise AssertionError(f"{label}: 第 {tick} 个 tick 的{field}不一致")
+    assert len(expected) == len(actual), f"{label}: 长度不同 ({len(expected)} != {len(actual)})"
+
+@benchmark("player_update", grid_params)
+def bench_player_update(params):
+    """Player.handle_input + Player.update (每 25 tick 换一个移动方向，持续撞墙)。"""
+    game = make_game(params["grid"])
+    player = game.player
+    inputs = [KeyState({key}) for key in (pg.K_RIGHT, pg.K_DOWN, pg.K_LEFT, pg.K_UP)]
+
+    def run():
+        for tick in range(100):
+            player.handle_input(inputs[(tick // 25) % 4])
+            player.update(game.maze)
+        return 100
+
+    return None, run
+
+@benchmark("enemy_update", grid_entity_params)
+def bench_enemy_update(params):
+    """所有敌人更新一个 tick (移动 + 墙壁反弹 + 边界反弹)。"""
+    game = make_game(params["grid"], params["n"])
+
+    def run():
+        for enemy in game.enemies:
+            enemy.update(game.maze)
+
+    return None, run
+
+@benchmark("enemy_chase", grid_entity_params)
+def bench_enemy_chase(params):
+    """所有敌人沿共享流场追踪玩家一个 tick (流场已就绪，每个敌人只查表一次)。"""
+    game = make_game(params["grid"], params["n"])
+    flow = game.maze.flow_toward(game.player.rect.center)
+
+    def run():
+        for enemy in game.enemies:
+            enemy.update(game.maze, flow)
+
+    return None, run
+
+def enemy_system_params(quick):
+    """按迷宫尺寸 × 敌人数 (含上万个敌人) 展开；需要 NumPy。"""
+    if not enemy_system.AVAILABLE:
+        return []
+    counts = QUICK_ENTITY_COUNTS if quick else ENTITY_COUNTS + [10000]
+    return [{"grid": g["grid"], "n": n} for g in grid_params(quick) for n in counts]
+
+@benchmark("enemy_system_update", enemy_system_params)
+def bench_enemy_system_update(params):
+    """结构数组敌人系统整批更新一个 tick (追踪 + 移动 + 撞墙反弹 + 边界反射)，与 enemy_chase 相同的场景。"""
+    game = make_game(params["grid"])
+    enemies = enemy_system.EnemySystem()
+    for _ in range(params["n"]):
+        enemies.spawn(*game.maze.get_random_floor_coord())
+    flow = game.maze.flow_toward(game.player.rect.center)
+
+    def run():
+        enemies.update(game.maze, flow)
+
+    return None, run
+
+@check("enemy_system_parity")
+def check_enemy_system_parity(quick):
+    """EnemySystem 与 Enemy 对象列表：同一迷宫、出生点和输入下，每个 tick 的敌人/玩家/射弹位置与命中结果完全相同。"""
+    if not enemy_system.AVAILABLE:
+        return "跳过 (需要 NumPy)"
+    ticks = 300 if quick else 1500
+    total, kills = 0, 0
+    for grid, n, volley in (("40x30", 20, 0), ("100x100", 300, 0), ("100x100", 300, 500)):
+        for seed in range(1, 5):
+            expected = play_trace(grid, n, seed, ticks, volley=volley)
+            actual = play_trace(grid, n, seed, ticks, use_enemy_system=True, volley=volley)
+            assert_same_trace(expected, actual, f"grid={grid},n={n},volley={volley},seed={seed}")
+            total += len(expected)
+            kills += n - len(expected[-1][2])
+    return f"共 {total} 个 tick，击中 {kills} 个敌人"
+
+@check("sharded_enemy_parity")
+def check_sharded_enemy_parity(quick):
+    """ShardedEnemySystem (3 个工作进程) 与 EnemySystem：同一迷宫、出生点和流场下，每个 tick 的敌人状态与撞墙检测次数完全相同 (含中途移除、流场更换)。"""
+    if not enemy_system.AVAILABLE:
+        return "跳过 (需要 NumPy)"
+    ticks = 100 if quick else 300
+    game = make_game("100x100")
+    maze = game.maze
+    maze.count_walls = True # 同时比较撞墙检测次数
+    coords = [maze.get_random_floor_coord() for _ in range(400)]
+    targets = [game.player.rect.center, maze.get_random_floor_coord()]
+    flow = FlowField(maze, radius=None) # 覆盖整个迷宫，所有敌人都在追踪
+    reference = enemy_system.EnemySystem()
+    sharded = sharded_sim.ShardedEnemySystem(workers=3)
+    try:
+        for enemies in (reference, sharded):
+            random.seed(1)
+            for coord in coords:
+                enemies.spawn(*coord)
+        for tick in range(ticks):
+            flow.update(targets[tick * len(targets) // ticks])
+            if tick % 60 == 59:
+                for enemies in (reference, sharded):
+                    enemies.remove(range(0, enemies.count, 7))
+            checked = []
+            for enemies in (reference, sharded):
+                before = maze.walls_checked
+                enemies.update(maze, flow)
+                checked.append(maze.walls_checked - before)
+            if checked[0] != checked[1]:
+                raise AssertionError(f"tick {tick}: 撞墙检测次数不同 ({checked[0]} != {checked[1]})")
+            n = reference.count
+            for name in ("pos", "vel", "xy"):
+                if sharded.count != n or not np.array_equal(getattr(reference, name)[:n], getattr(sharded, name)[:n]):
+                    raise AssertionError(f"tick {tick}: 敌人 {name} 不同")
+    finally:
+        sharded.close()
+    return f"共 {ticks} 个 tick，剩余 {n} 个敌人"
+
+def sharded_params(quick):
+    """大迷宫 × 大量敌人 × 工作进程数；需要 NumPy。结果取决于 CPU 核数，不记入基线 (baseline.json)。"""
+    if not enemy_system.AVAILABLE:
+        return []
+    counts = [10000] if quick else [10000, 100000]
+    return [{"grid": "1000x1000", "n": n, "workers": w} for n in counts for w in (1, 2, 4)]
+
+@benchmark("sharded_enemy_update", sharded_params)
+def bench_sharded_enemy_update(params):
+    """多进程分片敌人系统更新一个 tick (与 enemy_system_update 相同的场景；workers 个条带并行)。"""
+    game = make_game(params["grid"])
+    enemies = sharded_sim.ShardedEnemySystem(params["workers"])
+    for _ in range(params["n"]):
+        enemies.spawn(*game.maze.get_random_floor_coord())
+    flow = game.maze.flow_toward(game.player.rect.center)
+    enemies.update(game.maze, flow) # 工作进程启动、映射共享内存不计入
+
+    def run():
+        enemies.update(game.maze, flow)
+
+    return None, run
+
+@benchmark("check_collisions", grid_entity_params)
+def bench_check_collisions(params):
+    """Game.check_collisions：n 个射弹 vs 墙壁/敌人，外加玩家 vs 敌人。"""
+    game = make_game(params["grid"], 10)
+    rng = random.Random(1)
+    spawns = [(vec(game.maze.get_random_floor_coord()), vec(1, 0).rotate(rng.uniform(0, 360)))
+              for _ in range(params["n"])]
+    enemies = list(game.enemies)
+    player_rect = game.player.rect.copy()
+
+    def setup():
+        # 每轮都从相同的状态开始：射弹会在检测中被移除，敌人可能被击中
+        game.projectiles.clear()
+        for pos, direction in spawns:
+            game.spawn_projectile(pos, direction)
+        game.enemies = list(enemies)
+        game.player.rect = player_rect.copy()
+        game.game_state = "PLAYING"
+
+    def run():
+        game.check_collisions()
+
+    return setup, run
+
+@check("projectile_pool_parity")
+def check_projectile_pool_parity(quick):
+    """ProjectileSystem 对象池与 Projectile 列表：每个 tick 的射弹位置、撞墙/命中和移除顺序完全相同。"""
+    if not projectile_system.AVAILABLE:
+        return "跳过 (需要 NumPy)"
+    ticks = 300 if quick else 1500
+    total, kills = 0, 0
+    for grid, n, volley in (("40x30", 20, 0), ("100x100", 300, 500), ("100x100", 1000, 5000)):
+        for seed in range(1, 5):
+            expected = play_trace(grid, n, seed, ticks, volley=volley)
+            actual = play_trace(grid, n, seed, ticks, use_projectile_pool=True, volley=volley)
+            assert_same_trace(expected, actual, f"grid={grid},n={n},volley={volley},seed={seed}")
+            total += len(expected)
+            kills += n - len(expected[-1][2])
+    return f"共 {total} 个 tick，击中 {kills} 个敌人"
+
+def crowd_params(quick):
+    """大量敌人 × 大量射弹 (弹幕场景)，两种射弹存储各测一遍。"""
+    sizes = [(100, 500)] if quick else [(100, 500), (1000, 5000)]
+    storages = ["list", "pool"] if projectile_system.AVAILABLE else ["list"]
+    return [{"grid": "100x100", "enemies": e, "projectiles": p, "storage": s}
+            for e, p in sizes for s in storages]
+
+@benchmark("crowd_collisions", crowd_params)
+def bench_crowd_collisions(params):
+    """Game.check_collisions：敌人和射弹都很多时，空间哈希粗筛的效果。"""
+    game = make_game(params["grid"], params["enemies"])
+    game.use_projectile_pool = params["storage"] == "pool"
+    game.projectiles = projectile_system.ProjectileSystem() if game.use_projectile_pool else []
+    rng = random.Random(1)
+    spawns = [(vec(game.maze.get_random_floor_coord()), vec(1, 0).rotate(rng.uniform(0, 360)))
+              for _ in range(params["projectiles"])]
+    enemies = list(game.enemies)
+    player_rect = game.player.rect.copy()
+
+    def setup():
+        game.projectiles.clear()
+        for pos, direction in spawns:
+            game.spawn_projectile(pos, direction)
+        game.enemies = list(enemies)
+        game.player.rect = player_rect.copy()
+        game.game_state = "PLAYING"
+
+    def run():
+        game.check_collisions()
+
+    return setup, run
+
+def sweep_params(quick):
+    """射弹速度 (像素/tick) × 射弹存储：速度超过单元格时扫掠碰撞要遍历更多单元格。"""
+    speeds = [PROJECTILE_SPEED, 4 * TILE_SIZE] if quick else [PROJECTILE_SPEED, TILE_SIZE, 4 * TILE_SIZE]
+    storages = ["list", "pool"] if projectile_system.AVAILABLE else ["list"]
+    return [{"grid": "100x100", "n": 1000, "speed": v, "storage": s} for v in speeds for s in storages]
+
+@benchmark("projectile_sweep", sweep_params)
+def bench_projectile_sweep(params):
+    """n 个射弹移动 10 个 tick，每个 tick 沿移动线段做 DDA 扫掠判定撞墙 (Game.check_collisions，没有敌人)。"""
+    game = make_game(params["grid"])
+    game.use_projectile_pool = params["storage"] == "pool"
+    game.projectiles = projectile_system.ProjectileSystem() if game.use_projectile_pool else []
+    rng = random.Random(1)
+    spawns = [(vec(game.maze.get_random_floor_coord()), vec(1, 0).rotate(rng.uniform(0, 360)))
+              for _ in range(params["n"])]
+    scale = params["speed"] / PROJECTILE_SPEED
+
+    def setup():
+        game.projectiles.clear()
+        for pos, direction in spawns:
+            game.spawn_projectile(pos, direction)
+        if game.use_projectile_pool:
+            game.projectiles.vel *= scale
+        else:
+            for projectile in game.projectiles:
+                projectile.vel *= scale
+        game.game_state = "PLAYING"
+
+    def run():
+        for _ in range(10):
+            if game.use_projectile_pool:
+                game.projectiles.update(game.maze.bounds)
+            else:
+                for projectile in game.projectiles[:]:
+                    projectile.update()
+            game.check_collisions()
+        return 10
+
+    return setup, run
+
+def _square_at(x, y, radius):
+    """中心在 (x, y) (四舍五入到像素)、边长 2 * radius 的方块，与 sweep 的判定对象相同。"""
+    cx, cy = math.floor(x + 0.5), math.floor(y + 0.5)
+    return pg.Rect(cx - radius, cy - radius, 2 * radius, 2 * radius)
+
+@check("projectile_sweep")
+def check_projectile_sweep(quick):
+    """
+    Maze/EndlessMaze.sweep 与暴力采样对比：沿线段取 4000 个等距点逐个调用 collides_with_wall，
+    第一次碰墙的 t 与 sweep 的结果相差不超过一个采样间隔 (没有碰墙时两者都为 None)。
+    同时确认批量版本 sweep_many 与逐个 sweep 的结果完全相同。
+    """
+    samples = 4000
+    cases = 300 if quick else 1500
+    rng = random.Random(1)
+    hits, total = 0, 0
+    for maze in (Maze(40, 30, seed=3), EndlessMaze()):
+        bounds = maze.bounds
+        starts, ends, scalar = [], [], []
+        for _ in range(cases):
+            radius = rng.choice([1, PROJECTILE_RADIUS, 7])
+            x0, y0 = rng.uniform(bounds.left, bounds.right), rng.uniform(bounds.top, bounds.bottom)
+            if maze.collides_with_wall(_square_at(x0, y0, radius)):
+                continue # 起点已在墙内
+            angle, speed = rng.uniform(0, 2 * math.pi), rng.choice([3, 8, 30, 75, 200])
+            x1, y1 = x0 + speed * math.cos(angle), y0 + speed * math.sin(angle)
+            if rng.random() < 0.1:
+                x1 = x0 # 竖直线段 (dx = 0)
+            result = maze.sweep((x0, y0), (x1, y1), radius)
+            first = next((k / samples for k in range(samples + 1)
+                          if maze.collides_with_wall(_square_at(x0 + (x1 - x0) * k / samples,
+                                                                y0 + (y1 - y0) * k / samples, radius))), None)
+            label = f"{type(maze).__name__} {(x0, y0)} -> {(x1, y1)}, radius={radius}"
+            assert (result is None) == (first is None), f"{label}: sweep {result}，暴力采样 {first}"
+            if result is not None:
+                assert abs(result[0] - first) <= 1 / samples + 1e-9, f"{label}: sweep t={result[0]}，暴力采样 t={first}"
+                hits += 1
+            total += 1
+            if radius == PROJECTILE_RADIUS:
+                starts.append((x0, y0))
+                ends.append((x1, y1))
+                scalar.append(result[0] if result else math.inf)
+        if np is not None:
+            batch = maze.sweep_many(np.array(starts), np.array(ends), PROJECTILE_RADIUS)
+            assert np.array_equal(np.isinf(batch), np.isinf(scalar)), f"{type(maze).__name__}: sweep_many 的命中与 sweep 不同"
+            assert np.allclose(batch, scalar), f"{type(maze).__name__}: sweep_many 的 t 与 sweep 不同"
+    return f"{total} 条线段，{hits} 条碰墙"
@@ -0,0 +1,138 @@
+# bench_maze.py - 迷宫生成与查询的基准测试
+
+import random
+import tempfile
+from pathlib import Path
+import pygame as pg
+from benchmarks.runner import benchmark, grid_params, parse_grid
+from settings import *
+from maze import Maze
+from flow_field import FlowField
+from concurrent.futures import Future
+from level_prefetch import LevelPrefetcher, build_level
+from maze_store import MazeCache, save_maze, load_maze
+
+@benchmark("maze_construct", grid_params)
+def bench_maze_construct(params):
+    """Maze() 构造：_generate + _create_rects。"""
+    w, h = parse_grid(params["grid"])
+
+    def setup():
+        random.seed(0)
+
+    def run():
+        Maze(w, h)
+
+    return setup, run
+
+@benchmark("random_floor_coord", grid_params)
+def bench_random_floor_coord(params):
+    """get_random_floor_coord (带排除区域和最小距离，与 Game.reset_game 相同的用法)。"""
+    w, h = parse_grid(params["grid"])
+    random.seed(0)
+    maze = Maze(w, h)
+    start_x, start_y = maze.get_start_pixel_pos()
+    exclude = pg.Rect(start_x, start_y, TILE_SIZE, TILE_SIZE)
+    min_dist_sq = (TILE_SIZE * 4)**2
+
+    def run():
+        for _ in range(10):
+            maze.get_random_floor_coord(exclude_rect=exclude, min_dist_sq_from=min_dist_sq,
+                                        source_pos=exclude.center)
+        return 10
+
+    return None, run
+
+@benchmark("spawn_batch", grid_params)
+def bench_spawn_batch(params):
+    """sample_floor_coords：一次抽取 1000 个出生点 (与 Game.spawn_enemies 相同的约束)，按每个样本计时。"""
+    w, h = parse_grid(params["grid"])
+    random.seed(0)
+    maze = Maze(w, h)
+    start_x, start_y = maze.get_start_pixel_pos()
+    exclude = pg.Rect(start_x, start_y, TILE_SIZE, TILE_SIZE)
+    min_dist_sq = (TILE_SIZE * 4)**2
+
+    def run():
+        maze.sample_floor_coords(1000, exclude_rect=exclude, min_dist_sq_from=min_dist_sq,
+                                 source_pos=exclude.center)
+        return 1000
+
+    return None, run
+
+def flow_params(quick):
+    """迷宫尺寸 × 流场半径 (默认的有限半径与遍历整个迷宫；后者在 1000x1000 上需要数秒，跳过)。"""
+    return [{"grid": g["grid"], "radius": r} for g in grid_params(quick) for r in (ENEMY_CHASE_RADIUS, "all")
+            if not (r == "all" and g["grid"] == "1000x1000")]
+
+@benchmark("flow_field", flow_params)
+def bench_flow_field(params):
+    """玩家进入新单元格时的一次流场重新计算 (BFS)。"""
+    w, h = parse_grid(params["grid"])
+    random.seed(0)
+    maze = Maze(w, h)
+    field = FlowField(maze, radius=None if params["radius"] == "all" else params["radius"])
+    start_x, start_y = maze.get_start_pixel_pos()
+    target = (start_x + TILE_SIZE // 2, start_y + TILE_SIZE // 2)
+
+    def setup():
+        field.invalidate()
+
+    def run():
+        field.update(target)
+
+    return setup, run
+
+@benchmark("maze_analytics", grid_params)
+def bench_maze_analytics(params):
+    """构建 MazeIndex (出口 BFS + 死胡同/岔路口统计 + 最短路径，起点距离场复用构造时的结果)。"""
+    w, h = parse_grid(params["grid"])
+    random.seed(0)
+    maze = Maze(w, h)
+
+    def setup():
+        maze._analytics = None
+
+    def run():
+        maze.analytics
+
+    return setup, run
+
+def transition_params(quick):
+    """迷宫尺寸 × 切换方式 (缓存命中 / 后台已预生成 / 同步生成)。"""
+    return [{"grid": g["grid"], "mode": mode} for g in grid_params(quick) for mode in ("cached", "prefetched", "sync")]
+
+@benchmark("level_transition", transition_params)
+def bench_level_transition(params):
+    """
+    切换关卡时主线程取得下一关迷宫的耗时 (LevelPrefetcher.take，不含预渲染)。
+    cached：重开同一关卡，迷宫在 LRU 缓存中；prefetched：后台任务已完成，只测换上的开销；sync：在主线程同步生成。
+    """
+    w, h = parse_grid(params["grid"])
+    cache = MazeCache(1 if params["mode"] == "cached" else 0) # 其余两种方式不能让缓存命中
+    prefetcher = LevelPrefetcher(enabled=False, bake=False, size=(w, h), cache=cache)
+    ready = Future()
+    ready.set_result(build_level(0, w, h, bake=False))
+    cache.put(ready.result())
+
+    def setup():
+        prefetcher.prefetch(0)
+        if params["mode"] == "prefetched":
+            prefetcher._future = ready # 模拟后台已生成完毕
+
+    def run():
+        prefetcher.take(0)
+
+    return setup, run
+
+@benchmark("maze_load", grid_params)
+def bench_maze_load(params):
+    """从 2 bit/格 的迷宫文件读取 Maze (mmap + 解包 + _create_rects)，与 maze_construct 对比。"""
+    w, h = parse_grid(params["grid"])
+    path = Path(tempfile.gettempdir()) / f"maze-bench-{w}x{h}.maze"
+    save_maze(Maze(w, h, seed=0), path)
+
+    def run():
+        load_maze(path)
+
+    return None, run
@@ -0,0 +1,199 @@
+# runner.py - 基准测试注册、计时、结果输出与基线比较
+
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+from pathlib import Path
+
+# 基准测试不需要窗口和声音
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+BENCH_DIR = Path(__file__).parent
+ROOT_DIR = BENCH_DIR.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR)) # 游戏模块都在仓库根目录
+
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_OUTPUT = BENCH_DIR / "results.json"
+
+# --- 参数矩阵 ---
+GRID_SIZES = [(20, 18), (100, 100), (300, 300), (1000, 1000)]
+QUICK_GRID_SIZES = [(20, 18), (100, 100)]
+ENTITY_COUNTS = [10, 100, 1000]
+QUICK_ENTITY_COUNTS = [10, 100]
+
+# --- 注册表 ---
+BENCHMARKS = [] # (名称, 参数生成函数, 基准函数)
+
+def benchmark(name, params=None):
+    """
+    装饰器：注册一个基准测试。
+    基准函数接收参数字典，返回 (setup, run)：setup 在每次计时前调用 (不计时，可为 None)，
+    run 是被计时的函数，返回值为本次执行的操作数 (用于计算每次操作的耗时，None 视为 1)。
+    :param name: 基准名称
+    :param params: callable(quick) -> 参数字典列表；None 表示无参数
+    """
+    def decorator(func):
+        BENCHMARKS.append((name, params or (lambda quick: [{}]), func))
+        return func
+    return decorator
+
+# --- 正确性检查 ---
+CHECKS = [] # (名称, 检查函数)
+
+def check(name):
+    """
+    装饰器：注册一个正确性检查 (python -m benchmarks --check)，用于确认优化后的实现与参考实现结果一致。
+    检查函数接收 quick (是否缩小规模)，不一致时抛出 AssertionError，返回一行说明 (可为 None)。
+    :param name: 检查名称
+    """
+    def decorator(func):
+        CHECKS.append((name, func))
+        return func
+    return decorator
+
+def run_checks(quick=False, name_filter=None):
+    """
+    运行所有 (或匹配 name_filter 的) 正确性检查。
+    :return: 失败的检查名称列表
+    """
+    failures = []
+    for name, func in CHECKS:
+        if name_filter and name_filter not in name:
+            continue
+        start = time.perf_counter()
+        try:
+            note = func(quick)
+        except AssertionError as e:
+            failures.append(name)
+            print(f"{name:<40s} 失败: {e}", flush=True)
+            continue
+        print(f"{name:<40s} 通过 ({time.perf_counter() - start:.1f} 秒){f'  {note}' if note else ''}", flush=True)
+    return failures
+
+def grid_params(quick):
+    """按迷宫尺寸展开的参数矩阵。"""
+    return [{"grid": f"{w}x{h}"} for w, h in (QUICK_GRID_SIZES if quick else GRID_SIZES)]
+
+def grid_entity_params(quick):
+    """按迷宫尺寸 × 实体数量展开的参数矩阵。"""
+    return [{"grid": g["grid"], "n": n} for g in grid_params(quick)
+            for n in (QUICK_ENTITY_COUNTS if quick else ENTITY_COUNTS)]
+
+def parse_grid(text):
+    """把 "WxH" 解析为 (W, H)。"""
+    w, h = text.split("x")
+    return int(w), int(h)
+
+def result_key(name, params):
+    """结果字典的键，例如 enemy_update[grid=100x100,n=1000]。"""
+    if not params:
+        return name
+    return f"{name}[{','.join(f'{k}={v}' for k, v in params.items())}]"
+
+# --- 计时 ---
+
+def measure(setup, run, repeat, min_time=0.05):
+    """
+    重复计时 run，每轮先调用 setup。
+    每轮至少运行 min_time 秒 (自动增加循环次数)，以减小计时误差。
+    :return: 每次操作的耗时列表 (秒)
+    """
+    samples = []
+    for _ in range(repeat):
+        loops, ops, elapsed = 0, 0, 0.0
+        while elapsed < min_time or loops == 0:
+            if setup:
+                setup()
+            start = time.perf_counter()
+            count = run()
+            elapsed += time.perf_counter() - start
+            ops += 1 if count is None else count
+            loops += 1
+        samples.append(elapsed / max(ops, 1))
+    return samples
+
+def run_benchmarks(quick=False, name_filter=None, repeat=5):
+    """
+    运行所有 (或匹配 name_filter 的) 基准测试。
+    :return: {键: 结果字典}
+    """
+    results = {}
+    for name, params_fn, func in BENCHMARKS:
+        if name_filter and name_filter not in name:
+            continue
+        for params in params_fn(quick):
+            key = result_key(name, params)
+            setup, run = func(params)
+            samples = measure(setup, run, repeat)
+            results[key] = {
+                "name": name,
+                "params": params,
+                "median_s": statistics.median(samples),
+                "best_s": min(samples),
+                "repeat": repeat,
+            }
+            print(f"{key:<55s} {format_time(results[key]['median_s'])}", flush=True)
+    return results
+
+def format_time(seconds):
+    """把秒数格式化为合适的单位。"""
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.2f} ns"
+
+# --- 输出与基线比较 ---
+
+def environment_info():
+    """记录运行环境，便于判断两份结果是否可比。"""
+    info = {"python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    try:
+        import pygame
+        info["pygame"] = pygame.version.ver
+    except ImportError:
+        pass
+    try:
+        import numpy
+        info["numpy"] = numpy.__version__
+    except ImportError:
+        info["numpy"] = None
+    return info
+
+def save_results(results, path):
+    """把结果写成 JSON 文件。"""
+    data = {"meta": environment_info(), "results": results}
+    Path(path).write_text(json.dumps(data, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+def load_results(path):
+    """读取 JSON 结果文件，文件不存在时返回 None。"""
+    path = Path(path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))["results"]
+
+def compare(results, baseline, tolerance):
+    """
+    与基线比较，打印每项的变化比例。
+    :param tolerance: 允许的变慢比例 (0.25 表示慢 25% 以内不算回归)
+    :return: 回归项的键列表
+    """
+    regressions = []
+    print(f"\n{'基准':<55s} {'基线':>11s} {'本次':>11s} {'比例':>7s}")
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            print(f"{key:<55s} {'(无基线)':>11s} {format_time(result['median_s'])}")
+            continue
+        ratio = result["median_s"] / base["median_s"] if base["median_s"] > 0 else 1.0
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+            flag = "  << 回归"
+        print(f"{key:<55s} {format_time(base['median_s'])} {format_time(result['median_s'])} {ratio:6.2f}x{flag}")
+    return regressions
@@ -0,0 +1,150 @@
+# build_levels.py - 离线批量生成关卡包：用进程池并行生成迷宫，写入一个带索引的关卡包文件
+# 用法: python build_levels.py levels.mzpk --count 1000 [--size 300x300] [--algorithm dfs]
+#                              [--run-seed 0] [--jobs 4] [--stats levels.jsonl]
+# 关卡包中第 k 个条目就是本局种子为 run-seed 时第 first-level + k 关的迷宫 (种子由 level_seed 派生)，
+# 用 maze_store.MazeArchive 按下标或种子读取。
+
+import os
+# 工作进程会导入 pygame (maze.py 依赖它)，不需要每个进程都打印欢迎信息
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from settings import *
+from maze import Maze
+from maze_generators import get_generator
+from maze_store import level_seed, create_archive, write_record
+
+# 工作进程内的状态 (由 _init_worker 设置)
+_archive_file = None
+_maze_args = None
+
+def _init_worker(path, width, height, algorithm):
+    """工作进程初始化：打开关卡包文件，之后每个迷宫直接写入它在文件中的记录位置。"""
+    global _archive_file, _maze_args
+    _archive_file = open(path, "r+b")
+    _maze_args = (width, height, algorithm)
+
+def _build_batch(batch):
+    """
+    在工作进程中生成一批迷宫并写入关卡包。
+    :param batch: [(下标, 种子, 记录偏移)]
+    :return: 每个迷宫的统计信息字典列表 (只把统计信息传回主进程，迷宫数据不经过进程间通信)
+    """
+    width, height, algorithm = _maze_args
+    results = []
+    for index, seed, offset in batch:
+        start = time.perf_counter()
+        maze = Maze(width, height, algorithm=algorithm, seed=seed)
+        gen_ms = (time.perf_counter() - start) * 1000
+        write_record(_archive_file, offset, maze)
+        stats = {"index": index, "seed": seed, "gen_ms": round(gen_ms, 3)}
+        stats.update(maze.analytics.stats())
+        results.append(stats)
+    _archive_file.flush()
+    return results
+
+def build_archive(path, seeds, width=GRID_WIDTH, height=GRID_HEIGHT, algorithm=MAZE_ALGORITHM,
+                  jobs=None, batch_size=None, on_result=None):
+    """
+    并行生成 seeds 对应的迷宫并写入关卡包 path (先写临时文件，全部完成后再替换)。
+    :param path: 关卡包路径
+    :param seeds: 迷宫种子列表 (按关卡顺序)
+    :param width: 网格宽度
+    :param height: 网格高度
+    :param algorithm: 生成算法名
+    :param jobs: 工作进程数；None 表示 CPU 核数
+    :param batch_size: 每个任务包含的迷宫数；None 表示按任务数自动选择 (小迷宫批量提交以摊薄进程间通信)
+    :param on_result: 可选，callable(stats)，每生成完一个迷宫就在主进程中调用一次 (完成顺序)
+    :return: 按关卡顺序排列的统计信息列表
+    """
+    get_generator(algorithm) # 先在主进程中检查算法名 (未知算法名抛出 ValueError)
+    jobs = jobs or os.cpu_count() or 1
+    if batch_size is None:
+        # 每个进程大约分到 8 批，既能均衡负载又不会有太多的任务调度开销
+        batch_size = max(1, len(seeds) // (jobs * 8))
+    path = os.fspath(path)
+    tmp = path + ".tmp"
+    offsets = create_archive(tmp, seeds, width, height, algorithm)
+    work = [(i, seed, offset) for i, (seed, offset) in enumerate(zip(seeds, offsets))]
+    batches = [work[i:i + batch_size] for i in range(0, len(work), batch_size)]
+
+    results = [None] * len(seeds)
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(tmp, width, height, algorithm)) as pool:
+            for future in as_completed([pool.submit(_build_batch, batch) for batch in batches]):
+                for stats in future.result():
+                    results[stats["index"]] = stats
+                    if on_result is not None:
+                        on_result(stats)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return results
+
+def summarize(results, seconds, jobs):
+    """打印整批的汇总统计。"""
+    if not results:
+        print("没有生成任何迷宫")
+        return
+
+    def column(key):
+        values = [r[key] for r in results]
+        return f"{min(values)} / {sum(values) / len(values):.1f} / {max(values)}"
+
+    n = len(results)
+    gen_total = sum(r["gen_ms"] for r in results) / 1000
+    print(f"生成 {n} 个迷宫，用时 {seconds:.2f} 秒 ({n / seconds:.1f} 个/秒，{jobs} 个进程，"
+          f"累计生成耗时 {gen_total:.2f} 秒，并行加速 {gen_total / seconds:.2f}x)")
+    print("                 最小 / 平均 / 最大")
+    print(f"  生成耗时 (ms)   {column('gen_ms')}")
+    print(f"  最短路径长度    {column('solution_length')}")
+    print(f"  死胡同数量      {column('dead_ends')}")
+    print(f"  岔路口数量      {column('junctions')}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="用进程池批量生成迷宫，写入带索引的关卡包")
+    parser.add_argument("output", help="关卡包输出路径")
+    parser.add_argument("--count", type=int, default=100, help="生成的迷宫数量")
+    parser.add_argument("--size", default=f"{GRID_WIDTH}x{GRID_HEIGHT}", help="迷宫的网格尺寸，如 300x300")
+    parser.add_argument("--algorithm", default=MAZE_ALGORITHM, help="生成算法名")
+    parser.add_argument("--run-seed", type=int, default=0, help="本局种子 (每关的迷宫种子由它派生)")
+    parser.add_argument("--first-level", type=int, default=1, help="第一个条目对应的关卡号")
+    parser.add_argument("--jobs", type=int, default=None, help="工作进程数 (默认 CPU 核数)")
+    parser.add_argument("--batch-size", type=int, default=None, help="每个任务包含的迷宫数")
+    parser.add_argument("--stats", default=None, help="可选，把每个迷宫的统计信息写入该 JSONL 文件")
+    parser.add_argument("--verbose", action="store_true", help="每生成完一个迷宫就打印其统计信息")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    seeds = [level_seed(args.run_seed, level) for level in range(args.first_level, args.first_level + args.count)]
+    jobs = args.jobs or os.cpu_count() or 1
+
+    def report(stats):
+        print(f"#{stats['index']:<6} 种子 {stats['seed']:<20} {stats['gen_ms']:9.2f} ms  "
+              f"路径 {stats['solution_length']:<6} 死胡同 {stats['dead_ends']:<6} 岔路口 {stats['junctions']}")
+
+    start = time.perf_counter()
+    try:
+        results = build_archive(args.output, seeds, width, height, args.algorithm, jobs, args.batch_size,
+                                report if args.verbose else None)
+    except ValueError as e: # 未知算法名等
+        print(f"错误：{e}")
+        return 1
+    seconds = time.perf_counter() - start
+
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            for stats in results:
+                f.write(json.dumps(stats) + "\n")
+    summarize(results, seconds, jobs)
+    print(f"关卡包已写入 {args.output} ({os.path.getsize(args.output)} 字节)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
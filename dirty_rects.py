@@ -0,0 +1,86 @@
+# dirty_rects.py - 脏矩形刷新：只恢复和提交实体移动过的区域，画面变化太大时退回整屏 flip
+
+import pygame as pg
+from settings import * # 导入设置
+
+class DirtyRectRenderer:
+    """
+    记录上一帧绘制过的所有区域 (玩家、敌人、射弹、HUD 文本等的屏幕 Rect)。
+    每帧先用背景图层只覆盖这些旧区域 (擦掉上一帧的实体)，调用方重新绘制实体后，
+    把新旧区域一起交给 pg.display.update(rects)，而不是填充、重绘并 flip 整个屏幕。
+
+    以下情况改为整屏重绘并 flip：背景改变 (新关卡)、画面被其他代码整屏重绘过 (invalidate)、
+    或脏区域的总面积超过屏幕的 max_fraction、矩形数超过 max_count (大量小矩形逐个 blit 反而比整屏更慢)。
+    """
+
+    def __init__(self, size=(SCREEN_WIDTH, SCREEN_HEIGHT), max_fraction=DIRTY_RECTS_MAX_FRACTION,
+                 max_count=DIRTY_RECTS_MAX_COUNT):
+        """
+        :param size: 屏幕尺寸 (宽, 高)
+        :param max_fraction: 脏区域面积占屏幕的比例超过该值时退回整屏 flip
+        :param max_count: 脏矩形数超过该值时退回整屏 flip
+        """
+        self.screen_rect = pg.Rect((0, 0), size)
+        self.max_area = self.screen_rect.width * self.screen_rect.height * max_fraction
+        self.max_count = max_count
+        self.background = None       # 背景图层 (与屏幕同尺寸)
+        self._background_key = None  # 生成背景图层时的标识 (改变时重建)
+        self._prev = []              # 上一帧绘制的区域
+        self._valid = False          # 屏幕内容是否为 “背景 + 上一帧的实体”
+        self._full = True            # 本帧是否整屏刷新 (由 restore 决定)
+        self.stats = {"partial": 0, "full": 0}
+        self.last_rect_count = 0     # 上一帧提交的矩形数 (整屏 flip 时为 0)
+
+    def invalidate(self):
+        """画面已被整屏重绘 (其他游戏状态、非脏矩形模式)，下一帧必须整屏刷新。"""
+        self._valid = False
+
+    def set_background(self, key, paint):
+        """
+        确保背景图层对应 key；key 改变时调用 paint(surface) 重新绘制背景，并强制下一帧整屏刷新。
+        :param key: 背景的标识 (用 == 比较，例如 (迷宫, 迷宫图层))
+        :param paint: callable(surface)，把背景画到与屏幕同尺寸的 Surface 上
+        """
+        if self.background is not None and key == self._background_key:
+            return
+        if self.background is None:
+            self.background = pg.Surface(self.screen_rect.size)
+        paint(self.background)
+        self._background_key = key
+        self._valid = False
+
+    def restore(self, screen):
+        """用背景覆盖上一帧绘制过的区域 (整屏刷新时覆盖整个屏幕)。"""
+        background = self.background
+        self._full = not self._valid or len(self._prev) > self.max_count
+        if self._full:
+            screen.blit(background, (0, 0))
+            return
+        for rect in self._prev:
+            screen.blit(background, rect, rect)
+
+    def present(self, rects):
+        """
+        提交本帧的画面。
+        :param rects: 本帧绘制过的区域 (Rect 列表)
+        :return: True 如果只提交了脏矩形，False 如果整屏 flip
+        """
+        screen_rect = self.screen_rect
+        rects = [r.clip(screen_rect) for r in rects]
+        rects = [r for r in rects if r.width and r.height]
+        partial = not self._full
+        if partial:
+            dirty = self._prev + rects
+            if len(dirty) > self.max_count or sum(r.width * r.height for r in dirty) > self.max_area:
+                partial = False
+        if partial:
+            pg.display.update(dirty)
+            self.stats["partial"] += 1
+            self.last_rect_count = len(dirty)
+        else:
+            pg.display.flip()
+            self.stats["full"] += 1
+            self.last_rect_count = 0
+        self._prev = rects
+        self._valid = True
+        return partial
@@ -0,0 +1,228 @@
+# endless_maze.py - 无尽模式：按需逐块生成、远处区块自动回收的流式迷宫
+
+import pygame as pg
+import random
+from settings import * # 导入设置
+from maze import TileQueryMixin
+from maze_generators import EllerRows
+from spawn_sampler import SpawnSampler
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class MazeChunk:
+    """无尽迷宫中的一个区块：连续 ENDLESS_CHUNK_ROWS 行的单元格编码及其预渲染图层。"""
+
+    def __init__(self, index, cells, width):
+        """
+        :param index: 区块序号 (第 index 块覆盖网格行 index*rows 到 (index+1)*rows-1)
+        :param cells: 按行展开的 CELL_* 编码 (bytearray)
+        :param width: 网格宽度
+        """
+        self.index = index
+        self.cells = cells
+        self.width = width
+        self.rows = len(cells) // width
+        self.surface = None # 预渲染图层 (首次绘制时生成)
+        self._floor_coords = None
+
+    @property
+    def floor_coords(self):
+        """区块内所有可通行单元格中心的像素坐标 (世界坐标，首次访问时生成)。"""
+        if self._floor_coords is None:
+            w, half = self.width, TILE_SIZE // 2
+            top = self.index * self.rows
+            self._floor_coords = [((i % w) * TILE_SIZE + half, (top + i // w) * TILE_SIZE + half)
+                                  for i, code in enumerate(self.cells) if code != CELL_WALL]
+        return self._floor_coords
+
+    def bake(self):
+        """把区块渲染到离屏 Surface 上，之后每帧只需一次 blit。"""
+        surface = pg.Surface((self.width * TILE_SIZE, self.rows * TILE_SIZE))
+        if pg.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill(COLOR_FLOOR)
+        w = self.width
+        for r in range(self.rows):
+            for c in range(w):
+                cell_type = self.cells[r * w + c]
+                if cell_type == CELL_FLOOR:
+                    continue
+                rect = pg.Rect(c * TILE_SIZE, r * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                if cell_type == CELL_WALL:
+                    pg.draw.rect(surface, COLOR_WALL, rect)
+                    pg.draw.rect(surface, COLOR_WALL_BORDER, rect, 2)
+                elif cell_type == CELL_START:
+                    pg.draw.rect(surface, COLOR_START, rect.inflate(-TILE_SIZE * 0.2, -TILE_SIZE * 0.2), border_radius=3)
+        self.surface = surface
+
+
+class EndlessMaze(TileQueryMixin):
+    """
+    无尽模式的迷宫：宽度固定，向下无限延伸。
+    使用 Eller 算法逐行生成 (只保存一行的集合状态)，以区块为单位按玩家位置预生成前方、回收后方，
+    因此无论玩家走多远，内存占用都保持不变。
+    对外提供与 Maze 相同的查询接口 (walls_near / collides_with_wall / sweep / bounds / get_random_floor_coord / draw)，
+    Game、Player、Enemy 无需区分两种迷宫。
+    """
+
+    def __init__(self, width=None, chunk_rows=ENDLESS_CHUNK_ROWS, rng=random):
+        """
+        :param width: 网格宽度；默认取不超过 GRID_WIDTH 的最大奇数，使左右各有一层边界墙
+        :param chunk_rows: 每个区块的行数 (必须为偶数)
+        :param rng: 随机数源
+        """
+        if width is None:
+            width = GRID_WIDTH if GRID_WIDTH % 2 == 1 else GRID_WIDTH - 1
+        if chunk_rows % 2:
+            raise ValueError(f"chunk_rows 必须为偶数，当前为 {chunk_rows}")
+        self.grid_width = width
+        self.chunk_rows = chunk_rows
+        self.chunks = {}              # 区块序号 -> MazeChunk，只保留玩家附近的区块
+        self._rows = EllerRows(width, rng)
+        self._pending_row = bytearray(width) # 下一区块的首行 (上一行房间的向下连接)；第 0 块为顶部边界墙
+        self._next_chunk = 0          # 下一个要生成的区块序号
+        self._solid_row = bytes(width) # 已回收/未生成的行一律视为实心墙
+        self.rng = rng
+
+        self.start_cell = (1, 1)      # 起点固定在左上角的房间
+        self.exit_cell = None         # 无尽模式没有出口
+        self.exit_rect = None
+
+        self.update_focus(self.start_cell[1] * TILE_SIZE)
+        first = self.chunks[0]
+        first.cells[self.start_cell[1] * width + self.start_cell[0]] = CELL_START
+
+    # --- 区块管理 ---
+
+    def _generate_chunk(self):
+        """用 Eller 算法生成下一个区块。"""
+        w = self.grid_width
+        cells = bytearray(self._pending_row)
+        for _ in range(self.chunk_rows // 2 - 1):
+            room_row, below_row = self._rows.next_rows()
+            cells += room_row
+            cells += below_row
+        room_row, self._pending_row = self._rows.next_rows()
+        cells += room_row
+        chunk = MazeChunk(self._next_chunk, cells, w)
+        self.chunks[chunk.index] = chunk
+        self._next_chunk += 1
+        return chunk
+
+    def update_focus(self, y):
+        """
+        根据关注点 (通常是玩家中心) 的像素 y 坐标，生成前方区块并回收后方区块。
+        :param y: 像素 y 坐标
+        :return: 本次新生成的区块序号列表
+        """
+        focus_chunk = max(int(y) // TILE_SIZE, 0) // self.chunk_rows
+        new_chunks = []
+        while self._next_chunk <= focus_chunk + ENDLESS_CHUNKS_AHEAD:
+            new_chunks.append(self._generate_chunk().index)
+        stale = [i for i in self.chunks if i < focus_chunk - ENDLESS_CHUNKS_BEHIND]
+        for index in stale:
+            del self.chunks[index]
+        if new_chunks or stale:
+            self.invalidate_flow_field() # 已加载区域变了，流场需要重新计算
+        return new_chunks
+
+    @property
+    def first_row(self):
+        """当前已加载的第一行。"""
+        return min(self.chunks) * self.chunk_rows
+
+    @property
+    def last_row(self):
+        """当前已加载的最后一行。"""
+        return (max(self.chunks) + 1) * self.chunk_rows - 1
+
+    # --- TileQueryMixin 接口 ---
+
+    def _row_limits(self):
+        """可查询的行范围：已加载区块覆盖的行。"""
+        return self.first_row, self.last_row
+
+    def _row_cells(self, row):
+        """返回 (存储, 行起始下标)；不在已加载区块中的行视为实心墙。"""
+        chunk = self.chunks.get(row // self.chunk_rows)
+        if chunk is None:
+            return self._solid_row, 0
+        return chunk.cells, (row % self.chunk_rows) * self.grid_width
+
+    def walls_at(self, cols, rows):
+        """
+        批量判断单元格是否为墙壁 (需要 NumPy)；不在已加载区块中的单元格视为非墙壁。
+        :param cols: 列下标的整数数组
+        :param rows: 行下标的整数数组
+        :return: bool 数组
+        """
+        w, chunk_rows = self.grid_width, self.chunk_rows
+        result = np.zeros(len(cols), dtype=bool)
+        for index, chunk in self.chunks.items():
+            top = index * chunk_rows
+            inside = (cols >= 0) & (cols < w) & (rows >= top) & (rows < top + chunk_rows)
+            if inside.any():
+                flat = np.frombuffer(chunk.cells, dtype=np.uint8)
+                result[inside] = flat[(rows[inside] - top) * w + cols[inside]] == CELL_WALL
+        return result
+
+    @property
+    def bounds(self):
+        """已加载区域的像素范围 (实体的移动边界)。"""
+        top = self.first_row * TILE_SIZE
+        return pg.Rect(0, top, self.grid_width * TILE_SIZE, (self.last_row + 1) * TILE_SIZE - top)
+
+    # --- 与 Maze 相同的辅助接口 ---
+
+    def get_start_pixel_pos(self):
+        """获取起点单元格左上角的像素坐标。"""
+        return (self.start_cell[0] * TILE_SIZE, self.start_cell[1] * TILE_SIZE)
+
+    def sample_floor_coords(self, count, exclude_rect=None, min_dist_sq_from=None, source_pos=None, chunk_index=None):
+        """
+        一次抽取 count 个随机地板中心坐标 (只在已加载区块中选取)，约束与 Maze.sample_floor_coords 相同。
+        :param chunk_index: 可选，只在指定区块中选取 (用于给新区块生成敌人)
+        :return: 坐标 (x, y) 列表
+        """
+        if chunk_index in self.chunks:
+            points = self.chunks[chunk_index].floor_coords
+        else:
+            points = [p for index in sorted(self.chunks) for p in self.chunks[index].floor_coords]
+        return SpawnSampler(points, self.rng).sample(count, exclude_rect, min_dist_sq_from, source_pos)
+
+    def get_random_floor_coord(self, exclude_rect=None, min_dist_sq_from=None, source_pos=None, chunk_index=None):
+        """
+        获取一个随机的非墙壁单元格的中心像素坐标 (只在已加载区块中选取)。
+        :param exclude_rect: 可选，需要排除的 Rect 区域
+        :param min_dist_sq_from: 可选，与指定点 source_pos 的最小距离平方
+        :param source_pos: 可选，计算最小距离的源点坐标
+        :param chunk_index: 可选，只在指定区块中选取 (用于给新区块生成敌人)
+        :return: (x, y) 元组，找不到则返回 None
+        """
+        coords = self.sample_floor_coords(1, exclude_rect, min_dist_sq_from, source_pos, chunk_index)
+        return coords[0] if coords else None
+
+    def draw(self, surface, offset=(0, 0)):
+        """
+        绘制视野内的区块。
+        :param surface: 目标 Surface
+        :param offset: 摄像机偏移 (像素)，世界坐标减去它即屏幕坐标
+        """
+        ox, oy = offset
+        view_top, view_bottom = oy, oy + surface.get_height()
+        chunk_height = self.chunk_rows * TILE_SIZE
+        for index in sorted(self.chunks):
+            top = index * chunk_height
+            if top >= view_bottom or top + chunk_height <= view_top:
+                continue
+            chunk = self.chunks[index]
+            if chunk.surface is None:
+                chunk.bake()
+            surface.blit(chunk.surface, (-ox, top - oy))
+        # 网格宽度为奇数时右侧可能留出一条空白，用墙壁边框色填充
+        right = self.grid_width * TILE_SIZE - ox
+        if right < surface.get_width():
+            surface.fill(COLOR_WALL_BORDER, (right, 0, surface.get_width() - right, surface.get_height()))
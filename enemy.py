@@ -3,7 +3,8 @@
 import pygame as pg
 import random
 from settings import * # 导入设置
-from utils import vec # 导入向量
+from utils import vec, lerp_xy # 导入向量
+from sprites import get_sprite
 
 class Enemy:
     def __init__(self, x_center, y_center):
@@ -16,35 +17,42 @@ class Enemy:
         self.rect = pg.Rect(0, 0, self.size, self.size)
         self.pos = vec(x_center, y_center) # 使用中心精确位置向量
         self.rect.center = self.pos
+        self.prev_xy = self.rect.topleft # 上一个模拟 tick 的左上角，绘制时插值用
         self.vel = vec(random.choice([-ENEMY_SPEED, ENEMY_SPEED]),
                        random.choice([-ENEMY_SPEED, ENEMY_SPEED])) # 初始随机速度
 
-    def update(self, wall_rects):
+    def update(self, maze, flow=None):
         """
         更新敌人位置，并处理与墙壁的碰撞反弹。
-        :param wall_rects: 包含所有墙壁 Rect 对象的列表
+        :param maze: 当前迷宫对象，通过 maze.walls_near 只查询附近单元格的墙壁
+        :param flow: 可选，朝向玩家的共享流场 (maze.flow_toward)；在其范围内时沿最短路径追踪玩家
         """
+        # --- 追踪：在流场范围内时按下一步单元格设置速度 ---
+        if flow is not None:
+            self._steer(flow)
+
         # --- 更新精确位置 ---
         self.pos += self.vel
 
         # --- 碰撞检测与位置修正 + 反弹 ---
         self.rect.centerx = self.pos.x
-        collided_x = self._collide_and_bounce(wall_rects, 'x')
+        collided_x = self._collide_and_bounce(maze.walls_near(self.rect), 'x')
         self.rect.centery = self.pos.y
-        collided_y = self._collide_and_bounce(wall_rects, 'y')
+        collided_y = self._collide_and_bounce(maze.walls_near(self.rect), 'y')
 
-        # --- 屏幕边界碰撞与反弹 ---
-        if self.rect.left < 0:
-            self.rect.left = 0
+        # --- 迷宫边界碰撞与反弹 (普通迷宫即屏幕范围) ---
+        bounds = maze.bounds
+        if self.rect.left < bounds.left:
+            self.rect.left = bounds.left
             if not collided_x: self.vel.x *= -1 # 如果不是因为撞墙而是撞屏幕边界
-        if self.rect.right > SCREEN_WIDTH:
-            self.rect.right = SCREEN_WIDTH
+        if self.rect.right > bounds.right:
+            self.rect.right = bounds.right
             if not collided_x: self.vel.x *= -1
-        if self.rect.top < 0:
-            self.rect.top = 0
+        if self.rect.top < bounds.top:
+            self.rect.top = bounds.top
             if not collided_y: self.vel.y *= -1
-        if self.rect.bottom > SCREEN_HEIGHT:
-            self.rect.bottom = SCREEN_HEIGHT
+        if self.rect.bottom > bounds.bottom:
+            self.rect.bottom = bounds.bottom
             if not collided_y: self.vel.y *= -1
 
         # --- 最后，根据修正后的 rect 更新精确位置 pos ---
@@ -52,10 +60,33 @@ class Enemy:
         self.pos.y = self.rect.centery
 
 
+    def _steer(self, flow):
+        """
+        私有方法：查询流场 (O(1)) 并把速度指向下一步单元格。
+        沿前进方向全速移动，同时在垂直方向向当前单元格中心靠拢，避免在拐角处蹭墙。
+        不在流场范围内时保持原速度 (随机游走)。
+        """
+        col, row = int(self.pos.x) // TILE_SIZE, int(self.pos.y) // TILE_SIZE
+        step = flow.step_from(col, row)
+        if step is None:
+            return
+        half = TILE_SIZE / 2
+        if step == (col, row):
+            # 已与目标在同一单元格：直接朝单元格中心移动
+            dx, dy = col * TILE_SIZE + half - self.pos.x, row * TILE_SIZE + half - self.pos.y
+            self.vel.x = max(-ENEMY_SPEED, min(ENEMY_SPEED, dx))
+            self.vel.y = max(-ENEMY_SPEED, min(ENEMY_SPEED, dy))
+        elif step[0] != col:
+            self.vel.x = ENEMY_SPEED if step[0] > col else -ENEMY_SPEED
+            self.vel.y = max(-ENEMY_SPEED, min(ENEMY_SPEED, row * TILE_SIZE + half - self.pos.y))
+        else:
+            self.vel.y = ENEMY_SPEED if step[1] > row else -ENEMY_SPEED
+            self.vel.x = max(-ENEMY_SPEED, min(ENEMY_SPEED, col * TILE_SIZE + half - self.pos.x))
+
     def _collide_and_bounce(self, wall_rects, direction):
         """
         私有方法：检测碰撞并反弹。
-        :param wall_rects: 墙壁 Rect 列表
+        :param wall_rects: 墙壁 Rect 列表 (通常是 maze.walls_near 返回的附近墙壁)
         :param direction: 'x' 或 'y'
         :return: True 如果发生碰撞，否则 False
         """
@@ -81,16 +112,53 @@ class Enemy:
         return collided
 
 
-    def draw(self, surface):
+    @staticmethod
+    def paint(surface, rect):
         """
-        在指定的 Surface 上绘制敌人。
+        用图元绘制敌人的外观 (只在生成精灵时调用一次)。
         :param surface: 目标 Surface
+        :param rect: 敌人在 surface 上的矩形
+        :return: 绘制覆盖的区域 (Rect)
         """
         # --- 绘制边框 ---
         border_size_increase = 1
-        border_rect = pg.Rect(0, 0, self.rect.width + border_size_increase * 2, self.rect.height + border_size_increase * 2)
-        border_rect.center = self.rect.center
-        pg.draw.rect(surface, COLOR_ENEMY_BORDER, border_rect, border_radius=5)
+        border_rect = pg.Rect(0, 0, rect.width + border_size_increase * 2, rect.height + border_size_increase * 2)
+        border_rect.center = rect.center
+        drawn = pg.draw.rect(surface, COLOR_ENEMY_BORDER, border_rect, border_radius=5)
 
         # --- 绘制敌人主体 ---
-        pg.draw.rect(surface, COLOR_ENEMY, self.rect, border_radius=5)
\ No newline at end of file
+        pg.draw.rect(surface, COLOR_ENEMY, rect, border_radius=5)
+        return drawn
+
+    @staticmethod
+    def sprite(size):
+        """边长为 size 的敌人精灵：(Surface, 相对 rect 左上角的偏移)。"""
+        return get_sprite(("enemy", size), lambda surface, anchor: Enemy.paint(surface, pg.Rect(anchor, (size, size))))
+
+    @staticmethod
+    def blit_sequence(enemies, offset=(0, 0), alpha=1.0):
+        """
+        一组敌人的 (精灵, 屏幕坐标) 列表，交给 Surface.blits 一次绘制。
+        :param enemies: 敌人列表
+        :param offset: 摄像机偏移 (像素)
+        :param alpha: 插值系数：在 prev_xy (0) 与当前位置 (1) 之间绘制
+        """
+        if not enemies:
+            return []
+        sprite, (dx, dy) = Enemy.sprite(enemies[0].size) # 所有敌人尺寸相同
+        if alpha < 1.0:
+            return [(sprite, (x + dx - offset[0], y + dy - offset[1]))
+                    for x, y in (lerp_xy(e.prev_xy, e.rect.topleft, alpha) for e in enemies)]
+        dx -= offset[0]
+        dy -= offset[1]
+        return [(sprite, (e.rect.x + dx, e.rect.y + dy)) for e in enemies]
+
+    def draw(self, surface, offset=(0, 0)):
+        """
+        在指定的 Surface 上绘制敌人 (blit 预渲染的精灵)。
+        :param surface: 目标 Surface
+        :param offset: 摄像机偏移 (像素)
+        :return: 绘制覆盖的屏幕区域 (Rect，供脏矩形刷新使用)
+        """
+        sprite, (dx, dy) = Enemy.sprite(self.size)
+        return surface.blit(sprite, (self.rect.x - offset[0] + dx, self.rect.y - offset[1] + dy))
\ No newline at end of file
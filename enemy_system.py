@@ -0,0 +1,251 @@
+# enemy_system.py - 结构数组 (SoA) 敌人系统：整批追踪、移动、撞墙反弹与边界反射
+
+import random
+import pygame as pg
+from settings import * # 导入设置
+from enemy import Enemy
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AVAILABLE = np is not None # 敌人系统依赖 NumPy
+
+def _round(values):
+    """与给 Rect 属性赋浮点数时相同的取整：四舍五入，.5 远离 0 (np.round 是四舍六入五成双，不能直接用)。"""
+    whole = np.trunc(values)
+    return (whole + np.sign(values) * (np.abs(values - whole) >= 0.5)).astype(np.int64)
+
+class EnemySystem:
+    """
+    用 NumPy 数组存储所有敌人的中心位置、速度、尺寸和碰撞矩形，代替一个个 Enemy 对象。
+    每个 tick 的流场追踪、移动、撞墙反弹和边界反射都是整批的数组运算，开销几乎与敌人数无关。
+
+    行为与逐个调用 Enemy.update 完全相同 (相同的初始随机速度、相同的取整、相同的反弹规则)：
+    先沿 x 再沿 y 移动矩形，每次只与矩形覆盖的单元格 (按行优先的第一个墙壁) 碰撞，
+    然后把矩形夹回迷宫边界；被移除的敌人压缩掉，其余敌人保持生成顺序 (命中判定依赖这个顺序)。
+    """
+
+    fields = ("pos", "vel", "size", "xy", "prev") # 每个敌人占一行的数组 (扩容、压缩时一起处理)
+
+    def __init__(self, capacity=64):
+        """:param capacity: 初始容量 (不够时自动翻倍)"""
+        if np is None:
+            raise ImportError("EnemySystem 需要 NumPy")
+        self.count = 0                                            # 敌人数
+        self.pos = self._alloc("pos", (capacity, 2), np.float64)  # 中心精确位置 (浮点)
+        self.vel = self._alloc("vel", (capacity, 2), np.float64)  # 速度 (像素/tick)
+        self.size = self._alloc("size", (capacity,), np.int64)    # 边长
+        self.xy = self._alloc("xy", (capacity, 2), np.int64)      # 碰撞矩形左上角 (与 Enemy.rect 相同)
+        self.prev = self._alloc("prev", (capacity, 2), np.int64)  # 上一个模拟 tick 的左上角 (snapshot 记录，绘制时插值用)
+
+    def _alloc(self, name, shape, dtype):
+        """
+        分配一个全零数组 (子类可改为分配在共享内存中，见 sharded_sim.ShardedEnemySystem)。
+        :param name: 数组名 (fields 之一)
+        """
+        return np.zeros(shape, dtype=dtype)
+
+    def _grow(self, capacity):
+        """把所有数组扩容到 capacity。"""
+        for name in self.fields:
+            old = getattr(self, name)
+            new = self._alloc(name, (capacity,) + old.shape[1:], old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        """移除所有敌人。"""
+        self.count = 0
+
+    def spawn(self, x_center, y_center):
+        """
+        生成一个敌人，与 Enemy(x_center, y_center) 相同 (初始速度消耗相同的全局随机数)。
+        :param x_center: 初始中心 x 坐标
+        :param y_center: 初始中心 y 坐标
+        """
+        if self.count == len(self.pos):
+            self._grow(len(self.pos) * 2)
+        i = self.count
+        size = int(TILE_SIZE * ENEMY_SIZE_FACTOR)
+        self.pos[i] = (x_center, y_center)
+        self.size[i] = size
+        self.xy[i] = self.prev[i] = _round(self.pos[i]) - size // 2
+        self.vel[i] = (random.choice([-ENEMY_SPEED, ENEMY_SPEED]),
+                       random.choice([-ENEMY_SPEED, ENEMY_SPEED])) # 初始随机速度
+        self.count += 1
+
+    def keep(self, mask):
+        """
+        只保留 mask 为 True 的敌人 (保持原有顺序)。
+        :param mask: 长度为敌人数的 bool 数组
+        """
+        n = int(mask.sum())
+        for name in self.fields:
+            array = getattr(self, name)
+            array[:n] = array[:self.count][mask]
+        self.count = n
+
+    def remove(self, indices):
+        """
+        移除一批敌人。
+        :param indices: 敌人下标的整数数组或序列
+        """
+        mask = np.ones(self.count, dtype=bool)
+        mask[np.asarray(indices, dtype=np.int64)] = False
+        self.keep(mask)
+
+    # --- 更新 ---
+
+    def update(self, maze, flow=None):
+        """
+        所有敌人前进一个 tick (与对每个敌人调用 Enemy.update 相同)。
+        :param maze: 当前迷宫对象 (需要 walls_at、bounds)
+        :param flow: 可选，朝向玩家的共享流场 (maze.flow_toward)；在其范围内的敌人沿最短路径追踪玩家
+        """
+        n = self.count
+        if n == 0:
+            return
+        pos, vel, xy = self.pos[:n], self.vel[:n], self.xy[:n]
+        half = self.size[:n] // 2
+        if flow is not None:
+            self._steer(flow)
+        pos += vel
+
+        # 先沿 x 再沿 y 移动矩形，各自处理撞墙反弹
+        xy[:, 0] = _round(pos[:, 0]) - half
+        collided_x = self._collide_and_bounce(maze, 0)
+        xy[:, 1] = _round(pos[:, 1]) - half
+        collided_y = self._collide_and_bounce(maze, 1)
+
+        # 迷宫边界：夹回边界内，不是因为撞墙时才反转速度
+        bounds = maze.bounds
+        size = self.size[:n]
+        for axis, low, high, collided in ((0, bounds.left, bounds.right, collided_x),
+                                          (1, bounds.top, bounds.bottom, collided_y)):
+            edge = xy[:, axis] < low
+            xy[edge, axis] = low
+            vel[edge & ~collided, axis] *= -1
+            edge = xy[:, axis] + size > high
+            xy[edge, axis] = high - size[edge]
+            vel[edge & ~collided, axis] *= -1
+
+        # 最后，根据修正后的矩形更新精确位置
+        pos[:] = xy + half[:, None]
+
+    def _steer(self, flow):
+        """
+        查询流场并把在其范围内的敌人的速度指向下一步单元格 (规则与 Enemy._steer 相同)。
+        """
+        n = self.count
+        pos = self.pos[:n]
+        cols = np.trunc(pos[:, 0]).astype(np.int64) // TILE_SIZE
+        rows = np.trunc(pos[:, 1]).astype(np.int64) // TILE_SIZE
+        step_cols, step_rows, found = flow.step_arrays(cols, rows)
+        if not found.any():
+            return
+        i = np.flatnonzero(found)
+        col, row, step_col, step_row = cols[i], rows[i], step_cols[i], step_rows[i]
+        half = TILE_SIZE / 2
+        # 向当前单元格中心靠拢的速度
+        to_x = np.clip(col * TILE_SIZE + half - pos[i, 0], -ENEMY_SPEED, ENEMY_SPEED)
+        to_y = np.clip(row * TILE_SIZE + half - pos[i, 1], -ENEMY_SPEED, ENEMY_SPEED)
+        here = (step_col == col) & (step_row == row)   # 已与目标在同一单元格
+        along_x = ~here & (step_col != col)            # 下一步在左右
+        along_y = ~here & ~along_x                     # 下一步在上下
+        self.vel[i, 0] = np.where(along_x, np.where(step_col > col, ENEMY_SPEED, -ENEMY_SPEED), to_x)
+        self.vel[i, 1] = np.where(along_y, np.where(step_row > row, ENEMY_SPEED, -ENEMY_SPEED), to_y)
+
+    def _collide_and_bounce(self, maze, axis):
+        """
+        检测碰撞并沿 axis 反弹 (规则与 Enemy._collide_and_bounce 相同)。
+        敌人边长不超过 TILE_SIZE，矩形最多覆盖 2x2 个单元格；按行优先取第一个墙壁单元格，
+        沿速度方向把矩形推到墙外并反转速度。
+        :param maze: 当前迷宫对象
+        :param axis: 0 表示 x，1 表示 y
+        :return: 每个敌人是否发生碰撞的 bool 数组
+        """
+        n = self.count
+        xy, size = self.xy[:n], self.size[:n]
+        # 矩形覆盖的单元格范围 (与 get_cell_span 相同地裁剪到网格内)
+        row_min, row_max = maze._row_limits()
+        first = xy // TILE_SIZE
+        last = (xy + (size[:, None] - 1)) // TILE_SIZE
+        c0, r0 = np.maximum(first[:, 0], 0), np.maximum(first[:, 1], row_min)
+        c1, r1 = np.minimum(last[:, 0], maze.grid_width - 1), np.minimum(last[:, 1], row_max)
+        inside = (c0 <= c1) & (r0 <= r1)
+        if maze.count_walls:
+            maze.walls_checked += int(((r1 - r0 + 1) * (c1 - c0 + 1))[inside].sum())
+
+        # 四个角的单元格按行优先排列，argmax 取第一个墙壁 (与 walls_near 的返回顺序相同)
+        cols = np.stack((c0, c1, c0, c1))
+        rows = np.stack((r0, r0, r1, r1))
+        walls = maze.walls_at(cols.ravel(), rows.ravel()).reshape(4, n) & inside
+        collided = walls.any(axis=0)
+        if not collided.any():
+            return collided
+        i = np.flatnonzero(collided)
+        wall = (cols if axis == 0 else rows)[walls[:, i].argmax(axis=0), i] * TILE_SIZE # 墙壁的左/上边
+        v = self.vel[i, axis]
+        s = size[i]
+        edge = np.where(v > 0, wall - s, np.where(v < 0, wall + TILE_SIZE, xy[i, axis]))
+        xy[i, axis] = edge
+        self.vel[i, axis] = -v # 反弹
+        self.pos[i, axis] = edge + s // 2
+        return collided
+
+    # --- 查询 ---
+
+    def boxes(self):
+        """所有敌人的碰撞矩形，(N, 4) 整数数组，每行为 (left, top, right, bottom)。"""
+        xy = self.xy[:self.count]
+        return np.concatenate((xy, xy + self.size[:self.count, None]), axis=1)
+
+    def rects(self):
+        """所有敌人的碰撞矩形 (Rect 列表，供逐个判定的代码使用)。"""
+        return [pg.Rect(x, y, s, s) for (x, y), s in zip(self.xy[:self.count].tolist(), self.size[:self.count].tolist())]
+
+    def overlapping(self, rect):
+        """
+        每个敌人的碰撞矩形是否与 rect 重叠 (与 Rect.colliderect 相同)。
+        :return: bool 数组
+        """
+        xy, size = self.xy[:self.count], self.size[:self.count]
+        return ((xy[:, 0] < rect.right) & (xy[:, 0] + size > rect.left) &
+                (xy[:, 1] < rect.bottom) & (xy[:, 1] + size > rect.top))
+
+    def snapshot(self):
+        """记录所有敌人当前的位置，作为下一个 tick 之后插值绘制的起点。"""
+        self.prev[:self.count] = self.xy[:self.count]
+
+    # --- 绘制 ---
+
+    def blit_sequence(self, offset=(0, 0), alpha=1.0):
+        """
+        所有敌人的 (精灵, 屏幕坐标) 列表 (与 Enemy 共用精灵)，交给 Surface.blits 一次绘制。
+        :param offset: 摄像机偏移 (像素)
+        :param alpha: 插值系数：在 snapshot 记录的位置 (0) 与当前位置 (1) 之间绘制
+        """
+        n = self.count
+        if n == 0:
+            return []
+        sprite, (dx, dy) = Enemy.sprite(int(self.size[0])) # 所有敌人尺寸相同
+        xy = self.xy[:n]
+        if alpha < 1.0:
+            prev = self.prev[:n]
+            xy = prev + np.round((xy - prev) * alpha).astype(np.int64) # 与 lerp_xy 相同的取整
+        corners = xy + (dx - offset[0], dy - offset[1])
+        return [(sprite, corner) for corner in map(tuple, corners.tolist())]
+
+    def draw(self, surface, offset=(0, 0)):
+        """
+        绘制所有敌人。
+        :param surface: 目标 Surface
+        :param offset: 摄像机偏移 (像素)
+        :return: 每个敌人绘制覆盖的屏幕区域 (Rect 列表)
+        """
+        return surface.blits(self.blit_sequence(offset))
@@ -0,0 +1,127 @@
+# flow_field.py - 共享的 BFS 流场：所有敌人 O(1) 查询朝向玩家的下一步
+
+from settings import * # 导入设置
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class FlowField:
+    """
+    以目标单元格 (通常是玩家所在单元格) 为源点的 BFS 距离场。
+    每个可达单元格记录到目标的步数和“下一步”单元格 (BFS 树中的父节点)，
+    敌人只需查表即可沿最短路径前进，追踪开销与敌人数量无关。
+
+    只有目标进入新的单元格时才重新计算；radius 限制 BFS 的步数，
+    使一次重新计算只访问目标附近的单元格 (与迷宫尺寸无关)，范围外的敌人保持原来的游走。
+    """
+
+    def __init__(self, maze, radius=ENEMY_CHASE_RADIUS):
+        """
+        :param maze: 提供 grid_width、_row_limits() 和 _row_cells(row) 的迷宫 (Maze 或 EndlessMaze)
+        :param radius: BFS 的最大步数；None 表示遍历整个连通区域
+        """
+        self.maze = maze
+        self.radius = radius
+        self.target = None   # 目标单元格 (列, 行)；None 表示需要重新计算
+        self.dist = {}       # (列, 行) -> 到目标的步数
+        self.next_step = {}  # (列, 行) -> 朝目标前进的下一个单元格 (目标单元格指向自身)
+        self.recomputes = 0  # 重新计算的次数 (供基准测试/分析器参考)
+        self._table = None   # step_arrays 使用的有序查找表 (重新计算后清空)
+
+    def invalidate(self):
+        """迷宫布局改变 (set_cell、区块生成/回收) 后调用，下次 update 时强制重新计算。"""
+        self.target = None
+
+    def update(self, pos):
+        """
+        把目标移到像素坐标 pos 所在的单元格；仍在同一单元格时不做任何计算。
+        :param pos: 目标的像素坐标 (x, y)
+        :return: True 如果重新计算了流场
+        """
+        cell = (int(pos[0]) // TILE_SIZE, int(pos[1]) // TILE_SIZE)
+        if cell == self.target:
+            return False
+        self.target = cell
+        self._compute(cell)
+        self.recomputes += 1
+        return True
+
+    def _compute(self, target):
+        """从 target 出发逐层 BFS，最多扩展 radius 层。"""
+        maze = self.maze
+        w = maze.grid_width
+        row_min, row_max = maze._row_limits()
+        dist, next_step = {}, {}
+        self.dist, self.next_step = dist, next_step
+        self._table = None
+        if maze.is_wall(*target):
+            return
+
+        dist[target] = 0
+        next_step[target] = target
+        frontier = [target]
+        depth = 0
+        while frontier and (self.radius is None or depth < self.radius):
+            depth += 1
+            new_frontier = []
+            for cell in frontier:
+                c, r = cell
+                for nc, nr in ((c + 1, r), (c - 1, r), (c, r + 1), (c, r - 1)):
+                    if (nc, nr) in dist or not (0 <= nc < w and row_min <= nr <= row_max):
+                        continue
+                    buf, base = maze._row_cells(nr)
+                    if buf[base + nc] == CELL_WALL:
+                        continue
+                    dist[(nc, nr)] = depth
+                    next_step[(nc, nr)] = cell
+                    new_frontier.append((nc, nr))
+            frontier = new_frontier
+
+    def step_from(self, col, row):
+        """
+        查询单元格 (col, row) 朝目标前进的下一个单元格。
+        :return: (列, 行)；不在流场范围内时返回 None
+        """
+        return self.next_step.get((col, row))
+
+    def table(self):
+        """
+        step_arrays 使用的查找表 (需要 NumPy)，重新计算后首次调用时生成。
+        :return: (按 行 * 宽 + 列 排序的键数组, 对应的下一步 (列, 行) 数组)
+        """
+        if self._table is None:
+            w = self.maze.grid_width
+            cells = sorted(self.next_step.items(), key=lambda item: item[0][1] * w + item[0][0])
+            keys = np.array([r * w + c for (c, r), _ in cells], dtype=np.int64)
+            steps = np.array([step for _, step in cells], dtype=np.int64).reshape(-1, 2)
+            self._table = keys, steps
+        return self._table
+
+    def step_arrays(self, cols, rows):
+        """
+        step_from 的批量版本 (需要 NumPy)：在有序查找表中二分查找。
+        :param cols: 列下标的整数数组
+        :param rows: 行下标的整数数组
+        :return: (下一步列数组, 下一步行数组, 是否在流场范围内的 bool 数组)
+        """
+        keys, steps = self.table()
+        return lookup_steps(keys, steps, self.maze.grid_width, cols, rows)
+
+def lookup_steps(keys, steps, width, cols, rows):
+    """
+    在流场查找表 (FlowField.table) 中批量查询下一步单元格。
+    :param keys: 有序的 行 * 宽 + 列 键数组
+    :param steps: 对应的下一步 (列, 行) 数组
+    :param width: 迷宫网格宽度
+    :param cols: 列下标的整数数组
+    :param rows: 行下标的整数数组
+    :return: (下一步列数组, 下一步行数组, 是否在流场范围内的 bool 数组)
+    """
+    if len(keys) == 0: # 目标在墙里，流场为空
+        return cols, rows, np.zeros(len(cols), dtype=bool)
+    query = rows * width + cols
+    pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+    found = (cols >= 0) & (cols < width) & (keys[pos] == query)
+    return steps[pos, 0], steps[pos, 1], found
@@ -0,0 +1,138 @@
+# headless.py - 无界面、不限帧率的模拟模式
+# 用于在没有显示器的 CI 机器上对关卡生成和碰撞逻辑做压力测试，并测量每秒模拟的 tick 数。
+# 用法: python headless.py --ticks 20000 [--endless] [--seed 1] [--idle]
+#       python headless.py --replay replays/ [更多日志文件或目录 ...]  (按录制的输入日志重放并检查结果)
+
+import os
+# 必须在导入 pygame 之前设置：即使有代码意外访问显示/音频，也只会用到虚拟驱动
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import sys
+import argparse
+import random
+from pathlib import Path
+import pygame as pg
+from settings import *
+from utils import KeyState, NO_KEYS
+from main import Game
+from input_log import InputLog, final_state
+
+# 随机脚本可以按下的移动键
+MOVE_KEYS = (pg.K_LEFT, pg.K_RIGHT, pg.K_UP, pg.K_DOWN)
+
+def random_input_script(seed=0, hold_ticks=12, shoot_chance=0.3, sprint_chance=0.2):
+    """
+    生成一个确定性的随机输入脚本：每隔 hold_ticks 个 tick 随机换一组按键。
+    :param seed: 随机种子 (与游戏本身的随机数相互独立)
+    :param hold_ticks: 每组按键保持的 tick 数
+    :param shoot_chance: 每组按键中包含射击键的概率
+    :param sprint_chance: 每组按键中包含加速键的概率
+    :return: callable(tick) -> KeyState
+    """
+    rng = random.Random(seed)
+    current = [NO_KEYS]
+
+    def script(tick):
+        if tick % hold_ticks == 0:
+            pressed = set(rng.sample(MOVE_KEYS, rng.randint(0, 2)))
+            if rng.random() < shoot_chance:
+                pressed.add(pg.K_o)
+            if rng.random() < sprint_chance:
+                pressed.add(pg.K_LSHIFT)
+            current[0] = KeyState(pressed)
+        return current[0]
+
+    return script
+
+def run_simulation(ticks, endless=False, seed=None, input_script=None):
+    """
+    创建一个无界面的 Game 并模拟 ticks 次。
+    :param ticks: 模拟的 tick 数
+    :param endless: 是否使用无尽模式
+    :param seed: 可选，全局随机种子 (影响迷宫和敌人)
+    :param input_script: 可选，callable(tick) -> 按键状态；None 表示不按任何键
+    :return: Game.simulate 返回的统计信息
+    """
+    if seed is not None:
+        random.seed(seed)
+    game = Game(endless=endless, headless=True)
+    try:
+        return game.simulate(ticks, input_script)
+    finally:
+        _close(game)
+
+def replay_log(path):
+    """
+    按输入日志无界面、不限帧率地重放录制的一局，并检查结束状态是否与录制时一致。
+    :param path: 输入日志文件路径
+    :return: Game.simulate 的统计信息，另加 expected / actual (FinalState) 与 match
+    """
+    log = InputLog.load(path)
+    if log.sim_rate != SIM_RATE:
+        print(f"警告：{path} 录制时 SIM_RATE = {log.sim_rate}，当前为 {SIM_RATE}，回放结果可能不一致")
+    game = Game(endless=log.endless, headless=True, run_seed=log.run_seed)
+    try:
+        # 还原这一局开始时的条件，再逐 tick 输入录制的按键
+        game.current_level = log.start_level
+        game.sim_time = log.start_sim_time
+        game.start_session(log.endless, log.random_seed)
+        stats = game.simulate(log.ticks, log.key_states().__getitem__, auto_restart=False)
+        stats["actual"] = final_state(game)
+    finally:
+        _close(game)
+    stats["expected"] = log.final
+    stats["match"] = stats["actual"] == log.final
+    return stats
+
+def _close(game):
+    """停止 Game 的后台线程。"""
+    game.level_prefetcher.close()
+
+def _log_paths(paths):
+    """把命令行给出的文件和目录 (目录下所有 *.mzin) 展开为日志文件列表。"""
+    files = []
+    for path in map(Path, paths):
+        files += sorted(path.glob("*.mzin")) if path.is_dir() else [path]
+    return files
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面、不限帧率地运行游戏模拟")
+    parser.add_argument("--ticks", type=int, default=10000, help="模拟的 tick 数")
+    parser.add_argument("--endless", action="store_true", help="使用无尽模式")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子")
+    parser.add_argument("--idle", action="store_true", help="不使用随机输入脚本 (玩家不动)")
+    parser.add_argument("--replay", nargs="+", metavar="LOG", help="重放输入日志 (文件或目录) 并检查结束状态")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        return replay_main(_log_paths(args.replay))
+
+    script = None if args.idle else random_input_script(args.seed or 0)
+    stats = run_simulation(args.ticks, args.endless, args.seed, script)
+    print(f"模拟 {stats['ticks']} ticks，用时 {stats['seconds']:.2f} 秒，"
+          f"{stats['ticks_per_sec']:.0f} ticks/秒，通过关卡 {stats['levels']}，死亡 {stats['deaths']} 次")
+    p = stats["prefetch"]
+    print(f"关卡预生成: 缓存 {p['cached']}，就绪 {p['ready']}，等待 {p['waited']} ({p['wait_ms']:.1f} ms)，同步 {p['sync']}，首次 {p['cold']}")
+    return stats
+
+def replay_main(paths):
+    """逐个重放输入日志，打印速度和结果；有任何一个结束状态不一致时以状态码 1 退出。"""
+    results, mismatched = [], 0
+    for path in paths:
+        stats = replay_log(path)
+        results.append(stats)
+        print(f"回放 {path}: {stats['ticks']} ticks，用时 {stats['seconds']:.2f} 秒，{stats['ticks_per_sec']:.0f} ticks/秒，"
+              f"结束状态{'一致' if stats['match'] else '不一致'}")
+        if not stats["match"]:
+            mismatched += 1
+            for field, expected, actual in zip(stats["expected"]._fields, stats["expected"], stats["actual"]):
+                if expected != actual:
+                    print(f"    {field}: 录制 {expected}，回放 {actual}")
+    if mismatched:
+        print(f"{mismatched}/{len(paths)} 个日志的回放结果与录制时不一致")
+        sys.exit(1)
+    return results
+
+if __name__ == '__main__':
+    main()
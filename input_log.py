@@ -0,0 +1,181 @@
+# input_log.py - 输入记录：种子 + 逐 tick 按键位掩码 (游程编码) 的紧凑二进制日志，用于确定性回放
+
+import zlib
+import struct
+from collections import namedtuple
+from pathlib import Path
+import pygame as pg
+from settings import * # 导入设置
+from utils import KeyState
+
+# 影响模拟的按键 (Player.handle_input 读取的全部按键)，下标即位掩码中的位号。只能在末尾追加，否则旧日志无法回放
+INPUT_KEYS = (pg.K_LEFT, pg.K_RIGHT, pg.K_UP, pg.K_DOWN,
+              pg.K_a, pg.K_d, pg.K_w, pg.K_s,
+              pg.K_LSHIFT, pg.K_p, pg.K_o)
+
+GAME_STATES = ("START", "PLAYING", "GAME_OVER", "WIN") # 游戏状态 <-> 结束状态中的编码
+
+# --- 二进制格式 ---
+# 文件 = 48 字节的文件头 + 28 字节的结束状态 + 若干段 (按键位掩码, 持续 tick 数)，全部为小端定长字段。
+# 一段最长 65535 个 tick，更长的相同输入拆成多段；按键通常保持几十个 tick 不变，一分钟的游戏只有几百字节。
+
+LOG_MAGIC = b"MZIN"
+LOG_FORMAT_VERSION = 1
+# 魔数, 版本, 标志位, 本局种子, 全局随机数种子, 起始关卡, tick 数, 起始模拟时钟 (毫秒), 段数, 模拟频率
+LOG_HEADER_FORMAT = "<4sHHQQIIdII"
+LOG_HEADER_SIZE = struct.calcsize(LOG_HEADER_FORMAT)
+FLAG_ENDLESS = 1
+# 关卡, 游戏状态, 玩家左上角 x/y, 敌人数, 射弹数, 位置校验和
+FINAL_FORMAT = "<IB3xiiIII"
+FINAL_SIZE = struct.calcsize(FINAL_FORMAT)
+RUN_FORMAT = "<HH"
+RUN_SIZE = struct.calcsize(RUN_FORMAT)
+MAX_RUN = 0xFFFF
+
+# 一局结束时的游戏状态摘要：回放结束后逐项比较，checksum 覆盖玩家、所有敌人和射弹的位置
+FinalState = namedtuple("FinalState", "level state player_x player_y enemies projectiles checksum")
+
+def encode_keys(keys):
+    """
+    把按键状态压缩为位掩码。
+    :param keys: 支持 keys[pg.K_x] 索引的按键状态 (pg.key.get_pressed() 或 KeyState)
+    :return: 整数位掩码 (第 i 位对应 INPUT_KEYS[i])
+    """
+    mask = 0
+    for bit, key in enumerate(INPUT_KEYS):
+        if keys[key]:
+            mask |= 1 << bit
+    return mask
+
+_key_states = {} # 位掩码 -> KeyState (回放时相同的输入共用一个对象)
+
+def decode_keys(mask):
+    """encode_keys 的逆操作。:return: KeyState"""
+    state = _key_states.get(mask)
+    if state is None:
+        state = KeyState(key for bit, key in enumerate(INPUT_KEYS) if mask >> bit & 1)
+        _key_states[mask] = state
+    return state
+
+def final_state(game):
+    """
+    计算游戏当前状态的摘要 (录制结束时写入日志，回放结束时用来比较)。
+    :param game: Game 对象
+    :return: FinalState
+    """
+    player = game.player
+    values = list(player.rect.topleft) if player else []
+    enemies = game.enemies
+    if game.use_enemy_system:
+        values += enemies.xy[:len(enemies)].ravel().tolist()
+    else:
+        for enemy in enemies:
+            values += enemy.rect.topleft
+    projectiles = game.projectiles
+    if game.use_projectile_pool:
+        centers = [rect.center for _, rect in projectiles._scalar_rects(projectiles._live())] # 按发射顺序
+    else:
+        centers = [projectile.rect.center for projectile in projectiles]
+    for center in centers:
+        values += center
+    checksum = zlib.crc32(struct.pack(f"<{len(values)}i", *values))
+    x, y = player.rect.topleft if player else (0, 0)
+    return FinalState(game.current_level, GAME_STATES.index(game.game_state), x, y,
+                      len(enemies), len(projectiles), checksum)
+
+class InputLog:
+    """
+    一局游戏的输入日志：重现这一局所需的全部初始条件 (本局种子、全局随机数种子、起始关卡、起始模拟时钟)，
+    加上每个模拟 tick 的按键位掩码 (相邻相同的合并为一段) 和这一局结束时的状态摘要。
+    迷宫由本局种子和关卡号确定，敌人的初始速度等取自按全局随机数种子重新播种的 random，
+    因此按相同的输入逐 tick 推进就能得到完全相同的结果。
+    """
+
+    def __init__(self, run_seed, random_seed, endless=False, start_level=1, start_sim_time=0.0, sim_rate=SIM_RATE):
+        """
+        :param run_seed: 本局种子 (Game.run_seed)
+        :param random_seed: 这一局开始时全局 random 的种子
+        :param endless: 是否为无尽模式
+        :param start_level: 起始关卡
+        :param start_sim_time: 这一局开始时的模拟时钟 (毫秒，射击冷却依赖它)
+        :param sim_rate: 录制时的 SIM_RATE (每个 tick 的时长不同时无法重现)
+        """
+        self.run_seed = run_seed
+        self.random_seed = random_seed
+        self.endless = endless
+        self.start_level = start_level
+        self.start_sim_time = start_sim_time
+        self.sim_rate = sim_rate
+        self.ticks = 0
+        self.runs = []     # [[位掩码, 持续 tick 数], ...]
+        self.final = None  # 结束状态 (FinalState)，录制结束时设置
+
+    def record(self, keys):
+        """
+        记录一个 tick 的按键状态。
+        :param keys: 支持 keys[pg.K_x] 索引的按键状态
+        """
+        mask = encode_keys(keys)
+        runs = self.runs
+        if runs and runs[-1][0] == mask and runs[-1][1] < MAX_RUN:
+            runs[-1][1] += 1
+        else:
+            runs.append([mask, 1])
+        self.ticks += 1
+
+    def key_states(self):
+        """展开为逐 tick 的按键状态列表 (KeyState)，供 Game.simulate 的输入脚本使用。"""
+        states = []
+        for mask, length in self.runs:
+            states += [decode_keys(mask)] * length
+        return states
+
+    def pack(self):
+        """序列化为二进制格式。:return: bytes"""
+        final = self.final or FinalState(0, 0, 0, 0, 0, 0, 0)
+        header = struct.pack(LOG_HEADER_FORMAT, LOG_MAGIC, LOG_FORMAT_VERSION,
+                             FLAG_ENDLESS if self.endless else 0,
+                             self.run_seed, self.random_seed, self.start_level,
+                             self.ticks, self.start_sim_time, len(self.runs), self.sim_rate)
+        return b"".join([header, struct.pack(FINAL_FORMAT, *final)] +
+                        [struct.pack(RUN_FORMAT, mask, length) for mask, length in self.runs])
+
+    def save(self, path):
+        """
+        写入文件 (先写临时文件再替换)。
+        :param path: 文件路径
+        :return: 文件路径 (Path)
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(self.pack())
+        tmp.replace(path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """
+        读取日志文件。
+        :raises ValueError: 文件不是本格式、版本不支持或数据不完整
+        :return: InputLog
+        """
+        data = Path(path).read_bytes()
+        if len(data) < LOG_HEADER_SIZE + FINAL_SIZE:
+            raise ValueError(f"输入日志过短: {path}")
+        (magic, version, flags, run_seed, random_seed, start_level,
+         ticks, start_sim_time, run_count, sim_rate) = struct.unpack_from(LOG_HEADER_FORMAT, data, 0)
+        if magic != LOG_MAGIC:
+            raise ValueError(f"不是输入日志: {path}")
+        if version != LOG_FORMAT_VERSION:
+            raise ValueError(f"不支持的输入日志版本 {version}: {path}")
+        runs_offset = LOG_HEADER_SIZE + FINAL_SIZE
+        if len(data) < runs_offset + run_count * RUN_SIZE:
+            raise ValueError(f"输入日志数据不完整: {path}")
+        log = cls(run_seed, random_seed, bool(flags & FLAG_ENDLESS), start_level, start_sim_time, sim_rate)
+        log.final = FinalState(*struct.unpack_from(FINAL_FORMAT, data, LOG_HEADER_SIZE))
+        log.runs = [list(run) for run in struct.iter_unpack(RUN_FORMAT, data[runs_offset:runs_offset + run_count * RUN_SIZE])]
+        log.ticks = sum(length for _, length in log.runs)
+        if log.ticks != ticks:
+            raise ValueError(f"输入日志的 tick 数不一致 ({log.ticks} != {ticks}): {path}")
+        return log
@@ -0,0 +1,159 @@
+# level_prefetch.py - 在后台线程中预生成下一关，切换关卡时直接换上
+
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from settings import * # 导入设置
+from maze import Maze
+from maze_store import MazeCache
+
+def build_level(seed, width=GRID_WIDTH, height=GRID_HEIGHT, bake=True, cache=None):
+    """
+    生成一关的迷宫及其派生数据：分析索引、出生点列表，以及 (可选的) 预渲染图层。
+    在工作线程中运行，因此只使用由 seed 派生的迷宫专用随机数源，不碰全局 random；
+    图层也不转换为屏幕像素格式 (Surface.convert 依赖显示)，由 LevelPrefetcher.take 在主线程中转换。
+    :param seed: 迷宫种子
+    :param width: 网格宽度
+    :param height: 网格高度
+    :param bake: 是否预渲染迷宫图层 (无界面模式不需要)
+    :param cache: 可选，MazeCache；设置了磁盘缓存目录时优先从文件读取
+    :return: Maze
+    """
+    if cache is not None:
+        maze = cache.load_or_build(seed, width, height)
+    else:
+        maze = Maze(width, height, seed=seed)
+    maze.analytics       # 构建并缓存分析索引
+    maze.spawn_sampler   # 生成出生点候选列表
+    if bake:
+        maze._bake_surface(convert=False)
+    return maze
+
+
+def _release(maze):
+    """在工作线程中丢弃旧迷宫：先断开流场的循环引用，使其立即按引用计数释放。"""
+    maze._flow_field = None
+
+
+class LevelPrefetcher:
+    """
+    当前关卡开始后立即在工作线程中生成下一关的迷宫，到达出口 (或重开) 时 take() 直接取走，
+    换下来的旧迷宫也交给工作线程释放 (retire)。
+    每个迷宫由一个种子完全确定，无论是后台生成、同步生成还是从缓存取出，得到的迷宫都相同。
+    取走的迷宫放入 LRU 缓存 (MazeCache)，重开同一关卡 (同一种子) 时直接复用。
+
+    take() 的结果计入 stats：
+      cached 缓存中已有该种子的迷宫
+      ready  后台已生成完毕，直接换上
+      waited 后台仍在生成，等待其完成 (等待时间计入 wait_ms)
+      sync   后台未启动或失败 / 预生成被禁用，在主线程同步生成 (耗时计入 sync_ms)
+      cold   没有预生成任务 (第一关)，同步生成
+    """
+
+    def __init__(self, enabled=LEVEL_PREFETCH, bake=True, size=(GRID_WIDTH, GRID_HEIGHT), cache=None):
+        """
+        :param enabled: 是否启用后台预生成
+        :param bake: 是否在后台预渲染迷宫图层
+        :param size: 迷宫的网格尺寸 (宽, 高)
+        :param cache: 可选，MazeCache；None 表示按 settings 新建
+        """
+        self.enabled = enabled
+        self.size = size
+        self.bake = bake
+        self.cache = MazeCache(directory=MAZE_CACHE_DIR) if cache is None else cache
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-prefetch") if enabled else None
+        self._seed = None   # 已预定的下一关种子
+        self._future = None # 后台任务
+        self.stats = {"cached": 0, "ready": 0, "waited": 0, "sync": 0, "cold": 0, "wait_ms": 0.0, "sync_ms": 0.0}
+
+    def _cache_key(self, seed):
+        return self.cache.key(seed, *self.size)
+
+    def prefetch(self, seed):
+        """
+        预定下一关 (种子为 seed) 并在后台开始生成；之前未取走的其他种子的结果被丢弃。
+        已预定同一种子或缓存中已有该迷宫时不做任何事。
+        :param seed: 下一关的迷宫种子
+        """
+        if seed == self._seed or self._cache_key(seed) in self.cache:
+            return
+        if self._future is not None:
+            self._future.cancel()
+        self._seed = seed
+        self._future = (self._executor.submit(build_level, seed, *self.size, self.bake, self.cache)
+                        if self._executor else None)
+
+    def take(self, seed=None):
+        """
+        取得种子为 seed 的迷宫 (结果放入缓存)。在主线程调用：后台预渲染的图层在这里转换为屏幕像素格式。
+        :param seed: 迷宫种子；None 表示取走已预定的下一关，没有预定时随机选一个种子
+        :return: Maze
+        """
+        if seed is None:
+            seed = self._seed
+        maze = self.cache.get(self._cache_key(seed)) if seed is not None else None
+        if maze is not None:
+            self.stats["cached"] += 1
+            return maze
+        maze = self._build(seed)
+        maze.convert_surface()
+        for old in self.cache.put(maze):
+            self.retire(old)
+        return maze
+
+    def _build(self, seed):
+        """取走后台结果，或在主线程中生成种子为 seed 的迷宫。"""
+        if seed is None:
+            self.stats["cold"] += 1
+            return build_level(random.getrandbits(64), *self.size, self.bake, self.cache)
+        if seed != self._seed: # 与预定的种子不同，保留预定，直接同步生成
+            future = None
+        else:
+            future = self._future
+            self._seed = self._future = None
+
+        if future is not None and not future.cancel(): # 已在运行或已完成
+            done = future.done()
+            start = time.perf_counter()
+            try:
+                maze = future.result()
+            except Exception as e:
+                print(f"警告：后台生成关卡失败 ({e})，改为同步生成。")
+            else:
+                if done:
+                    self.stats["ready"] += 1
+                else:
+                    self.stats["waited"] += 1
+                    self.stats["wait_ms"] += (time.perf_counter() - start) * 1000
+                return maze
+
+        start = time.perf_counter()
+        maze = build_level(seed, *self.size, self.bake, self.cache)
+        self.stats["sync"] += 1
+        self.stats["sync_ms"] += (time.perf_counter() - start) * 1000
+        return maze
+
+    def retire(self, maze):
+        """
+        把换下来的旧迷宫交给工作线程释放。大迷宫的距离场、坐标列表等有上百万个对象，
+        在主线程中释放同样会造成卡顿；预生成被禁用时直接在主线程释放。
+        :param maze: 旧迷宫 (可为 None)；仍在缓存中的迷宫不释放
+        """
+        if maze is None or self.cache.holds(maze):
+            return
+        if self._executor is not None:
+            self._executor.submit(_release, maze)
+        else:
+            _release(maze)
+
+    def summary(self):
+        """一行统计摘要。"""
+        s = self.stats
+        return (f"关卡预生成: 缓存 {s['cached']} 次，就绪 {s['ready']} 次，等待 {s['waited']} 次 ({s['wait_ms']:.1f} ms)，"
+                f"同步 {s['sync']} 次 ({s['sync_ms']:.1f} ms)，首次 {s['cold']} 次")
+
+    def close(self):
+        """停止工作线程 (丢弃尚未开始的任务)。"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,42 +1,140 @@
 # game.py - 主游戏逻辑和循环
 
+import time
+_STARTUP_T0 = time.perf_counter() # 启动计时的起点 (导入 pygame 和游戏模块之前)
+
 import pygame as pg
 import sys
 import random
 
 # 从其他模块导入类和设置
 from settings import *
-from utils import draw_text, vec
-from maze import Maze
+from utils import draw_text, prewarm_fonts, vec, lerp_xy, NO_KEYS
+from endless_maze import EndlessMaze
 from player import Player
 from enemy import Enemy
-# Projectile 类在 Player shoot 时被实例化，这里不需要直接导入
+from profiler import FrameProfiler, StartupTimer
+from projectile import Projectile
+from spatial_hash import SpatialHash
+from level_prefetch import LevelPrefetcher
+from dirty_rects import DirtyRectRenderer
+from maze_store import level_seed
+from input_log import InputLog, final_state
 
 class Game:
-    def __init__(self):
-        """初始化 Pygame、屏幕、时钟和游戏变量。"""
-        pg.init()
-        pg.mixer.init() # 初始化音频（如果需要）
-        self.screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        pg.display.set_caption(GAME_TITLE)
+    def __init__(self, endless=ENDLESS_MODE, headless=False, run_seed=RUN_SEED):
+        """
+        初始化 Pygame、屏幕、时钟和游戏变量。
+        :param endless: 是否使用无尽模式 (流式分块迷宫)
+        :param headless: 无界面模式：不初始化任何 Pygame 子系统、不打开窗口，
+                         只能通过 simulate() 以脚本输入推进模拟 (见 headless.py)
+        :param run_seed: 本局种子，每关的迷宫由它和关卡号确定；None 表示从全局 random 中抽取
+        """
+        self.startup = StartupTimer(_STARTUP_T0) # 启动各阶段耗时，首帧后打印
+        self.startup.mark("imports")
+        self.headless = headless
+        self.font_prewarm = None  # 字体预热线程
+        if headless:
+            self.screen = None # 无界面模式不渲染
+        else:
+            # 只初始化用到的子系统：显示 (含事件和键盘) 与字体；游戏不使用音频和手柄，不调用 pg.init()
+            pg.display.init()
+            pg.font.init()
+            self.startup.mark("pygame_init")
+            self.font_prewarm = prewarm_fonts() # 打开窗口的同时在后台加载各字号的字体
+            self.screen = pg.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+            pg.display.set_caption(GAME_TITLE)
+            self.startup.mark("window")
         self.clock = pg.time.Clock()
+        # 脏矩形刷新：普通迷宫中只重绘和提交实体移动过的区域 (None 表示每帧整屏重绘并 flip)
+        self.dirty_rects = DirtyRectRenderer() if DIRTY_RECTS and not headless else None
+        self.sim_time = 0         # 模拟时钟 (毫秒)，每个 tick 前进 1000 / SIM_RATE
+        # 固定时间步长主循环的统计：渲染帧数、模拟 tick 数、补跑多个 tick 的帧数、因达到上限而丢弃的积压时间
+        self.loop_stats = {"frames": 0, "ticks": 0, "catchup_frames": 0, "dropped_ms": 0.0}
+        self.keys = None          # 脚本输入的按键状态；None 表示读取真实键盘
+        self.session_seed = None  # 这一局开始时全局 random 的种子 (见 start_session)
+        self.input_log = None     # 正在录制的输入日志 (INPUT_RECORDING 打开时每局一个)
+        self.profiler = FrameProfiler(PROFILER_ENABLED, PROFILER_EXPORT and not headless) # 帧阶段性能分析
         self.running = True
         self.game_state = "START" # 游戏状态: START, PLAYING, GAME_OVER, WIN
 
         self.maze = None          # 当前迷宫对象
         self.player = None        # 玩家对象
-        self.enemies = []         # 敌人对象列表
-        self.projectiles = []     # 射弹对象列表
+        self.enemies = []         # 敌人存储：Enemy 对象列表，或敌人很多时的结构数组敌人系统 (见 reset_game)
+        self.use_enemy_system = False
+        self.enemy_chase = ENEMY_CHASE and ENEMY_CHASE_RADIUS > 0 # 敌人是否沿流场追踪玩家
+        self.use_projectile_pool = False
+        self.projectiles = []     # 射弹存储：Projectile 对象列表，第一次开局时换成射弹池 (见 _select_projectile_storage)
+        self.endless = endless    # 是否为无尽模式
+        self.camera = vec(0, 0)   # 摄像机偏移 (世界像素坐标 - 屏幕坐标)，普通迷宫恒为 (0, 0)
+        self.wall_impacts = []    # 本 tick 射弹撞墙的位置 [(x, y)] (射弹中心，可用于特效)
+        self.prev_offset = (0, 0) # 上一个模拟 tick 的摄像机偏移 (像素)，绘制时插值用
 
         # !! 新增：初始化关卡数 !!
         self.current_level = 1
+        # 本局种子：报告问题时附上它 (或当前关卡的迷宫种子) 即可复现迷宫
+        self.run_seed = random.getrandbits(32) if run_seed is None else run_seed
+        self.level_seed = None    # 当前关卡的迷宫种子
+        print(f"本局种子: {self.run_seed}")
+        # 下一关的迷宫在后台线程中预生成 (无界面模式不需要预渲染图层)
+        self.level_prefetcher = LevelPrefetcher(bake=not headless)
+        # 第一关的迷宫也在后台生成，不占用启动时间 (玩家在开始界面按下 Enter 时通常已经就绪)
+        self.level_prefetcher.prefetch(level_seed(self.run_seed, self.current_level))
+        self.startup.mark("game_init")
+
+    def start_session(self, endless, session_seed=None):
+        """
+        从开始界面开始一局。先给全局 random 重新播种 (敌人的初始速度、无尽模式的区块都取自它)，
+        这一局就完全由本局种子、该种子、起始关卡、起始模拟时钟和逐 tick 的输入决定，可以录制并回放。
+        :param endless: 是否为无尽模式
+        :param session_seed: 可选，全局 random 的种子 (回放时传入日志中的种子)；None 表示随机选择
+        """
+        self.endless = endless
+        self.session_seed = random.getrandbits(64) if session_seed is None else session_seed
+        random.seed(self.session_seed)
+        if INPUT_RECORDING and not self.headless:
+            self.input_log = InputLog(self.run_seed, self.session_seed, endless, self.current_level, self.sim_time)
+        self.reset_game()
+
+    def finish_recording(self):
+        """结束录制：记下结束状态并把输入日志写入 INPUT_LOG_DIR。"""
+        log, self.input_log = self.input_log, None
+        log.final = final_state(self)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.run_seed}-{log.start_level}.mzin"
+        try:
+            path = log.save(INPUT_LOG_DIR / name)
+        except OSError as e:
+            print(f"警告：无法保存输入日志 ({e})")
+        else:
+            print(f"输入日志已保存: {path} ({log.ticks} ticks，{len(log.runs)} 段)")
 
     def reset_game(self):
         """重置游戏状态，生成新迷宫和对象。"""
         print("正在重置游戏...")
-        self.maze = Maze()              # 创建新迷宫
-        self.enemies = []             # 清空敌人列表
-        self.projectiles = []         # 清空射弹列表
+        # 创建新迷宫：普通模式按关卡种子取得迷宫 (重开同一关卡时取缓存，
+        # 进入下一关时换上后台预生成的迷宫，未完成时等待或同步生成)
+        if self.endless:
+            new_maze = EndlessMaze()
+        else:
+            self.level_seed = level_seed(self.run_seed, self.current_level)
+            print(f"第 {self.current_level} 关，迷宫种子: {self.level_seed}")
+            new_maze = self.level_prefetcher.take(self.level_seed)
+        old_maze, self.maze = self.maze, new_maze
+        self.level_prefetcher.retire(old_maze) # 旧迷宫在后台释放
+        old_maze = None
+        # 敌人存储：一关的敌人很多 (且 NumPy 可用) 时使用整批更新的结构数组敌人系统，否则为 Enemy 对象列表
+        expected = ENDLESS_ENEMIES_PER_CHUNK * len(self.maze.chunks) if self.endless else NUM_ENEMIES
+        self.use_enemy_system = False
+        self.enemies = []
+        if ENEMY_SYSTEM and expected >= ENEMY_SYSTEM_MIN_COUNT:
+            import enemy_system # 延迟导入：默认的几个敌人用不到，不拖慢启动
+            if enemy_system.AVAILABLE:
+                self.use_enemy_system = True
+                self.enemies = enemy_system.EnemySystem()
+        self._select_projectile_storage()
+        self.projectiles.clear()      # 清空射弹
+        self.camera = vec(0, 0)
+        self.prev_offset = (0, 0)
 
         # --- 创建玩家 ---
         start_pixel_pos = self.maze.get_start_pixel_pos()
@@ -46,45 +144,190 @@ class Game:
         print(f"玩家放置在: ({player_start_x}, {player_start_y})")
 
         # --- 创建敌人 ---
-        min_enemy_dist_sq = (TILE_SIZE * 4)**2 # 敌人距离玩家起点的最小距离平方
-        player_start_center = self.player.rect.center
-
-        for _ in range(NUM_ENEMIES):
-             # 获取一个合适的随机地板坐标作为敌人出生点
-            spawn_coord = self.maze.get_random_floor_coord(
-                exclude_rect=self.player.rect, # 避免出生在玩家身上
-                min_dist_sq_from=min_enemy_dist_sq,
-                source_pos=player_start_center
-            )
-            if spawn_coord:
-                self.enemies.append(Enemy(spawn_coord[0], spawn_coord[1]))
-                # print(f"敌人在 {spawn_coord} 生成")
-            else:
-                print("警告：无法为敌人找到合适的生成位置！")
+        if self.endless:
+            # 无尽模式：每个已加载的区块各生成一批敌人
+            for chunk_index in sorted(self.maze.chunks):
+                self.spawn_enemies(ENDLESS_ENEMIES_PER_CHUNK, chunk_index=chunk_index)
+        else:
+            self.spawn_enemies(NUM_ENEMIES)
+            # 当前关卡就绪后立即开始在后台生成下一关
+            self.level_prefetcher.prefetch(level_seed(self.run_seed, self.current_level + 1))
 
 
         self.game_state = "PLAYING" # 设置游戏状态为进行中
 
+    def spawn_enemies(self, count, chunk_index=None):
+        """
+        在远离玩家的随机地板上生成敌人。
+        :param count: 敌人数量
+        :param chunk_index: 可选，无尽模式下只在指定区块中生成
+        """
+        min_enemy_dist_sq = (TILE_SIZE * 4)**2 # 敌人距离玩家起点的最小距离平方
+        player_start_center = self.player.rect.center
+        extra = {} if chunk_index is None else {"chunk_index": chunk_index}
+
+        # 一次批量抽取所有出生点 (每个样本均摊 O(1))
+        spawn_coords = self.maze.sample_floor_coords(
+            count,
+            exclude_rect=self.player.rect, # 避免出生在玩家身上
+            min_dist_sq_from=min_enemy_dist_sq,
+            source_pos=player_start_center,
+            **extra
+        )
+        for x, y in spawn_coords:
+            if self.use_enemy_system:
+                self.enemies.spawn(x, y)
+            else:
+                self.enemies.append(Enemy(x, y))
+        if len(spawn_coords) < count:
+            print("警告：无法为敌人找到合适的生成位置！")
+
     def run(self):
-        """游戏主循环。"""
+        """
+        游戏主循环 (固定时间步长)。
+        真实经过的时间累加到 accumulator 中，每满 1 / SIM_RATE 秒运行一次 update()，
+        因此模拟速度与渲染帧率无关。渲染跟不上时，一帧内补跑多个 tick (少渲染几帧，而不是少模拟几个 tick)；
+        每帧最多补跑 MAX_SIM_STEPS_PER_FRAME 个 tick，超出的积压时间直接丢弃，避免补跑越来越多、越来越落后。
+        绘制时用剩余的不足一个 tick 的时间在上一个与当前 tick 的位置之间插值。
+        """
+        step = 1.0 / SIM_RATE
+        accumulator = 0.0
+        stats = self.loop_stats
+        last = time.perf_counter()
         while self.running:
-            self.dt = self.clock.tick(FPS) / 1000.0 # 获取帧间隔时间(秒)，如果需要基于时间的移动
+            now = time.perf_counter()
+            self.dt = now - last # 帧间隔时间 (秒)
+            last = now
+            accumulator += self.dt
 
+            self.profiler.start_frame()
             self.events() # 处理事件
-            self.update() # 更新游戏状态
-            self.draw()   # 绘制画面
+            self.profiler.mark("events")
+            steps = 0
+            while accumulator >= step and steps < MAX_SIM_STEPS_PER_FRAME:
+                if RENDER_INTERPOLATION:
+                    self.snapshot_positions()
+                self.step() # 更新游戏状态
+                accumulator -= step
+                steps += 1
+            if accumulator >= step: # 达到补跑上限：丢弃积压，游戏暂时变慢
+                dropped = accumulator - accumulator % step
+                stats["dropped_ms"] += dropped * 1000
+                accumulator -= dropped
+            stats["frames"] += 1
+            stats["ticks"] += steps
+            if steps > 1:
+                stats["catchup_frames"] += 1
+            self.profiler.count("sim_ticks", steps)
+
+            self.draw(accumulator / step if RENDER_INTERPOLATION else 1.0) # 绘制画面
+            self.profiler.end_frame(self)
+            if not self.startup.reported: # 首帧已显示
+                self.startup.mark("first_frame")
+                self.startup.report()
+            self.clock.tick(FPS) # 限制渲染帧率
 
         self.quit_game() # 退出循环后清理
 
+    def step(self):
+        """推进一个模拟 tick：update() 并把模拟时钟前进 1000 / SIM_RATE 毫秒；录制中的一局结束时保存输入日志。"""
+        self.update()
+        self.sim_time += 1000 / SIM_RATE
+        if self.input_log is not None and self.game_state != "PLAYING":
+            self.finish_recording()
+
+    def snapshot_positions(self):
+        """记录所有实体和摄像机当前的位置，作为下一个 tick 之后插值绘制的起点。"""
+        if self.use_enemy_system:
+            self.enemies.snapshot()
+        else:
+            for enemy in self.enemies:
+                enemy.prev_xy = enemy.rect.topleft
+        if self.player:
+            self.player.prev_xy = self.player.rect.topleft
+        if self.use_projectile_pool:
+            self.projectiles.snapshot()
+        else:
+            for projectile in self.projectiles:
+                projectile.prev_xy = projectile.rect.center
+        self.prev_offset = (int(self.camera.x), int(self.camera.y))
+
+    def _select_projectile_storage(self):
+        """
+        射弹存储：NumPy 可用时为结构数组射弹池，否则为 Projectile 对象列表 (两者都支持 len/clear)。
+        第一次开局时才导入射弹池模块，开始界面不需要它；之后各关卡复用同一个射弹池。
+        """
+        if self.use_projectile_pool or not PROJECTILE_POOL:
+            return
+        import projectile_system # 延迟导入
+        if projectile_system.AVAILABLE:
+            self.use_projectile_pool = True
+            self.projectiles = projectile_system.ProjectileSystem()
+
+    def spawn_projectile(self, pos, direction):
+        """
+        发射一枚射弹 (Player.shoot 调用)。
+        :param pos: 初始中心位置
+        :param direction: 方向向量
+        """
+        if self.use_projectile_pool:
+            self.projectiles.spawn(pos, direction, self.get_ticks())
+        else:
+            Projectile(self, pos, direction) # 构造时自动加入射弹列表
+
+    def get_ticks(self):
+        """
+        当前游戏时间 (毫秒)，用于射击冷却、射弹寿命等。
+        返回模拟时钟，使结果只取决于 tick 数而与机器速度、渲染帧率无关。
+        """
+        return int(self.sim_time)
+
+    def simulate(self, ticks, input_script=None, auto_restart=True):
+        """
+        不限帧率、不渲染地连续推进 ticks 次 update()。
+        :param ticks: 模拟的 tick 数
+        :param input_script: 可选，callable(tick) -> 按键状态 (支持 keys[pg.K_x] 索引)；None 表示不按任何键
+        :param auto_restart: 游戏结束时是否自动重开 (用于长时间压力测试)
+        :return: 统计信息字典 (ticks, seconds, ticks_per_sec, levels, deaths, prefetch)
+        """
+        if self.game_state != "PLAYING":
+            self.reset_game()
+        deaths = 0
+        start_level = self.current_level
+        start = time.perf_counter()
+        for tick in range(ticks):
+            self.keys = input_script(tick) if input_script else NO_KEYS
+            self.step()
+            if self.game_state == "GAME_OVER":
+                deaths += 1
+                if not auto_restart:
+                    ticks = tick + 1
+                    break
+                self.reset_game()
+        elapsed = time.perf_counter() - start
+        self.keys = None
+        return {
+            "ticks": ticks,
+            "seconds": elapsed,
+            "ticks_per_sec": ticks / elapsed if elapsed > 0 else float("inf"),
+            "levels": self.current_level - start_level,
+            "deaths": deaths,
+            "prefetch": dict(self.level_prefetcher.stats),
+        }
+
     def events(self):
         """处理所有事件 (键盘、鼠标、退出等)。"""
         for event in pg.event.get():
             if event.type == pg.QUIT:
                 self.running = False
             if event.type == pg.KEYDOWN:
+                if event.key == pg.K_F3:
+                    self.profiler.toggle() # 切换性能叠加层
                 if self.game_state == "START":
                     if event.key == pg.K_RETURN or event.key == pg.K_KP_ENTER:
-                        self.reset_game() # 按回车开始游戏
+                        self.start_session(ENDLESS_MODE) # 按回车开始游戏
+                    elif event.key == pg.K_e:
+                        self.start_session(True) # 按 E 开始无尽模式
                     elif event.key == pg.K_ESCAPE:
                          self.running = False
                 elif self.game_state == "PLAYING":
@@ -103,22 +346,48 @@ class Game:
         if self.game_state != "PLAYING":
             return # 如果游戏不在进行中，则不更新逻辑
 
+        prof = self.profiler
         # --- 更新玩家 ---
         if self.player:
-            self.player.handle_input() # 处理输入必须在 update 前
-            self.player.update(self.maze.wall_rects)
+            keys = self.keys
+            if self.input_log is not None:
+                if keys is None:
+                    keys = pg.key.get_pressed()
+                self.input_log.record(keys) # 记录本 tick 实际使用的按键
+            self.player.handle_input(keys) # 处理输入必须在 update 前
+            self.player.update(self.maze)
+        prof.mark("player_update")
+
+        # --- 无尽模式：按玩家位置流式生成/回收区块 ---
+        if self.endless and self.player:
+            self.update_endless()
+            prof.mark("endless_chunks")
 
         # --- 更新敌人 ---
-        for enemy in self.enemies:
-            enemy.update(self.maze.wall_rects)
+        # 追踪时所有敌人共用一个朝向玩家的流场，只在玩家进入新单元格时重新计算
+        flow = None
+        if self.enemy_chase and self.player:
+            flow = self.maze.flow_toward(self.player.rect.center)
+            prof.mark("flow_field")
+        if self.use_enemy_system:
+            self.enemies.update(self.maze, flow) # 整批更新
+        else:
+            for enemy in self.enemies:
+                enemy.update(self.maze, flow)
+        prof.mark("enemy_update")
 
         # --- 更新射弹 ---
-        # 使用列表副本进行迭代，因为可能在循环中移除元素
-        for projectile in self.projectiles[:]:
-            projectile.update()
+        if self.use_projectile_pool:
+            self.projectiles.update(self.maze.bounds, self.get_ticks()) # 整批移动并剔除出界射弹
+        else:
+            # 使用列表副本进行迭代，因为可能在循环中移除元素
+            for projectile in self.projectiles[:]:
+                projectile.update()
+        prof.mark("projectile_upd")
 
         # --- 碰撞检测 ---
         self.check_collisions()
+        prof.mark("collisions")
 
         # --- 检查游戏状态改变条件 ---
         if self.player:
@@ -128,86 +397,197 @@ class Game:
                 self.current_level += 1
                 print(f"到达出口！进入第 {self.current_level} 关")
                 self.reset_game() # 重置游戏，开始下一关
+                prof.mark("level_reset")
+
+
+    def update_endless(self):
+        """无尽模式：生成前方区块并为其添加敌人，移除落在已回收区块中的对象，摄像机跟随玩家。"""
+        for chunk_index in self.maze.update_focus(self.player.rect.centery):
+            self.spawn_enemies(ENDLESS_ENEMIES_PER_CHUNK, chunk_index=chunk_index)
 
+        bounds = self.maze.bounds
+        if self.use_enemy_system:
+            self.enemies.keep(self.enemies.overlapping(bounds))
+        else:
+            self.enemies = [enemy for enemy in self.enemies if bounds.colliderect(enemy.rect)]
+
+        # 摄像机只在竖直方向跟随，且不超出已加载区域
+        camera_y = self.player.rect.centery - SCREEN_HEIGHT // 2
+        self.camera.y = max(bounds.top, min(camera_y, bounds.bottom - SCREEN_HEIGHT))
 
     def check_collisions(self):
         """处理不同对象之间的碰撞。"""
         if not self.player: return # 如果没有玩家对象，则不进行碰撞检测
 
+        if self.use_projectile_pool:
+            # 射弹池：撞墙与命中敌人都是整批的数组运算
+            self.wall_impacts = self.projectiles.resolve_wall_hits(self.maze)
+            self.enemies = self.projectiles.hit_enemies(self.enemies)
+            self.check_player_enemy_collisions()
+            return
+
         # 1. 射弹 vs 墙壁
-        for projectile in self.projectiles[:]: # 迭代副本
-            for wall in self.maze.wall_rects:
-                # 使用射弹的 rect 进行粗略检测
-                if projectile.rect.colliderect(wall):
-                    projectile.kill() # 射弹撞墙消失
-                    break # 一个射弹只处理一次撞墙
+        # 沿本 tick 移动的线段做 DDA 扫掠，只访问线段穿过的单元格 (高速射弹也不会穿墙)；
+        # 一次性重建列表，避免逐个 list.remove
+        survivors = []
+        self.wall_impacts = []
+        for p in self.projectiles:
+            hit = self.maze.sweep(p.pos - p.vel, p.pos, p.radius)
+            if hit is None:
+                survivors.append(p)
+            else:
+                self.wall_impacts.append(hit[1])
+        if len(survivors) != len(self.projectiles):
+            self.projectiles[:] = survivors # 原地修改，Projectile 持有的是同一个列表
 
         # 2. 射弹 vs 敌人
-        # 使用列表推导式来高效地移除被击中的敌人和对应的射弹
-        enemies_hit = []
-        projectiles_to_remove = []
-        remaining_enemies = []
-
-        for enemy in self.enemies:
-            enemy_was_hit = False
-            for projectile in self.projectiles[:]: # 迭代射弹副本
-                 # 用 circle-rect 碰撞可能更精确，但 rect-rect 通常足够
-                 if enemy.rect.colliderect(projectile.rect):
-                     enemies_hit.append(enemy) # 标记敌人被击中
-                     projectiles_to_remove.append(projectile) # 标记射弹待移除
-                     projectile.kill() # 立即从列表中移除，避免重复标记
-                     enemy_was_hit = True
-                     break # 一个敌人被一个子弹击中即可
-            if not enemy_was_hit:
-                 remaining_enemies.append(enemy) # 保留未被击中的敌人
-
-        self.enemies = remaining_enemies # 更新敌人列表
-
-        # print(f"击中敌人: {len(enemies_hit)}, 剩余敌人: {len(self.enemies)}")
-
+        # 射弹较多时先放进空间哈希，每个敌人只与其所在格子附近的射弹比较
+        if len(self.enemies) * len(self.projectiles) > SPATIAL_HASH_MIN_PAIRS:
+            grid = SpatialHash()
+            grid.build(self.projectiles)
+            candidates = grid.query
+        else:
+            everything = list(enumerate(self.projectiles))
+            candidates = lambda rect: everything
+
+        hit_projectiles = set() # 已击中敌人的射弹 (一发射弹只能击中一个敌人)
+        hit_enemies = []        # 被击中的敌人下标
+        enemy_rects = self.enemies.rects() if self.use_enemy_system else [enemy.rect for enemy in self.enemies]
+        for i, enemy_rect in enumerate(enemy_rects):
+            # 候选按发射顺序排列，取第一个与敌人重叠且尚未用掉的射弹
+            for _, projectile in candidates(enemy_rect):
+                # 用 circle-rect 碰撞可能更精确，但 rect-rect 通常足够
+                if projectile not in hit_projectiles and enemy_rect.colliderect(projectile.rect):
+                    hit_projectiles.add(projectile)
+                    hit_enemies.append(i)
+                    break # 一个敌人被一个子弹击中即可
+
+        # 移除被击中的敌人
+        if hit_enemies and self.use_enemy_system:
+            self.enemies.remove(hit_enemies)
+        elif hit_enemies:
+            hit_enemies = set(hit_enemies)
+            self.enemies = [enemy for i, enemy in enumerate(self.enemies) if i not in hit_enemies]
+        if hit_projectiles:
+            self.projectiles[:] = [p for p in self.projectiles if p not in hit_projectiles]
 
         # 3. 玩家 vs 敌人
-        for enemy in self.enemies:
-            if self.player.rect.colliderect(enemy.rect):
-                self.game_state = "GAME_OVER"
-                print("被敌人抓住了！")
-                break # 碰到一个敌人就结束
-
+        self.check_player_enemy_collisions()
+
+    def check_player_enemy_collisions(self):
+        """玩家 vs 敌人：碰到任意敌人即游戏结束。"""
+        # 只有一个玩家，用 Rect.collidelist 在 C 中扫描一遍即可，比建立敌人的空间哈希更省
+        if self.use_enemy_system:
+            caught = self.enemies.overlapping(self.player.rect).any()
+        else:
+            caught = self.player.rect.collidelist([enemy.rect for enemy in self.enemies]) != -1
+        if caught:
+            self.game_state = "GAME_OVER"
+            print("被敌人抓住了！")
+
+
+    def draw(self, alpha=1.0):
+        """
+        绘制所有游戏元素到屏幕上。
+        :param alpha: 插值系数：实体画在上一个 tick (0) 与当前 tick (1) 的位置之间
+        """
+        prof = self.profiler
+        if self.dirty_rects is not None and self.game_state == "PLAYING" and not self.endless and self.maze:
+            self.draw_dirty(alpha) # 摄像机固定，背景不变：只刷新实体所在的区域
+            return
 
-    def draw(self):
-        """绘制所有游戏元素到屏幕上。"""
         # --- 绘制背景 (地板色) ---
         self.screen.fill(COLOR_FLOOR)
+        prof.count("draw_calls")
 
         # --- 根据游戏状态绘制不同内容 ---
         if self.game_state == "START":
             self.show_start_screen()
         elif self.game_state == "PLAYING":
+            offset = (int(self.camera.x), int(self.camera.y))
+            if alpha < 1.0:
+                offset = lerp_xy(self.prev_offset, offset, alpha)
             # 绘制迷宫
             if self.maze:
-                self.maze.draw(self.screen)
-            # 绘制敌人
-            for enemy in self.enemies:
-                enemy.draw(self.screen)
-            # 绘制射弹
-            for projectile in self.projectiles:
-                projectile.draw(self.screen)
-            # 绘制玩家 (最后绘制，覆盖在其他东西上面)
-            if self.player:
-                self.player.draw(self.screen)
-
-            # !! 新增：绘制当前关卡数 !!
-            level_text = f"关卡: {self.current_level}"
-            draw_text(self.screen, level_text, 24, COLOR_WHITE, 10, 10, align="topleft")
-
+                self.maze.draw(self.screen, offset)
+                prof.count("draw_calls")
+            prof.mark("maze_draw")
+            self.draw_entities(offset, alpha)
 
         elif self.game_state == "GAME_OVER":
             self.show_end_screen("游戏结束", COLOR_PLAYER)
         elif self.game_state == "WIN":
             self.show_end_screen("你赢了!", COLOR_EXIT)
 
+        prof.mark("screens")
+        self.profiler.draw_overlay(self.screen)
+        prof.mark("overlay")
+
         # --- 刷新屏幕显示 ---
         pg.display.flip()
+        if self.dirty_rects is not None:
+            self.dirty_rects.invalidate() # 屏幕已整屏重绘，脏矩形模式的下一帧需要整屏刷新
+        prof.mark("flip")
+
+    def draw_entities(self, offset, alpha=1.0):
+        """
+        绘制敌人、射弹、玩家和 HUD 文本。
+        :param offset: 摄像机偏移 (像素)
+        :param alpha: 插值系数 (见 draw)
+        :return: 绘制覆盖的屏幕区域 (Rect 列表)
+        """
+        prof = self.profiler
+        # 所有实体都是预渲染的精灵，按绘制顺序收集后用一次 Surface.blits 提交：
+        # 敌人、射弹，最后是玩家 (覆盖在其他东西上面)
+        if self.use_enemy_system:
+            sprites = self.enemies.blit_sequence(offset, alpha)
+        else:
+            sprites = Enemy.blit_sequence(self.enemies, offset, alpha)
+        if self.use_projectile_pool:
+            sprites += self.projectiles.blit_sequence(offset, alpha)
+        else:
+            sprites += Projectile.blit_sequence(self.projectiles, offset, alpha)
+        if self.player:
+            sprites.append(self.player.sprite_blit(offset, alpha))
+        rects = self.screen.blits(sprites)
+        prof.count("draw_calls")
+        prof.count("sprites", len(sprites))
+        prof.mark("entity_draw")
+
+        # !! 新增：绘制当前关卡数 (无尽模式显示深度) !!
+        if self.endless and self.player:
+            level_text = f"深度: {self.player.rect.centery // TILE_SIZE}"
+        else:
+            level_text = f"关卡: {self.current_level}"
+        rects.append(draw_text(self.screen, level_text, 24, COLOR_WHITE, 10, 10, align="topleft"))
+        prof.count("draw_calls")
+        prof.mark("draw_text")
+        return rects
+
+    def draw_dirty(self, alpha=1.0):
+        """
+        脏矩形模式下绘制游戏画面 (普通迷宫)：用背景图层擦掉上一帧的实体，重绘实体，
+        只把新旧区域提交到显示器；脏区域太大或背景改变时由 DirtyRectRenderer 退回整屏 flip。
+        :param alpha: 插值系数 (见 draw)
+        """
+        prof = self.profiler
+        dirty = self.dirty_rects
+        # 迷宫或其预渲染图层改变 (新关卡、set_cell) 时重建背景
+        dirty.set_background((self.maze, self.maze.static_surface), self.paint_background)
+        dirty.restore(self.screen)
+        prof.count("draw_calls")
+        prof.mark("maze_draw")
+        rects = self.draw_entities((0, 0), alpha)
+        rects += self.profiler.draw_overlay(self.screen)
+        prof.mark("overlay")
+        dirty.present(rects)
+        prof.count("dirty_rects", dirty.last_rect_count)
+        prof.mark("flip")
+
+    def paint_background(self, surface):
+        """脏矩形模式的背景：地板色 + 迷宫 (普通迷宫的摄像机偏移恒为 0)。"""
+        surface.fill(COLOR_FLOOR)
+        self.maze.draw(surface)
 
     def show_start_screen(self):
         """显示开始界面。"""
@@ -218,13 +598,17 @@ class Game:
         draw_text(self.screen, "到达蓝色方块获胜", 30, COLOR_EXIT, SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 80)
         draw_text(self.screen, "躲避黄色方块", 30, COLOR_ENEMY, SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2 + 120)
         draw_text(self.screen, "按 Enter 开始游戏", 35, COLOR_WHITE, SCREEN_WIDTH / 2, SCREEN_HEIGHT * 0.85)
+        draw_text(self.screen, "按 E 进入无尽模式", 24, COLOR_WHITE, SCREEN_WIDTH / 2, SCREEN_HEIGHT * 0.85 + 40)
 
     def show_end_screen(self, message, message_color):
          """显示游戏结束或胜利界面。"""
          # 先绘制游戏最后一帧（可选）
-         if self.maze: self.maze.draw(self.screen)
-         for enemy in self.enemies: enemy.draw(self.screen)
-         if self.player: self.player.draw(self.screen) # 即使输了也画出来
+         offset = (int(self.camera.x), int(self.camera.y))
+         if self.maze: self.maze.draw(self.screen, offset)
+         if self.use_enemy_system: self.enemies.draw(self.screen, offset)
+         else:
+             for enemy in self.enemies: enemy.draw(self.screen, offset)
+         if self.player: self.player.draw(self.screen, offset) # 即使输了也画出来
 
          # 绘制半透明遮罩
          overlay = pg.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pg.SRCALPHA)
@@ -240,6 +624,16 @@ class Game:
     def quit_game(self):
         """清理并退出 Pygame。"""
         print("退出游戏中...")
+        if self.input_log is not None: # 游戏中途退出，也保存已录制的部分
+            self.finish_recording()
+        print(self.level_prefetcher.summary())
+        print(self.level_prefetcher.cache.summary())
+        stats = self.loop_stats
+        if stats["frames"]:
+            print(f"主循环: 渲染 {stats['frames']} 帧，模拟 {stats['ticks']} ticks，"
+                  f"补跑帧 {stats['catchup_frames']}，丢弃积压 {stats['dropped_ms']:.0f} ms")
+        self.level_prefetcher.close()
+        self.profiler.close()
         pg.quit()
         sys.exit()
 
@@ -3,198 +3,668 @@
 import pygame as pg
 import random
 from settings import * # 导入设置
+from maze_generators import get_generator
+from flow_field import FlowField
+from maze_analytics import bfs_distances, MazeIndex
+from spawn_sampler import SpawnSampler
+
+# NumPy 是可选依赖：可用时网格以 uint8 ndarray 存储，后处理全部向量化
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class TileQueryMixin:
+    """
+    基于单元格的碰撞查询 (Maze 与 EndlessMaze 共用)。
+    子类需提供 grid_width、_row_limits() 和 _row_cells(row)。
+    """
+
+    walls_checked = 0   # 累计检查过的单元格数 (供性能分析器按帧读取并清零)
+    count_walls = False # 是否累计 walls_checked (性能分析器启用时打开，关闭时碰撞查询不做计数)
+
+    def get_cell_span(self, rect):
+        """
+        计算 rect 覆盖的单元格范围（已裁剪到网格内）。
+        :param rect: 任意 Rect (像素坐标)
+        :return: (c0, r0, c1, r1) 闭区间；若 rect 完全在网格外则返回 None
+        """
+        row_min, row_max = self._row_limits()
+        c0 = max(rect.left // TILE_SIZE, 0)
+        r0 = max(rect.top // TILE_SIZE, row_min)
+        c1 = min((rect.right - 1) // TILE_SIZE, self.grid_width - 1)
+        r1 = min((rect.bottom - 1) // TILE_SIZE, row_max)
+        if c0 > c1 or r0 > r1:
+            return None
+        return c0, r0, c1, r1
 
-class Maze:
-    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT):
+    def walls_near(self, rect):
+        """
+        碰撞查询：只返回 rect 所覆盖单元格 (通常 1~4 个) 中的墙壁 Rect。
+        返回顺序与 wall_rects 一致 (按行优先)，因此推出/反弹结果与遍历全部墙壁相同。
+        :param rect: 待检测对象的 Rect
+        :return: 墙壁 Rect 列表
+        """
+        span = self.get_cell_span(rect)
+        if span is None:
+            return []
+        c0, r0, c1, r1 = span
+        if self.count_walls:
+            self.walls_checked += (r1 - r0 + 1) * (c1 - c0 + 1)
+        walls = []
+        for r in range(r0, r1 + 1):
+            buf, base = self._row_cells(r)
+            for c in range(c0, c1 + 1):
+                if buf[base + c] == CELL_WALL:
+                    walls.append(pg.Rect(c * TILE_SIZE, r * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+        return walls
+
+    def collides_with_wall(self, rect):
+        """
+        判断 rect 是否与任意墙壁重叠 (只检查其覆盖的单元格)。
+        :param rect: 待检测对象的 Rect
+        :return: True 如果与墙壁重叠
+        """
+        span = self.get_cell_span(rect)
+        if span is None:
+            return False
+        return self._span_has_wall(*span)
+
+    def _span_has_wall(self, c0, r0, c1, r1):
+        """单元格闭区间 [c0, c1] x [r0, r1] (已裁剪到网格内) 中是否有墙壁。"""
+        if self.count_walls:
+            self.walls_checked += (r1 - r0 + 1) * (c1 - c0 + 1)
+        for r in range(r0, r1 + 1):
+            buf, base = self._row_cells(r)
+            for c in range(c0, c1 + 1):
+                if buf[base + c] == CELL_WALL:
+                    return True
+        return False
+
+    def sweep(self, start, end, radius=0):
+        """
+        扫掠碰撞：边长 2 * radius 的方块中心沿线段 start -> end 移动时，第一次碰到墙壁的位置。
+        方块在移动过程中覆盖的单元格恰好是它四个角 (像素中心，即 中心 ± (radius - 0.5)) 经过的单元格，
+        因此对四个角各做一次 DDA 网格遍历：开销与穿过的单元格数成正比，与墙壁数量无关，速度再快也不会穿墙。
+        任意时刻的判定都与 collides_with_wall(以四舍五入后的中心为中心、边长 2 * radius 的 Rect) 相同。
+        :param start: 起点中心 (x, y)
+        :param end: 终点中心 (x, y)
+        :param radius: 方块的半边长 (像素)；0 表示一个点
+        :return: (t, (x, y))：第一次碰到墙壁时的线段参数 t (0~1) 和此时的中心位置；没有碰到墙壁时返回 None
+        """
+        x0, y0 = start
+        x1, y1 = end
+        inset = radius - 0.5 if radius > 0.5 else 0
+        # 整段扫过的包围盒内没有墙壁时无需逐格遍历 (远离墙壁的射弹都走这里)
+        row_min, row_max = self._row_limits()
+        c0 = max(int(((x0 if x0 < x1 else x1) - inset) // TILE_SIZE), 0)
+        r0 = max(int(((y0 if y0 < y1 else y1) - inset) // TILE_SIZE), row_min)
+        c1 = min(int(((x1 if x0 < x1 else x0) + inset) // TILE_SIZE), self.grid_width - 1)
+        r1 = min(int(((y1 if y0 < y1 else y0) + inset) // TILE_SIZE), row_max)
+        if c0 > c1 or r0 > r1 or not self._span_has_wall(c0, r0, c1, r1):
+            return None
+        dx, dy = x1 - x0, y1 - y0
+        corners = (-inset, inset) if inset else (0,)
+        best = None
+        for ox in corners:
+            for oy in corners:
+                t = self._ray_hit(x0 + ox, y0 + oy, dx, dy)
+                if t is not None and (best is None or t < best):
+                    best = t
+        if best is None:
+            return None
+        return best, (x0 + dx * best, y0 + dy * best)
+
+    def _ray_hit(self, x, y, dx, dy):
+        """
+        DDA：点 (x, y) 沿 (dx, dy) 移动 (t 从 0 到 1) 时依次访问经过的单元格。
+        :return: 第一次位于墙壁单元格时的 t；始终不碰墙时返回 None
+        """
+        col, row = int(x // TILE_SIZE), int(y // TILE_SIZE)
+        if self._wall_cell(col, row):
+            return 0.0
+        steps = abs(int((x + dx) // TILE_SIZE) - col) + abs(int((y + dy) // TILE_SIZE) - row)
+        # 到下一条竖直/水平网格线的 t，以及每穿过一个单元格 t 的增量
+        if dx > 0:
+            step_c, t_max_c, t_delta_c = 1, ((col + 1) * TILE_SIZE - x) / dx, TILE_SIZE / dx
+        elif dx < 0:
+            step_c, t_max_c, t_delta_c = -1, (col * TILE_SIZE - x) / dx, -TILE_SIZE / dx
+        else:
+            step_c, t_max_c, t_delta_c = 0, float("inf"), 0
+        if dy > 0:
+            step_r, t_max_r, t_delta_r = 1, ((row + 1) * TILE_SIZE - y) / dy, TILE_SIZE / dy
+        elif dy < 0:
+            step_r, t_max_r, t_delta_r = -1, (row * TILE_SIZE - y) / dy, -TILE_SIZE / dy
+        else:
+            step_r, t_max_r, t_delta_r = 0, float("inf"), 0
+        for _ in range(steps):
+            if t_max_c < t_max_r:
+                col += step_c
+                t = t_max_c
+                t_max_c += t_delta_c
+            else:
+                row += step_r
+                t = t_max_r
+                t_max_r += t_delta_r
+            if self._wall_cell(col, row):
+                return min(t, 1.0)
+        return None
+
+    def _wall_cell(self, col, row):
+        """单元格 (col, row) 是否为墙壁；网格外的单元格不是墙 (与 get_cell_span 的裁剪规则一致)。"""
+        if self.count_walls:
+            self.walls_checked += 1
+        row_min, row_max = self._row_limits()
+        if not (0 <= col < self.grid_width and row_min <= row <= row_max):
+            return False
+        buf, base = self._row_cells(row)
+        return buf[base + col] == CELL_WALL
+
+    def sweep_many(self, starts, ends, radius=0):
+        """
+        sweep 的批量版本 (需要 NumPy，子类需提供 walls_at)。
+        先按整段扫过的包围盒粗筛 (跨越不超过 2x2 个单元格时查询包围盒的四个角即可)，
+        包围盒内有墙或更大的方块再对四个角同时做 DDA：每一轮尚未碰墙的射线各前进一个单元格，
+        轮数等于单条射线穿过的最多单元格数 (与速度成正比)。
+        :param starts: (N, 2) 起点中心
+        :param ends: (N, 2) 终点中心
+        :param radius: 方块的半边长 (像素)
+        :return: 长度 N 的 t 数组 (0~1)，没有碰到墙壁的为 inf；碰撞位置为 starts + (ends - starts) * t
+        """
+        n = len(starts)
+        t_hit = np.full(n, np.inf)
+        if n == 0:
+            return t_hit
+        inset = max(radius - 0.5, 0)
+        # np.floor(x / T) 比浮点数的 x // T 快一个数量级
+        lo = np.floor((np.minimum(starts, ends) - inset) / TILE_SIZE).astype(np.int64)
+        hi = np.floor((np.maximum(starts, ends) + inset) / TILE_SIZE).astype(np.int64)
+        cols = np.concatenate((lo[:, 0], hi[:, 0], lo[:, 0], hi[:, 0]))
+        rows = np.concatenate((lo[:, 1], lo[:, 1], hi[:, 1], hi[:, 1]))
+        if self.count_walls:
+            self.walls_checked += len(cols)
+        near = self.walls_at(cols, rows).reshape(4, -1).any(axis=0) | ((hi - lo) > 1).any(axis=1)
+        idx = np.flatnonzero(near)
+        if len(idx):
+            t_hit[idx] = self._sweep_corners(starts[idx], ends[idx], inset)
+        return t_hit
+
+    def _sweep_corners(self, starts, ends, inset):
+        """对每个方块的四个角 (中心 ± inset) 同时做 DDA，返回每个方块最早碰墙的 t (没有碰墙为 inf)。"""
+        n = len(starts)
+        corners = np.array([(-inset, -inset), (inset, -inset), (-inset, inset), (inset, inset)] if inset else [(0, 0)])
+        delta = np.tile(ends - starts, (len(corners), 1))
+        origin = (starts[None, :, :] + corners[:, None, :]).reshape(-1, 2)     # 每行一条射线 (角 × 方块)
+        cell = np.floor(origin / TILE_SIZE).astype(np.int64)
+        remaining = np.abs(np.floor((origin + delta) / TILE_SIZE).astype(np.int64) - cell).sum(axis=1)
+        t_hit = np.where(self.walls_at(cell[:, 0], cell[:, 1]), 0.0, np.inf)
+        if self.count_walls:
+            self.walls_checked += len(cell)
+
+        # 到下一条竖直/水平网格线的 t，以及每穿过一个单元格 t 的增量
+        step = np.sign(delta).astype(np.int64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            moving = delta != 0
+            t_max = np.where(moving, ((cell + (delta > 0)) * TILE_SIZE - origin) / delta, np.inf)
+            t_delta = np.where(moving, TILE_SIZE / np.abs(delta), 0)
+        active = np.flatnonzero((remaining > 0) & (t_hit == np.inf))
+        while len(active):
+            tm = t_max[active]
+            axis = (tm[:, 0] >= tm[:, 1]).astype(np.int64) # 先到达的网格线：0 为竖直线 (换列)，1 为水平线 (换行)
+            t = tm[np.arange(len(active)), axis]
+            cell[active, axis] += step[active, axis]
+            t_max[active, axis] += t_delta[active, axis]
+            remaining[active] -= 1
+            wall = self.walls_at(cell[active, 0], cell[active, 1])
+            if self.count_walls:
+                self.walls_checked += len(active)
+            t_hit[active[wall]] = np.minimum(t[wall], 1.0)
+            active = active[(remaining[active] > 0) & ~wall]
+        return t_hit.reshape(len(corners), n).min(axis=0)
+
+    _flow_field = None # 朝向玩家的共享流场 (首次调用 flow_toward 时创建)
+
+    def flow_toward(self, pos):
+        """
+        返回以 pos 所在单元格为目标的共享 BFS 流场 (所有敌人共用)。
+        目标仍在同一单元格时直接返回上次的结果，不重新计算。
+        :param pos: 目标的像素坐标 (通常是玩家中心)
+        :return: FlowField
+        """
+        if self._flow_field is None:
+            self._flow_field = FlowField(self)
+        self._flow_field.update(pos)
+        return self._flow_field
+
+    def invalidate_flow_field(self):
+        """迷宫布局改变后调用，使流场在下次查询时重新计算。"""
+        if self._flow_field is not None:
+            self._flow_field.invalidate()
+
+    def is_wall(self, col, row):
+        """判断单元格 (col, row) 是否为墙壁；网格外视为墙壁。"""
+        row_min, row_max = self._row_limits()
+        if not (0 <= col < self.grid_width and row_min <= row <= row_max):
+            return True
+        buf, base = self._row_cells(row)
+        return buf[base + col] == CELL_WALL
+
+
+class Maze(TileQueryMixin):
+    def __init__(self, width=GRID_WIDTH, height=GRID_HEIGHT, use_numpy=None, algorithm=MAZE_ALGORITHM, rng=None,
+                 seed=None):
         """
         初始化迷宫对象。
         :param width: 迷宫的网格宽度
         :param height: 迷宫的网格高度
+        :param use_numpy: 是否使用 NumPy 数组表示网格；None 表示 NumPy 可用时自动启用
+        :param algorithm: 生成算法名，见 maze_generators.GENERATORS
+        :param rng: 可选，迷宫专用的随机数源 (random.Random)；None 表示使用全局 random 模块。
+                    在工作线程中生成迷宫时必须传入，以免与主线程争用全局随机状态
+        :param seed: 可选，迷宫种子。给出时忽略 rng：布局完全由 (seed, 尺寸, 算法) 决定，
+                     之后的出生点抽样使用由种子派生的独立随机数源 (见 reset_rng)
+        """
+        self._init_state(width, height, use_numpy, algorithm, seed)
+        self.rng = random.Random(seed) if seed is not None else (random if rng is None else rng)
 
+        self._generate()        # 生成迷宫布局
+        if seed is not None:
+            self.reset_rng()    # 布局生成完毕，换成派生的随机数源
+        self._create_rects()    # 根据布局创建 Rect 对象
 
-        """
+    def _init_state(self, width, height, use_numpy, algorithm, seed):
+        """初始化尚未填充布局的迷宫状态 (构造函数与 from_cells 共用)。"""
         self.grid_width = width #
         self.grid_height = height
-        self.grid = []          # 存储迷宫布局的二维列表
-        self.wall_rects = []    # 存储所有墙壁 Rect 对象的列表，用于碰撞检测
+        self.algorithm = algorithm
+        self.seed = seed        # 迷宫种子 (None 表示未知/不可复现)
+        self.rng = random
+        self.generator = get_generator(algorithm) # 未知算法名会抛出 ValueError
+        self.use_numpy = (np is not None) if use_numpy is None else (use_numpy and np is not None)
+        self.cells = None       # 网格的 uint8 ndarray 视图 (形状 height x width，仅 NumPy 模式)
+        self._buf = bytearray() # 网格的紧凑存储：按行展开的 CELL_* 编码，所有查询都基于它
+        self._grid_view = None  # grid 列表视图的缓存
+        self._wall_rects = None # wall_rects 的缓存 (NumPy 模式下按需生成)
+        self._floor_coords = None # floor_coords 的缓存 (NumPy 模式下按需生成)
+        self._floor_centers = None # floor_centers 的缓存 (仅 NumPy 模式)
+        self._spawn_sampler = None # 出生点采样器 (基于 floor_coords，按需创建)
         self.start_cell = None  # 起点单元格坐标 (列, 行)
         self.exit_cell = None   # 出口单元格坐标 (列, 行)
         self.exit_rect = None   # 出口单元格的 Rect 对象
-        self.floor_coords = [] # 存储所有非墙壁单元格中心像素坐标的列表
+        self._static_surface = None # 预渲染的静态迷宫图层 (首次绘制时生成)
+        self._surface_converted = False # 图层是否已转换为屏幕像素格式
+        self._start_dist = None # 放置出口时算出的起点距离场 (供 analytics 复用)
+        self._analytics = None  # 迷宫分析索引的缓存
 
-        self._generate()        # 生成迷宫布局
-        self._create_rects()    # 根据布局创建 Rect 对象
+    @classmethod
+    def from_cells(cls, buf, width, height, start_cell, exit_cell, seed=None, algorithm=MAZE_ALGORITHM, use_numpy=None):
+        """
+        用已有的布局构造迷宫，不运行生成算法 (例如从 maze_store 读取的迷宫文件)。
+        :param buf: 长度为 width * height 的 bytearray，按行展开的 CELL_* 编码 (直接接管，不复制)
+        :param width: 网格宽度
+        :param height: 网格高度
+        :param start_cell: 起点单元格 (列, 行)
+        :param exit_cell: 出口单元格 (列, 行)
+        :param seed: 可选，生成该布局的种子
+        :param algorithm: 生成该布局的算法名
+        :param use_numpy: 同构造函数
+        :return: Maze 对象
+        """
+        if len(buf) != width * height:
+            raise ValueError(f"网格数据长度 {len(buf)} 与尺寸 {width}x{height} 不符")
+        maze = cls.__new__(cls)
+        maze._init_state(width, height, use_numpy, algorithm, seed)
+        maze._set_buffer(buf)
+        maze.start_cell = tuple(start_cell)
+        maze.exit_cell = tuple(exit_cell)
+        if seed is not None:
+            maze.reset_rng()
+        maze._create_rects()
+        return maze
+
+    def reset_rng(self):
+        """
+        把出生点抽样的随机数源重置为由种子派生的初始状态 (只对有种子的迷宫有效)。
+        同一种子的迷宫无论是新生成、从缓存取出还是从文件读取，重置后的抽样序列都相同。
+        """
+        if self.seed is None:
+            return
+        self.rng = random.Random(f"{self.seed}/spawn")
+        if self._spawn_sampler is not None:
+            self._spawn_sampler.rng = self.rng
 
-    def _generate(self):
+    # --- 网格存储与兼容视图 ---
+
+    def _set_buffer(self, buf):
+        """
+        设置网格存储 (按行展开的 CELL_* 编码)，NumPy 模式下同时建立零拷贝的 ndarray 视图。
+        :param buf: 长度为 width * height 的 bytearray
+        """
+        self._buf = buf
+        self._grid_view = None
+        if self.use_numpy:
+            self.cells = np.frombuffer(buf, dtype=np.uint8).reshape(self.grid_height, self.grid_width)
+        else:
+            self.cells = None
+
+    def _buf_array(self):
+        """网格存储的一维 uint8 ndarray 视图 (零拷贝，仅 NumPy 模式)。"""
+        return np.frombuffer(self._buf, dtype=np.uint8)
+
+    @property
+    def grid(self):
+        """
+        兼容旧代码的二维字符视图 (grid[行][列] 为 WALL/FLOOR/START/EXIT)。
+        该视图按需生成并缓存；行和列都是元组，写入会直接报错 (TypeError) 而不是悄悄丢失，修改单元格请使用 set_cell。
+        """
+        if self._grid_view is None:
+            w = self.grid_width
+            if self.cells is not None:
+                self._grid_view = tuple(map(tuple, np.array(CELL_CHARS)[self.cells].tolist()))
+            else:
+                self._grid_view = tuple(tuple(CELL_CHARS[code] for code in self._buf[r * w:(r + 1) * w])
+                                        for r in range(self.grid_height))
+        return self._grid_view
+
+    @property
+    def wall_rects(self):
+        """所有墙壁 Rect 对象的列表 (按行优先)。NumPy 模式下首次访问时才生成。"""
+        if self._wall_rects is None:
+            if self.cells is not None:
+                rows, cols = np.nonzero(self.cells == CELL_WALL)
+                self._wall_rects = [pg.Rect(c * TILE_SIZE, r * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                                    for r, c in zip(rows.tolist(), cols.tolist())]
+            else:
+                self._wall_rects = []
+        return self._wall_rects
+
+    @property
+    def floor_centers(self):
         """
-        使用随机深度优先搜索 (Randomized DFS) 生成迷宫布局。
-        确保迷宫被单层墙壁包围。
-        """
-        # 1. 初始化网格，全部填充满墙壁
-        self.grid = [[WALL for _ in range(self.grid_width)] for _ in range(self.grid_height)]
-        # 用于DFS的访问标记数组，大小与 grid 相同
-        visited = [[False for _ in range(self.grid_width)] for _ in range(self.grid_height)]
-
-        # 2. DFS 算法生成路径
-        #    DFS 只在内部区域操作 (1 到 width-2, 1 到 height-2)
-        #    选择一个内部的奇数坐标作为起点（如果宽高允许），或者直接从(1,1)开始
-        start_x, start_y = 1, 1
-        # 确保起点在网格内且不是边界
-        if start_x <= 0 or start_x >= self.grid_width - 1 or start_y <= 0 or start_y >= self.grid_height - 1:
-             print(f"警告：起点 ({start_x},{start_y}) 无效或在边界上，迷宫可能无法生成。")
-             # 可以选择一个默认的安全起点，如 (1,1)
-             start_x, start_y = 1, 1
-             # 再次检查，如果网格太小(<=2)，无法进行内部生成
-             if self.grid_width <= 2 or self.grid_height <= 2:
-                 print("错误：网格尺寸过小，无法生成内部迷宫路径。")
-                 # 可以选择生成一个全空的迷宫或者直接返回
-                 for r in range(1, self.grid_height - 1):
-                     for c in range(1, self.grid_width - 1):
-                         self.grid[r][c] = FLOOR
-                 self._place_start_exit() # 尝试放置起点终点
-                 return # 提前结束生成
-
-        stack = [(start_x, start_y)]
-        self.grid[start_y][start_x] = FLOOR # 将起点标记为地板
-        visited[start_y][start_x] = True   # 标记起点已访问
-
-        while stack:
-            cx, cy = stack[-1]
-            neighbors = []
-
-            # 检查潜在的邻居 (间隔一个单元格)
-            for dx, dy in [(0, 2), (0, -2), (2, 0), (-2, 0)]:
-                nx, ny = cx + dx, cy + dy
-                # 确保邻居在内部网格边界内 (1 到 width-2, 1 到 height-2) 且未被访问
-                if 0 < nx < self.grid_width - 1 and 0 < ny < self.grid_height - 1 and not visited[ny][nx]:
-                    # 计算需要打通的墙壁的坐标
-                    wall_x, wall_y = cx + dx // 2, cy + dy // 2
-                    # 确保墙壁也在内部网格（虽然理论上应该在）
-                    if 0 < wall_x < self.grid_width - 1 and 0 < wall_y < self.grid_height - 1:
-                         neighbors.append((nx, ny, wall_x, wall_y))
-
-            if neighbors:
-                nx, ny, wall_x, wall_y = random.choice(neighbors)
-                # 打通邻居单元格
-                self.grid[ny][nx] = FLOOR
-                visited[ny][nx] = True
-                # 打通中间的墙壁
-                self.grid[wall_y][wall_x] = FLOOR
-                visited[wall_y][wall_x] = True # 墙壁单元格也标记为已访问（因为它变成了路）
-                stack.append((nx, ny)) # 将新单元格加入栈
+        所有非墙壁单元格中心像素坐标的 (N, 2) int32 数组 (行优先)，仅 NumPy 模式可用。
+        由展开下标向量化计算，首次访问时生成并缓存。
+        """
+        if self._floor_centers is None and self.cells is not None:
+            idx = np.flatnonzero(self._buf_array() != CELL_WALL).astype(np.int32)
+            centers = np.empty((len(idx), 2), dtype=np.int32)
+            np.remainder(idx, self.grid_width, out=centers[:, 0])
+            np.floor_divide(idx, self.grid_width, out=centers[:, 1])
+            centers *= TILE_SIZE
+            centers += TILE_SIZE // 2
+            self._floor_centers = centers
+        return self._floor_centers
+
+    @property
+    def floor_coords(self):
+        """所有非墙壁单元格中心像素坐标 (x, y) 的列表。NumPy 模式下首次访问时才生成。"""
+        if self._floor_coords is None:
+            if self.cells is not None:
+                self._floor_coords = [tuple(p) for p in self.floor_centers.tolist()]
             else:
-                stack.pop() # 回溯
+                self._floor_coords = []
+        return self._floor_coords
+
+    @property
+    def wall_mask(self):
+        """墙壁掩码 (bool ndarray，形状 height x width)，仅 NumPy 模式可用。"""
+        if self.cells is None:
+            return None
+        return self.cells == CELL_WALL
 
-        # 3. 放置起点和终点 (这个辅助函数应该在 _generate 内部调用，或者合并进来)
-        self._place_start_exit()
+    # --- 生成 ---
 
-        # 新增：修正右侧和底部的双层墙壁问题
+    def _generate(self):
+        """
+        使用注册表中选定的算法 (self.algorithm) 生成迷宫布局，然后统一做后处理：
+        放置起点和终点、修正边界。确保迷宫被单层墙壁包围。
+        """
+        w, h = self.grid_width, self.grid_height
+        # 1. 初始化网格，全部填充满墙壁 (CELL_WALL == 0)
+        buf = bytearray(w * h)
+        self._set_buffer(buf)
+
+        # 2. 生成路径 (只在内部区域 1 到 width-2, 1 到 height-2 操作)
+        #    如果网格太小(<=2)，无法进行内部生成
+        if self.grid_width <= 2 or self.grid_height <= 2:
+            print("错误：网格尺寸过小，无法生成内部迷宫路径。")
+            self._place_start() # 尝试放置起点终点
+            self._place_exit()
+            return # 提前结束生成
+        self.generator(buf, w, h, self.rng)
+
+        # 3. 共享的后处理：放置起点，修正右侧和底部的双层墙壁问题，最后在最终布局上放置出口
+        self._place_start()
+        self._fix_borders()
+        self._place_exit()
+
+    def _fix_borders(self):
+        """修正右侧和底部的双层墙壁问题 (倒数第二列/行与边界同为墙壁时打通)。"""
+        w, h = self.grid_width, self.grid_height
+        if w < 3 or h < 3:
+            return
+        if self.cells is not None:
+            cells = self.cells
+            # 处理右侧倒数第二列（grid_width - 2）
+            col = cells[1:h - 1, w - 2]
+            col[(col == CELL_WALL) & (cells[1:h - 1, w - 1] == CELL_WALL)] = CELL_FLOOR
+            # 处理底部倒数第二行（grid_height - 2）
+            row = cells[h - 2, 1:w - 1]
+            row[(row == CELL_WALL) & (cells[h - 1, 1:w - 1] == CELL_WALL)] = CELL_FLOOR
+            return
+
+        buf = self._buf
         # 处理右侧倒数第二列（grid_width - 2）
-        for y in range(1, self.grid_height - 1):
-            if self.grid[y][self.grid_width - 2] == WALL and self.grid[y][self.grid_width - 1] == WALL:
-                self.grid[y][self.grid_width - 2] = FLOOR
+        for y in range(1, h - 1):
+            if buf[y * w + w - 2] == CELL_WALL and buf[y * w + w - 1] == CELL_WALL:
+                buf[y * w + w - 2] = CELL_FLOOR
 
         # 处理底部倒数第二行（grid_height - 2）
-        for x in range(1, self.grid_width - 1):
-            if self.grid[self.grid_height - 2][x] == WALL and self.grid[self.grid_height - 1][x] == WALL:
-                self.grid[self.grid_height - 2][x] = FLOOR
-
-    def _place_start_exit(self):
-        """在生成的路径中放置起点和终点。"""
-        # 查找所有可放置的路径单元格 (非墙壁单元格)
-        floor_cells_list = []
-        # 迭代整个网格查找 FLOOR, START, EXIT
-        for r in range(self.grid_height):
-            for c in range(self.grid_width):
-                 # 注意：此时 grid 中可能已经标记了 START/EXIT，查找 FLOOR 即可
-                 if self.grid[r][c] == FLOOR:
-                    floor_cells_list.append((c, r))
+        for x in range(1, w - 1):
+            if buf[(h - 2) * w + x] == CELL_WALL and buf[(h - 1) * w + x] == CELL_WALL:
+                buf[(h - 2) * w + x] = CELL_FLOOR
+
+    def _floor_indices(self):
+        """
+        返回所有 FLOOR 单元格的展开下标 (行优先)。
+        NumPy 模式下返回 int ndarray，否则返回 list。
+        """
+        if self.cells is not None:
+            return np.flatnonzero(self._buf_array() == CELL_FLOOR)
+        return [i for i, code in enumerate(self._buf) if code == CELL_FLOOR]
+
+    def _place_start(self):
+        """在生成的路径中随机放置起点。"""
+        w = self.grid_width
+        # 查找所有可放置的路径单元格 (FLOOR 单元格，按行优先排列的展开下标)
+        floor_cells = self._floor_indices()
 
-        if not floor_cells_list:
+        if len(floor_cells) == 0:
             print("错误：迷宫生成后找不到可用的地板单元格！")
             # 尝试把中心设为地板？这只是极端情况的处理
             if self.grid_width > 2 and self.grid_height > 2:
                 cx, cy = self.grid_width // 2, self.grid_height // 2
-                self.grid[cy][cx] = FLOOR
-                floor_cells_list.append((cx,cy))
+                self._buf[cy * w + cx] = CELL_FLOOR
+                floor_cells = [cy * w + cx]
             else: # 网格太小，无法放置
                 return
 
-        # 随机选择起点
-        self.start_cell = random.choice(floor_cells_list)
-
-        # 随机选择终点，确保与起点不同且有一定距离
-        min_dist_sq = (self.grid_width * 0.3)**2 + (self.grid_height * 0.3)**2 # 稍微减小距离要求，防止找不到
-        possible_exits = [cell for cell in floor_cells_list if cell != self.start_cell]
-
-        if not possible_exits: # 如果只有一个地板单元格
-             self.exit_cell = self.start_cell
-             print("警告：只有一个可用地板单元，起点和终点相同。")
-        else:
-             self.exit_cell = random.choice(possible_exits)
-             attempts = 0
-             max_attempts = len(possible_exits) * 2 # 增加尝试次数
-             # 检查距离，如果点太少或距离要求太高，可能死循环
-             while ((self.start_cell[0] - self.exit_cell[0])**2 + (self.start_cell[1] - self.exit_cell[1])**2 < min_dist_sq) and attempts < max_attempts:
-                 self.exit_cell = random.choice(possible_exits)
-                 attempts += 1
-             if attempts == max_attempts:
-                 print("警告：无法找到距离足够远的终点，使用随机选择的终点。")
-
-
-        # 在网格上标记起点和终点 (覆盖掉原来的 FLOOR)
-        self.grid[self.start_cell[1]][self.start_cell[0]] = START
-        self.grid[self.exit_cell[1]][self.exit_cell[0]] = EXIT
+        # 随机选择起点 (直接按下标抽样，无需构造坐标列表)
+        start_idx = int(floor_cells[self.rng.randrange(len(floor_cells))])
+        self.start_cell = (start_idx % w, start_idx // w)
+        self._buf[start_idx] = CELL_START # 在网格上标记起点 (覆盖掉原来的 FLOOR)
 
+    def _place_exit(self):
+        """
+        把出口放在离起点路径距离最远的单元格：一次 BFS，最后访问到的单元格即最远点，
+        不再按直线距离反复抽样。BFS 的距离场留给 analytics 复用。
+        """
+        if self.start_cell is None:
+            return
+        w = self.grid_width
+        start_idx = self.start_cell[1] * w + self.start_cell[0]
+        dist, order = bfs_distances(self._buf, w, start_idx)
+        exit_idx = order[-1]
+        if exit_idx == start_idx:
+            print("警告：只有一个可用地板单元，起点和终点相同。")
+        self.exit_cell = (exit_idx % w, exit_idx // w)
+        self._buf[exit_idx] = CELL_EXIT
+        self._start_dist = dist
+
+    @property
+    def analytics(self):
+        """
+        迷宫分析索引 (MazeIndex)：起点/出口距离场、最短路径、死胡同和岔路口。
+        首次访问时构建并缓存，迷宫布局改变 (set_cell) 后失效。
+        """
+        if self._analytics is None and self.start_cell is not None:
+            self._analytics = MazeIndex(self, self._start_dist)
+        return self._analytics
 
     def _create_rects(self):
         """根据生成的网格布局，创建墙壁、出口的 Rect 对象，并记录地板坐标。"""
-        self.wall_rects = []
-        self.floor_coords = [] # 用于敌人随机生成的位置
+        self._grid_view = None
+        self._spawn_sampler = None
         self.exit_rect = None
+        if self.exit_cell:
+            self.exit_rect = pg.Rect(self.exit_cell[0] * TILE_SIZE, self.exit_cell[1] * TILE_SIZE,
+                                     TILE_SIZE, TILE_SIZE) # 记录出口矩形
+
+        if self.cells is not None:
+            # NumPy 模式：地板中心坐标与 Rect 列表都在首次访问时才 (向量化) 生成
+            self._floor_centers = None
+            self._wall_rects = None
+            self._floor_coords = None
+            return
+
+        wall_rects = []
+        floor_coords = [] # 用于敌人随机生成的位置
+        w = self.grid_width
         # 迭代整个网格 (0 到 width-1, 0 到 height-1)
         for r in range(self.grid_height):
-            for c in range(self.grid_width):
+            for c in range(w):
                 rect = pg.Rect(c * TILE_SIZE, r * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-                cell_type = self.grid[r][c]
-
-                if cell_type == WALL:
+                if self._buf[r * w + c] == CELL_WALL:
                     # 只有墙壁才加入碰撞列表
-                    self.wall_rects.append(rect)
-                elif cell_type == EXIT:
-                    self.exit_rect = rect # 记录出口矩形
-                    self.floor_coords.append(rect.center) # 出口也是可通行的地板
-                elif cell_type == START:
-                    self.floor_coords.append(rect.center) # 起点也是可通行的地板
-                elif cell_type == FLOOR:
-                     self.floor_coords.append(rect.center) # 普通地板
+                    wall_rects.append(rect)
+                else:
+                    floor_coords.append(rect.center) # 起点、出口和普通地板都是可通行的地板
+        self._wall_rects = wall_rects
+        self._floor_coords = floor_coords
 
 
-    def draw(self, surface):
+    def _row_limits(self):
+        """可查询的行范围 (闭区间)。"""
+        return 0, self.grid_height - 1
+
+    def _row_cells(self, row):
+        """返回 (存储, 行起始下标)，供 TileQueryMixin 按行读取单元格编码。"""
+        return self._buf, row * self.grid_width
+
+    def walls_at(self, cols, rows):
         """
-        在指定的 Surface 上绘制迷宫。
-        :param surface: 要绘制的目标 Surface (通常是 screen)
+        批量判断单元格是否为墙壁 (供射弹池等向量化代码使用，需要 NumPy)。
+        网格外的单元格视为非墙壁，与 get_cell_span 的裁剪规则一致。
+        :param cols: 列下标的整数数组
+        :param rows: 行下标的整数数组
+        :return: bool 数组
         """
+        w, h = self.grid_width, self.grid_height
+        flat = np.frombuffer(self._buf, dtype=np.uint8)
+        cells = flat[np.clip(rows, 0, h - 1) * w + np.clip(cols, 0, w - 1)] == CELL_WALL
+        if cols.min() < 0 or cols.max() >= w or rows.min() < 0 or rows.max() >= h:
+            cells &= (cols >= 0) & (cols < w) & (rows >= 0) & (rows < h) # 网格外的单元格不是墙
+        return cells
+
+    @property
+    def bounds(self):
+        """迷宫占据的像素区域 (实体的移动边界)。"""
+        return pg.Rect(0, 0, self.grid_width * TILE_SIZE, self.grid_height * TILE_SIZE)
+
+    def set_cell(self, col, row, cell_type):
+        """
+        修改单个单元格的类型，并同步更新 Rect 列表和预渲染图层。
+        :param col: 列
+        :param row: 行
+        :param cell_type: WALL / FLOOR / START / EXIT
+        """
+        code = CELL_CODES[cell_type]
+        idx = row * self.grid_width + col
+        if self._buf[idx] == code:
+            return
+        self._buf[idx] = code
+        self._create_rects()
+        self.invalidate_surface()
+        self.invalidate_flow_field()
+        self._start_dist = None
+        self._analytics = None
+
+    def invalidate_surface(self):
+        """使预渲染的迷宫图层失效，下次 draw 时重新生成。"""
+        self._static_surface = None
+
+    def _bake_surface(self, convert=True):
+        """
+        将整个迷宫 (地板底色、墙壁、起点、终点) 一次性渲染到一个离屏 Surface 上。
+        迷宫在一关之内不会改变，之后每帧只需一次 blit。
+        :param convert: 是否转换为屏幕像素格式；在工作线程中渲染时传 False，之后由主线程调用 convert_surface
+        """
+        surface = pg.Surface((self.grid_width * TILE_SIZE, self.grid_height * TILE_SIZE))
+        self._surface_converted = False
+        if convert:
+            surface = self._convert(surface)
+        surface.fill(COLOR_FLOOR)
+
         # 迭代整个网格进行绘制
+        w = self.grid_width
         for r in range(self.grid_height):
-            for c in range(self.grid_width):
+            for c in range(w):
+                cell_type = self._buf[r * w + c]
+                if cell_type == CELL_FLOOR:
+                    continue # 地板颜色已作为底色填充，不需要特意绘制地板单元格
                 rect = pg.Rect(c * TILE_SIZE, r * TILE_SIZE, TILE_SIZE, TILE_SIZE)
-                cell_type = self.grid[r][c]
 
-                if cell_type == WALL:
+                if cell_type == CELL_WALL:
                     # 绘制墙壁主体
                     pg.draw.rect(surface, COLOR_WALL, rect)
                     # 绘制墙壁边框
                     pg.draw.rect(surface, COLOR_WALL_BORDER, rect, 2) # 2像素宽的边框
-                elif cell_type == START:
+                elif cell_type == CELL_START:
                     # 绘制起点标识
                     start_marker_rect = rect.inflate(-TILE_SIZE * 0.2, -TILE_SIZE * 0.2)
                     pg.draw.rect(surface, COLOR_START, start_marker_rect, border_radius=3)
-                elif cell_type == EXIT:
+                elif cell_type == CELL_EXIT:
                     # 绘制出口标识
                     exit_marker_rect = rect.inflate(-TILE_SIZE * 0.2, -TILE_SIZE * 0.2)
                     pg.draw.rect(surface, COLOR_EXIT, exit_marker_rect, border_radius=3)
-                # 地板颜色是背景色，不需要特意绘制地板单元格
+
+        self._static_surface = surface
+
+    def _convert(self, surface):
+        """转换为屏幕像素格式，blit 更快 (没有显示窗口时原样返回)。Surface.convert 依赖显示，只能在主线程调用。"""
+        if pg.display.get_surface() is None:
+            return surface
+        self._surface_converted = True
+        return surface.convert()
+
+    def convert_surface(self):
+        """把在工作线程中预渲染 (未转换) 的图层转换为屏幕像素格式 (在主线程调用；已转换或未渲染时不做任何事)。"""
+        if self._static_surface is not None and not self._surface_converted:
+            self._static_surface = self._convert(self._static_surface)
+
+    @property
+    def static_surface(self):
+        """预渲染的静态迷宫图层 (首次访问时生成，布局改变后重新生成)。"""
+        if self._static_surface is None:
+            self._bake_surface()
+        return self._static_surface
+
+    def draw(self, surface, offset=(0, 0)):
+        """
+        在指定的 Surface 上绘制迷宫 (blit 预渲染的静态图层)。
+        :param surface: 要绘制的目标 Surface (通常是 screen)
+        :param offset: 摄像机偏移 (像素)，世界坐标减去它即屏幕坐标
+        """
+        surface.blit(self.static_surface, (-offset[0], -offset[1]))
 
     def get_start_pixel_pos(self):
         """获取起点单元格左上角的像素坐标。"""
@@ -203,40 +673,35 @@ class Maze:
         print("警告：无法获取起点位置，返回(0,0)")
         return (0, 0) # 默认返回左上角
 
-    def get_random_floor_coord(self, exclude_rect=None, min_dist_sq_from=None, source_pos=None):
+    @property
+    def spawn_sampler(self):
+        """所有可通行单元格中心上的出生点采样器 (首次访问时创建，布局改变后重建)。"""
+        if self._spawn_sampler is None:
+            self._spawn_sampler = SpawnSampler(self.floor_coords, self.rng)
+        return self._spawn_sampler
+
+    def sample_floor_coords(self, count, exclude_rect=None, min_dist_sq_from=None, source_pos=None):
         """
-        获取一个随机的非墙壁单元格的中心像素坐标。
+        一次抽取 count 个随机地板中心坐标 (可重复)，约束与 get_random_floor_coord 相同。
+        每个样本均摊 O(1)，不再每次复制并筛选整个 floor_coords。
+        :param count: 数量
         :param exclude_rect: 可选，需要排除的 Rect 区域 (例如玩家初始位置)
         :param min_dist_sq_from: 可选，与指定点 source_pos 的最小距离平方
         :param source_pos: 可选，计算最小距离的源点坐标 (元组或 vec)
-        :return: 一个随机的地板中心坐标 (x, y) 元组，如果找不到则返回 None
+        :return: 坐标 (x, y) 列表，找不到合适的坐标时可能少于 count 个
         """
-        # 确保 floor_coords 已经生成
         if not self.floor_coords:
             print("错误：无法获取随机地板坐标，列表为空。")
-            return None
+            return []
+        return self.spawn_sampler.sample(count, exclude_rect, min_dist_sq_from, source_pos)
 
-        valid_coords = list(self.floor_coords) # 创建副本以进行修改
-
-        # 应用排除区域
-        if exclude_rect:
-            valid_coords = [coord for coord in valid_coords if not exclude_rect.collidepoint(coord)]
-
-        # 应用最小距离
-        if min_dist_sq_from is not None and source_pos is not None:
-            valid_coords = [coord for coord in valid_coords
-                            if (coord[0] - source_pos[0])**2 + (coord[1] - source_pos[1])**2 >= min_dist_sq_from]
-
-        if valid_coords:
-            return random.choice(valid_coords)
-        else:
-            # 如果经过筛选后没有合适的点，尝试返回任意一个地板点（除了排除区域）
-            print("警告：无法找到满足所有条件的随机地板坐标，尝试返回备选点。")
-            fallback_coords = list(self.floor_coords)
-            if exclude_rect:
-                 fallback_coords = [coord for coord in fallback_coords if not exclude_rect.collidepoint(coord)]
-            if fallback_coords:
-                return random.choice(fallback_coords)
-            else: # 连备选都没有（迷宫太小或排除区域太大）
-                print("错误：连备选随机地板坐标也找不到！")
-                return None
\ No newline at end of file
+    def get_random_floor_coord(self, exclude_rect=None, min_dist_sq_from=None, source_pos=None):
+        """
+        获取一个随机的非墙壁单元格的中心像素坐标。
+        :param exclude_rect: 可选，需要排除的 Rect 区域 (例如玩家初始位置)
+        :param min_dist_sq_from: 可选，与指定点 source_pos 的最小距离平方
+        :param source_pos: 可选，计算最小距离的源点坐标 (元组或 vec)
+        :return: 一个随机的地板中心坐标 (x, y) 元组，如果找不到则返回 None
+        """
+        coords = self.sample_floor_coords(1, exclude_rect, min_dist_sq_from, source_pos)
+        return coords[0] if coords else None
\ No newline at end of file
@@ -0,0 +1,131 @@
+# maze_analytics.py - 迷宫分析索引：BFS 距离场、最短路径、死胡同与岔路口
+
+from settings import * # 导入设置
+
+def bfs_distances(buf, width, source):
+    """
+    在按行展开的单元格编码上从 source 做 BFS (墙壁不可通行)。
+    Maze 的外圈总是墙壁，因此可通行单元格的相邻下标 ±1 / ±width 不会越界或跨行，无需检查边界。
+    :param buf: 按行展开的 CELL_* 编码
+    :param width: 网格宽度
+    :param source: 源点的展开下标
+    :return: (dist, order)：dist[i] 为单元格 i 到源点的步数 (墙壁/不可达为 -1)；
+             order 为按访问顺序排列的下标，最后一个即离源点最远的单元格
+    """
+    dist = [-1] * len(buf)
+    dist[source] = 0
+    order = [source]
+    append = order.append
+    for cur in order: # 遍历的同时向 order 追加，相当于队列
+        d = dist[cur] + 1
+        # 四个方向展开写，省去内层循环的开销 (这是大迷宫构造时间的主要部分)
+        nxt = cur + 1
+        if dist[nxt] < 0 and buf[nxt] != CELL_WALL:
+            dist[nxt] = d
+            append(nxt)
+        nxt = cur - 1
+        if dist[nxt] < 0 and buf[nxt] != CELL_WALL:
+            dist[nxt] = d
+            append(nxt)
+        nxt = cur + width
+        if dist[nxt] < 0 and buf[nxt] != CELL_WALL:
+            dist[nxt] = d
+            append(nxt)
+        nxt = cur - width
+        if dist[nxt] < 0 and buf[nxt] != CELL_WALL:
+            dist[nxt] = d
+            append(nxt)
+    return dist, order
+
+
+class MazeIndex:
+    """
+    迷宫的分析索引，每个迷宫只构建一次 (通过 Maze.analytics 按需创建并缓存)：
+    - dist_from_start / dist_from_exit：每个单元格到起点/出口的路径步数 (按行展开，墙壁/不可达为 -1)
+    - solution_path：从起点到出口的最短路径 (单元格坐标列表)
+    - dead_ends / junctions：可达区域中只有一个 / 至少三个可通行邻居的单元格
+
+    提示叠加层、难度评估、敌人生成等逻辑直接读取这些结果，无需重复搜索。
+    """
+
+    def __init__(self, maze, start_dist=None):
+        """
+        :param maze: Maze 对象 (需要已放置起点和出口)
+        :param start_dist: 可选，已算好的起点距离场 (放置出口时的 BFS 结果，避免重复计算)
+        """
+        w = maze.grid_width
+        buf = maze._buf
+        self.width = w
+        self.height = maze.grid_height
+        start = maze.start_cell[1] * w + maze.start_cell[0]
+        exit_idx = maze.exit_cell[1] * w + maze.exit_cell[0]
+        if start_dist is None:
+            start_dist, _ = bfs_distances(buf, w, start)
+        self.dist_from_start = start_dist
+
+        # 从出口做 BFS，同时统计每个可达单元格的可通行邻居数，一遍得到死胡同和岔路口
+        dist = [-1] * len(buf)
+        dist[exit_idx] = 0
+        order = [exit_idx]
+        dead_ends, junctions = [], []
+        offsets = (1, -1, w, -w)
+        for cur in order:
+            d = dist[cur] + 1
+            degree = 0
+            for off in offsets:
+                nxt = cur + off
+                if buf[nxt] != CELL_WALL: # 外圈是墙壁，无需检查边界 (见 bfs_distances)
+                    degree += 1
+                    if dist[nxt] < 0:
+                        dist[nxt] = d
+                        order.append(nxt)
+            if degree == 1:
+                dead_ends.append((cur % w, cur // w))
+            elif degree >= 3:
+                junctions.append((cur % w, cur // w))
+        self.dist_from_exit = dist
+        self.reachable = len(order) # 与出口连通的单元格数
+        self.dead_ends = dead_ends
+        self.junctions = junctions
+
+        # 最短路径：从起点出发，每步走到离出口近一步的邻居
+        path = []
+        if dist[start] >= 0:
+            cur = start
+            path.append((cur % w, cur // w))
+            while cur != exit_idx:
+                for off in offsets:
+                    nxt = cur + off
+                    if dist[nxt] == dist[cur] - 1:
+                        cur = nxt
+                        break
+                path.append((cur % w, cur // w))
+        self.solution_path = path
+        self._solution_cells = None
+
+    def distance_from_start(self, col, row):
+        """单元格 (col, row) 到起点的路径步数，不可达时为 -1。"""
+        return self.dist_from_start[row * self.width + col]
+
+    def distance_from_exit(self, col, row):
+        """单元格 (col, row) 到出口的路径步数，不可达时为 -1。"""
+        return self.dist_from_exit[row * self.width + col]
+
+    def on_solution(self, col, row):
+        """单元格 (col, row) 是否在最短路径上。"""
+        if self._solution_cells is None:
+            self._solution_cells = set(self.solution_path)
+        return (col, row) in self._solution_cells
+
+    def stats(self):
+        """
+        迷宫的摘要统计 (可用于难度评估、批量生成的关卡报告)。
+        :return: 字典
+        """
+        return {
+            "solution_length": len(self.solution_path) - 1 if self.solution_path else -1,
+            "reachable_cells": self.reachable,
+            "dead_ends": len(self.dead_ends),
+            "junctions": len(self.junctions),
+            "max_distance_from_start": max(self.dist_from_start),
+        }
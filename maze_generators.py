@@ -0,0 +1,300 @@
+# maze_generators.py - 可插拔的迷宫生成算法
+
+import random
+from settings import * # 导入设置
+
+# --- 生成算法注册表 ---
+# 每个生成函数的签名为 generate(buf, width, height, rng)：
+#   buf    长度为 width * height 的 bytearray，初始全部为 CELL_WALL，按行展开
+#   rng    随机数源 (random 模块或 random.Random 实例)
+# 迷宫“房间”位于奇数坐标 (1, 3, 5, ...)，算法只需打通房间及其之间的墙壁；
+# 起点/终点放置和边界修正由 Maze 统一完成。
+GENERATORS = {}
+
+def register_generator(name):
+    """
+    装饰器：把生成函数注册到 GENERATORS 中。
+    :param name: 算法名 (用于 Maze(algorithm=...) 和 settings.MAZE_ALGORITHM)
+    """
+    def decorator(func):
+        GENERATORS[name] = func
+        return func
+    return decorator
+
+def get_generator(name):
+    """
+    按名称获取生成函数。
+    :param name: 算法名
+    :return: 生成函数；未注册时抛出 ValueError
+    """
+    try:
+        return GENERATORS[name]
+    except KeyError:
+        raise ValueError(f"未知的迷宫生成算法: {name!r} (可选: {', '.join(sorted(GENERATORS))})") from None
+
+def _room_dims(width, height):
+    """返回房间网格的尺寸 (列数, 行数)，房间位于内部的奇数坐标上。"""
+    return (width - 1) // 2, (height - 1) // 2
+
+
+@register_generator("dfs")
+def generate_dfs(buf, width, height, rng=random):
+    """
+    随机深度优先搜索 (Randomized DFS，递归回溯)。
+    生成的迷宫走廊长而曲折、分叉少。直接以 buf 中的墙壁/地板作为访问标记，不再额外分配 visited 数组。
+    """
+    w = width
+    start = 1 * w + 1
+    stack = [start]
+    buf[start] = CELL_FLOOR # 将起点标记为地板
+
+    while stack:
+        cur = stack[-1]
+        cx, cy = cur % w, cur // w
+        neighbors = []
+        # 检查潜在的邻居 (间隔一个单元格)
+        for dx, dy in ((0, 2), (0, -2), (2, 0), (-2, 0)):
+            nx, ny = cx + dx, cy + dy
+            # 确保邻居在内部网格边界内 (1 到 width-2, 1 到 height-2) 且未被访问
+            if 0 < nx < width - 1 and 0 < ny < height - 1 and buf[ny * w + nx] == CELL_WALL:
+                neighbors.append(ny * w + nx)
+
+        if neighbors:
+            nxt = rng.choice(neighbors)
+            buf[nxt] = CELL_FLOOR                     # 打通邻居单元格
+            buf[(cur + nxt) // 2] = CELL_FLOOR        # 打通中间的墙壁
+            stack.append(nxt) # 将新单元格加入栈
+        else:
+            stack.pop() # 回溯
+
+
+@register_generator("kruskal")
+def generate_kruskal(buf, width, height, rng=random):
+    """
+    随机 Kruskal 算法：把所有房间间的墙壁打乱，用并查集 (一维 parent 数组 + 路径减半) 合并连通分量。
+    生成的迷宫分叉多、死胡同短；除 buf 外只需 parent 和候选墙壁两个平坦列表。
+    """
+    cw, ch = _room_dims(width, height)
+    n = cw * ch
+    if n == 0:
+        return
+    parent = list(range(n))
+
+    # 所有候选墙壁：编码为 room * 2 + 方向 (0 = 向右, 1 = 向下)
+    edges = [room * 2 for room in range(n) if room % cw != cw - 1]
+    edges += [room * 2 + 1 for room in range(n - cw)]
+    rng.shuffle(edges)
+
+    for room in range(n):
+        buf[(2 * (room // cw) + 1) * width + 2 * (room % cw) + 1] = CELL_FLOOR
+
+    merges = n - 1
+    for edge in edges:
+        a = edge >> 1
+        b = a + (cw if edge & 1 else 1)
+        # 查找根节点 (路径减半)
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a == b:
+            continue
+        parent[a] = b
+        room = edge >> 1
+        x, y = 2 * (room % cw) + 1, 2 * (room // cw) + 1
+        if edge & 1:
+            buf[(y + 1) * width + x] = CELL_FLOOR
+        else:
+            buf[y * width + x + 1] = CELL_FLOOR
+        merges -= 1
+        if merges == 0:
+            break # 生成树已完成，剩余的墙壁都会成环
+
+
+@register_generator("wilson")
+def generate_wilson(buf, width, height, rng=random):
+    """
+    Wilson 算法 (擦除回路的随机游走)：生成均匀分布的生成树，迷宫没有 DFS/二叉树那样的方向偏置。
+    游走路径只记录在每个房间的“出口方向”数组中，回路会被后续覆盖自动擦除。
+    """
+    cw, ch = _room_dims(width, height)
+    n = cw * ch
+    if n == 0:
+        return
+    in_tree = bytearray(n)
+    exit_dir = bytearray(n) # 每个房间在当前游走中离开的方向: 0 右, 1 左, 2 下, 3 上
+    offsets = (1, -1, cw, -cw)
+
+    def room_floor(room):
+        buf[(2 * (room // cw) + 1) * width + 2 * (room % cw) + 1] = CELL_FLOOR
+
+    first = rng.randrange(n)
+    in_tree[first] = 1
+    room_floor(first)
+
+    for start in range(n):
+        if in_tree[start]:
+            continue
+        # 1. 从 start 随机游走直到碰到树，只记录每个房间最后一次离开的方向
+        room = start
+        while not in_tree[room]:
+            x, y = room % cw, room // cw
+            while True:
+                d = rng.randrange(4)
+                if (d == 0 and x < cw - 1) or (d == 1 and x > 0) or (d == 2 and y < ch - 1) or (d == 3 and y > 0):
+                    break
+            exit_dir[room] = d
+            room += offsets[d]
+
+        # 2. 沿记录的方向重走一遍 (即擦除回路后的路径)，并入树中
+        room = start
+        while not in_tree[room]:
+            in_tree[room] = 1
+            room_floor(room)
+            d = exit_dir[room]
+            x, y = 2 * (room % cw) + 1, 2 * (room // cw) + 1
+            if d == 0:
+                buf[y * width + x + 1] = CELL_FLOOR
+            elif d == 1:
+                buf[y * width + x - 1] = CELL_FLOOR
+            elif d == 2:
+                buf[(y + 1) * width + x] = CELL_FLOOR
+            else:
+                buf[(y - 1) * width + x] = CELL_FLOOR
+            room += offsets[d]
+
+
+@register_generator("binary_tree")
+def generate_binary_tree(buf, width, height, rng=random):
+    """
+    二叉树算法：每个房间随机向北或向西打通一面墙。
+    每个房间只处理一次、无需任何辅助结构，是最快的算法；代价是北边和西边各有一条贯通的长走廊。
+    """
+    cw, ch = _room_dims(width, height)
+    for ry in range(ch):
+        y = 2 * ry + 1
+        row = y * width
+        for rx in range(cw):
+            x = 2 * rx + 1
+            buf[row + x] = CELL_FLOOR
+            if ry > 0 and rx > 0:
+                if rng.random() < 0.5:
+                    buf[row - width + x] = CELL_FLOOR # 向北
+                else:
+                    buf[row + x - 1] = CELL_FLOOR     # 向西
+            elif ry > 0:
+                buf[row - width + x] = CELL_FLOOR
+            elif rx > 0:
+                buf[row + x - 1] = CELL_FLOOR
+
+
+@register_generator("sidewinder")
+def generate_sidewinder(buf, width, height, rng=random):
+    """
+    Sidewinder 算法：逐行处理，每行随机划分成若干段向东的走廊，每段随机挑一个房间向北打通。
+    同样只需一遍扫描；只有第一行是贯通的长走廊，比二叉树的偏置更弱。
+    """
+    cw, ch = _room_dims(width, height)
+    for ry in range(ch):
+        y = 2 * ry + 1
+        row = y * width
+        run_start = 0
+        for rx in range(cw):
+            x = 2 * rx + 1
+            buf[row + x] = CELL_FLOOR
+            at_east = rx == cw - 1
+            close_run = at_east or (ry > 0 and rng.random() < 0.5)
+            if not close_run:
+                buf[row + x + 1] = CELL_FLOOR # 向东延伸当前走廊
+                continue
+            if ry > 0:
+                # 在当前走廊段中随机挑一个房间向北打通
+                cx = 2 * rng.randrange(run_start, rx + 1) + 1
+                buf[row - width + cx] = CELL_FLOOR
+            run_start = rx + 1
+
+
+class EllerRows:
+    """
+    Eller 算法的逐行生成器：只保存当前一行房间的集合编号，内存与迷宫高度无关。
+    每次调用 next_rows() 产出一行房间 (奇数行) 及其下方的连接行 (偶数行)，
+    因此可以无限地向下生成 (无尽模式)，也可以在最后一行调用 finish=True 收尾得到完整迷宫。
+    """
+
+    def __init__(self, width, rng=random, join_chance=0.5, down_chance=0.4):
+        """
+        :param width: 网格宽度 (含左右边界墙)
+        :param rng: 随机数源
+        :param join_chance: 相邻房间在同一行内打通的概率
+        :param down_chance: 每个集合中额外的房间向下打通的概率 (每个集合至少有一个)
+        """
+        self.width = width
+        self.rooms = (width - 1) // 2
+        self.rng = rng
+        self.join_chance = join_chance
+        self.down_chance = down_chance
+        self.sets = [0] * self.rooms # 当前行每个房间的集合编号，0 表示尚未分配
+        self.next_set = 1
+
+    def next_rows(self, finish=False):
+        """
+        生成下一行。
+        :param finish: True 表示这是最后一行：打通所有不同集合，且不再向下连接
+        :return: (room_row, below_row) 两个长度为 width 的 bytearray
+        """
+        rng, sets, n = self.rng, self.sets, self.rooms
+        room_row = bytearray(self.width)
+        below_row = bytearray(self.width)
+
+        # 1. 给新房间分配独立的集合 (members: 集合编号 -> 房间列表)
+        members = {}
+        for x in range(n):
+            room_row[2 * x + 1] = CELL_FLOOR
+            if sets[x] == 0:
+                sets[x] = self.next_set
+                self.next_set += 1
+            members.setdefault(sets[x], []).append(x)
+
+        # 2. 随机打通同一行中属于不同集合的相邻房间 (小集合并入大集合，只重标小集合)
+        for x in range(n - 1):
+            a, b = sets[x], sets[x + 1]
+            if a != b and (finish or rng.random() < self.join_chance):
+                room_row[2 * x + 2] = CELL_FLOOR
+                if len(members[a]) < len(members[b]):
+                    a, b = b, a
+                moved = members.pop(b)
+                for i in moved:
+                    sets[i] = a
+                members[a].extend(moved)
+
+        if finish:
+            return room_row, below_row
+
+        # 3. 每个集合至少向下打通一个房间，其余房间随机向下
+        next_sets = [0] * n
+        for set_id, xs in members.items():
+            forced = rng.choice(xs)
+            for x in xs:
+                if x == forced or rng.random() < self.down_chance:
+                    below_row[2 * x + 1] = CELL_FLOOR
+                    next_sets[x] = set_id
+        self.sets = next_sets
+        return room_row, below_row
+
+
+@register_generator("eller")
+def generate_eller(buf, width, height, rng=random):
+    """
+    Eller 算法：逐行生成，任意时刻只保存一行的集合信息。
+    完整迷宫模式下最后一行会合并所有集合；无尽模式直接使用 EllerRows 逐块生成。
+    """
+    rows = (height - 1) // 2
+    eller = EllerRows(width, rng)
+    for ry in range(rows):
+        room_row, below_row = eller.next_rows(finish=(ry == rows - 1))
+        y = 2 * ry + 1
+        buf[y * width:(y + 1) * width] = room_row
+        if ry < rows - 1:
+            buf[(y + 1) * width:(y + 2) * width] = below_row
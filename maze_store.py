@@ -0,0 +1,442 @@
+# maze_store.py - 确定性的关卡种子、紧凑的二进制迷宫格式 (每格 2 bit) 和按种子索引的 LRU 缓存
+
+import mmap
+import random
+import struct
+from collections import OrderedDict
+from pathlib import Path
+from settings import * # 导入设置
+from maze import Maze
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# --- 种子 ---
+
+def level_seed(run_seed, level):
+    """
+    由本局种子和关卡号派生迷宫种子 (64 位)。同一局的同一关卡总是得到同一个迷宫，
+    报告问题时只需附上本局种子和关卡号 (或直接附上迷宫种子) 即可复现。
+    :param run_seed: 本局种子 (整数)
+    :param level: 关卡号
+    :return: 迷宫种子 (非负整数)
+    """
+    return random.Random(f"{run_seed}/level/{level}").getrandbits(64)
+
+# --- 二进制格式 ---
+# 文件 = 64 字节的定长文件头 + 按行展开的单元格编码 (每格 2 bit，每字节 4 格，低位在前)。
+# 文件头是固定偏移的小端字段，起点/出口坐标直接用 struct.unpack_from 从 mmap 中读取，无需解析网格数据。
+
+MAZE_MAGIC = b"MAZE"
+MAZE_FORMAT_VERSION = 1
+# 魔数, 版本, 标志位, 宽, 高, 种子, 起点列/行, 出口列/行, 算法名, 填充到 64 字节
+HEADER_FORMAT = "<4sHHIIQIIII16s8x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+FLAG_HAS_SEED = 1
+
+# 解包查表：字节值 -> 对应的 4 个单元格编码
+_UNPACK_TABLE = [bytes((b >> shift) & 3 for shift in (0, 2, 4, 6)) for b in range(256)]
+
+def packed_size(width, height):
+    """width x height 的网格打包后的字节数。"""
+    return (width * height + 3) // 4
+
+def pack_cells(buf):
+    """
+    把按行展开的单元格编码 (每格一个字节，取值 0~3) 打包为每格 2 bit。
+    :param buf: bytes / bytearray
+    :return: bytes，长度为 ceil(len(buf) / 4)
+    """
+    n = len(buf)
+    if np is not None:
+        cells = np.zeros(packed_size(n, 1) * 4, dtype=np.uint8)
+        cells[:n] = np.frombuffer(buf, dtype=np.uint8)
+        quad = cells.reshape(-1, 4)
+        return (quad[:, 0] | (quad[:, 1] << 2) | (quad[:, 2] << 4) | (quad[:, 3] << 6)).tobytes()
+    padded = bytes(buf) + bytes(-n % 4)
+    return bytes(padded[i] | (padded[i + 1] << 2) | (padded[i + 2] << 4) | (padded[i + 3] << 6)
+                 for i in range(0, len(padded), 4))
+
+def unpack_cells(packed, count):
+    """
+    pack_cells 的逆操作。
+    :param packed: 打包后的数据 (bytes / memoryview / mmap 切片)
+    :param count: 单元格数量
+    :return: bytearray，每格一个字节
+    """
+    if np is not None:
+        data = np.frombuffer(packed, dtype=np.uint8, count=packed_size(count, 1))
+        cells = np.empty((len(data), 4), dtype=np.uint8)
+        for i in range(4):
+            cells[:, i] = (data >> (2 * i)) & 3
+        return bytearray(cells.ravel()[:count].tobytes())
+    table = _UNPACK_TABLE
+    out = bytearray(b"".join(table[b] for b in bytes(packed[:packed_size(count, 1)])))
+    del out[count:]
+    return out
+
+def pack_maze(maze):
+    """
+    把 Maze 序列化为二进制格式。
+    :param maze: 已生成的 Maze 对象
+    :return: bytes (文件头 + 打包后的网格)
+    """
+    seed = maze.seed
+    start = maze.start_cell or (0, 0)
+    exit_cell = maze.exit_cell or (0, 0)
+    header = struct.pack(HEADER_FORMAT, MAZE_MAGIC, MAZE_FORMAT_VERSION,
+                         FLAG_HAS_SEED if seed is not None else 0,
+                         maze.grid_width, maze.grid_height, 0 if seed is None else seed,
+                         start[0], start[1], exit_cell[0], exit_cell[1],
+                         maze.algorithm.encode("ascii"))
+    return header + pack_cells(maze._buf)
+
+def save_maze(maze, path):
+    """
+    把 Maze 写入文件 (先写临时文件再替换，避免读到写了一半的文件)。
+    :param maze: Maze 对象
+    :param path: 文件路径
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(pack_maze(maze))
+    tmp.replace(path)
+
+
+class MazeFile:
+    """
+    以 mmap 方式打开的迷宫文件。打开时只读取文件头 (尺寸、种子、起点、出口)，
+    网格数据留在映射中，cell() 直接按偏移读取单个单元格；需要完整的 Maze 时调用 to_maze()。
+    """
+
+    def __init__(self, path):
+        """
+        :param path: 文件路径
+        :raises ValueError: 文件不是本格式或版本不支持
+        """
+        self.path = Path(path)
+        self._owns_mmap = True
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_header(self._mmap, 0, len(self._mmap))
+        except ValueError:
+            self.close()
+            raise
+
+    @classmethod
+    def _view(cls, mapping, offset, path):
+        """在已有的映射中偏移 offset 处读取一个迷宫记录 (关卡包中的条目，不负责关闭映射)。"""
+        view = cls.__new__(cls)
+        view.path = path
+        view._owns_mmap = False
+        view._mmap = mapping
+        view._read_header(mapping, offset, len(mapping) - offset)
+        return view
+
+    def _read_header(self, data, offset, length):
+        """从 data[offset:] 读取并校验文件头。"""
+        if length < HEADER_SIZE:
+            raise ValueError(f"迷宫文件过短: {self.path}")
+        (magic, version, flags, width, height, seed,
+         sc, sr, ec, er, algorithm) = struct.unpack_from(HEADER_FORMAT, data, offset)
+        if magic != MAZE_MAGIC:
+            raise ValueError(f"不是迷宫文件: {self.path}")
+        if version != MAZE_FORMAT_VERSION:
+            raise ValueError(f"不支持的迷宫文件版本 {version}: {self.path}")
+        if length < HEADER_SIZE + packed_size(width, height):
+            raise ValueError(f"迷宫文件数据不完整: {self.path}")
+        self.width = width
+        self.height = height
+        self.seed = seed if flags & FLAG_HAS_SEED else None
+        self.start_cell = (sc, sr)
+        self.exit_cell = (ec, er)
+        self.algorithm = algorithm.rstrip(b"\0").decode("ascii")
+        self._data_offset = offset + HEADER_SIZE
+
+    def cell(self, col, row):
+        """直接从映射中读取单元格 (col, row) 的 CELL_* 编码。"""
+        i = row * self.width + col
+        return (self._mmap[self._data_offset + (i >> 2)] >> ((i & 3) * 2)) & 3
+
+    def to_maze(self, use_numpy=None):
+        """
+        解包网格数据并构造 Maze (不运行生成算法)。
+        :param use_numpy: 同 Maze 构造函数
+        :return: Maze 对象
+        """
+        size = packed_size(self.width, self.height)
+        packed = memoryview(self._mmap)[self._data_offset:self._data_offset + size]
+        try:
+            buf = unpack_cells(packed, self.width * self.height)
+        finally:
+            packed.release() # mmap 存在导出的 memoryview 时无法关闭
+        return Maze.from_cells(buf, self.width, self.height, self.start_cell, self.exit_cell,
+                               seed=self.seed, algorithm=self.algorithm, use_numpy=use_numpy)
+
+    def close(self):
+        """关闭映射 (关卡包中的条目由 MazeArchive 负责关闭)。"""
+        if self._owns_mmap:
+            self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_maze(path, use_numpy=None):
+    """
+    从文件读取 Maze。
+    :param path: save_maze 写入的文件
+    :param use_numpy: 同 Maze 构造函数
+    :return: Maze 对象
+    """
+    with MazeFile(path) as f:
+        return f.to_maze(use_numpy)
+
+# --- 关卡包 ---
+# 关卡包 = 64 字节的包头 + 索引 (每个条目的种子和记录偏移) + 定长的迷宫记录。
+# 每条记录就是一个完整的迷宫文件 (同 pack_maze 的输出)；同一个包里的迷宫尺寸相同，因此记录长度固定，
+# 写入前就能算出每条记录的偏移，多个进程可以各自直接写入自己的位置。
+
+ARCHIVE_MAGIC = b"MZPK"
+ARCHIVE_FORMAT_VERSION = 1
+# 魔数, 版本, 标志位(保留), 条目数, 宽, 高, 记录长度, 索引偏移, 算法名, 填充到 64 字节
+ARCHIVE_HEADER_FORMAT = "<4sHHIIIIQ16s16x"
+ARCHIVE_HEADER_SIZE = struct.calcsize(ARCHIVE_HEADER_FORMAT)
+ARCHIVE_INDEX_FORMAT = "<QQ" # 种子, 记录偏移
+ARCHIVE_INDEX_SIZE = struct.calcsize(ARCHIVE_INDEX_FORMAT)
+
+def record_size(width, height):
+    """width x height 的迷宫记录的字节数。"""
+    return HEADER_SIZE + packed_size(width, height)
+
+def create_archive(path, seeds, width, height, algorithm=MAZE_ALGORITHM):
+    """
+    创建关卡包文件：写入包头和索引，并把文件扩展到最终大小 (记录区先填零)，
+    之后由 write_record 把各个迷宫写到各自的偏移。
+    :param path: 文件路径
+    :param seeds: 各条目的迷宫种子 (按关卡顺序)
+    :param width: 网格宽度
+    :param height: 网格高度
+    :param algorithm: 生成算法名
+    :return: 各条目的记录偏移列表
+    """
+    count = len(seeds)
+    size = record_size(width, height)
+    index_offset = ARCHIVE_HEADER_SIZE
+    first = index_offset + count * ARCHIVE_INDEX_SIZE
+    offsets = [first + i * size for i in range(count)]
+    with open(path, "wb") as f:
+        f.write(struct.pack(ARCHIVE_HEADER_FORMAT, ARCHIVE_MAGIC, ARCHIVE_FORMAT_VERSION, 0,
+                            count, width, height, size, index_offset, algorithm.encode("ascii")))
+        f.write(b"".join(struct.pack(ARCHIVE_INDEX_FORMAT, seed, offset) for seed, offset in zip(seeds, offsets)))
+        f.truncate(first + count * size)
+    return offsets
+
+def write_record(f, offset, maze):
+    """
+    把迷宫写入已创建的关卡包中偏移 offset 处的记录。
+    :param f: 以 "r+b" 打开的关卡包文件
+    :param offset: create_archive 返回的记录偏移
+    :param maze: Maze 对象
+    """
+    f.seek(offset)
+    f.write(pack_maze(maze))
+
+
+class MazeArchive:
+    """
+    以 mmap 方式打开的关卡包，按下标或种子随机访问其中的迷宫 (只解包被访问的那一条记录)。
+    """
+
+    def __init__(self, path):
+        """
+        :param path: 关卡包路径
+        :raises ValueError: 文件不是关卡包或版本不支持
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._read_index()
+        except ValueError:
+            self.close()
+            raise
+        self._by_seed = None # 种子 -> 下标 (首次按种子查找时建立)
+
+    def _read_index(self):
+        data = self._mmap
+        if len(data) < ARCHIVE_HEADER_SIZE:
+            raise ValueError(f"关卡包文件过短: {self.path}")
+        (magic, version, _flags, count, width, height,
+         size, index_offset, algorithm) = struct.unpack_from(ARCHIVE_HEADER_FORMAT, data, 0)
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError(f"不是关卡包文件: {self.path}")
+        if version != ARCHIVE_FORMAT_VERSION:
+            raise ValueError(f"不支持的关卡包版本 {version}: {self.path}")
+        index_end = index_offset + count * ARCHIVE_INDEX_SIZE
+        if len(data) < index_end:
+            raise ValueError(f"关卡包索引不完整: {self.path}")
+        self.width = width
+        self.height = height
+        self.algorithm = algorithm.rstrip(b"\0").decode("ascii")
+        self.record_size = size
+        index = list(struct.iter_unpack(ARCHIVE_INDEX_FORMAT, data[index_offset:index_end]))
+        self.seeds = [seed for seed, _ in index]
+        self._offsets = [offset for _, offset in index]
+        if index and self._offsets[-1] + size > len(data):
+            raise ValueError(f"关卡包数据不完整: {self.path}")
+
+    def __len__(self):
+        return len(self.seeds)
+
+    def record(self, i):
+        """
+        第 i 个条目的 MazeFile 视图 (只读取记录头，可用 cell() 查询单元格)。
+        :raises ValueError: 该记录尚未写入或已损坏
+        """
+        return MazeFile._view(self._mmap, self._offsets[i], self.path)
+
+    def load(self, i, use_numpy=None):
+        """
+        读取第 i 个条目。
+        :param i: 下标 (关卡顺序)
+        :param use_numpy: 同 Maze 构造函数
+        :return: Maze 对象
+        """
+        return self.record(i).to_maze(use_numpy)
+
+    def find(self, seed):
+        """
+        按种子查找条目。
+        :return: 下标，不存在时返回 None
+        """
+        if self._by_seed is None:
+            self._by_seed = {}
+            for i, s in enumerate(self.seeds):
+                self._by_seed.setdefault(s, i)
+        return self._by_seed.get(seed)
+
+    def close(self):
+        """关闭映射。"""
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# --- 缓存 ---
+
+def maze_filename(seed, width, height, algorithm):
+    """磁盘缓存中迷宫文件的文件名。"""
+    return f"{algorithm}-{width}x{height}-{seed:016x}.maze"
+
+
+class MazeCache:
+    """
+    最近生成或读取过的迷宫的 LRU 缓存，键为 (种子, 宽, 高, 算法)。
+    重新开始同一关卡 (例如玩家死亡后) 时直接复用已生成的 Maze 及其预渲染图层和分析索引。
+    可选的 directory 作为第二级磁盘缓存：内存未命中时先尝试读取文件，仍未命中才生成并写入文件。
+    """
+
+    def __init__(self, capacity=MAZE_CACHE_SIZE, directory=None):
+        """
+        :param capacity: 内存中最多保留的迷宫数量 (0 表示不在内存中缓存)
+        :param directory: 可选，磁盘缓存目录
+        """
+        self.capacity = capacity
+        self.directory = Path(directory) if directory is not None else None
+        self._entries = OrderedDict() # 键 -> Maze，最近使用的在末尾
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def holds(self, maze):
+        """maze 这个对象当前是否在缓存中。"""
+        return any(m is maze for m in self._entries.values())
+
+    @staticmethod
+    def key(seed, width=GRID_WIDTH, height=GRID_HEIGHT, algorithm=MAZE_ALGORITHM):
+        """缓存键。"""
+        return (seed, width, height, algorithm)
+
+    def get(self, key):
+        """
+        查找缓存的迷宫，命中时标记为最近使用并把抽样随机数源重置到初始状态。
+        :return: Maze 对象，未命中时返回 None
+        """
+        maze = self._entries.get(key)
+        if maze is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        maze.reset_rng()
+        return maze
+
+    def put(self, maze):
+        """
+        加入 (或刷新) 一个有种子的迷宫，超出容量时淘汰最久未使用的迷宫。
+        :param maze: Maze 对象 (seed 为 None 时不缓存)
+        :return: 被淘汰的迷宫列表 (调用方可以把它们交给后台释放，见 LevelPrefetcher.retire)
+        """
+        if maze.seed is None or self.capacity <= 0:
+            return []
+        key = self.key(maze.seed, maze.grid_width, maze.grid_height, maze.algorithm)
+        self._entries[key] = maze
+        self._entries.move_to_end(key)
+        evicted = []
+        while len(self._entries) > self.capacity:
+            evicted.append(self._entries.popitem(last=False)[1])
+        return evicted
+
+    def load_or_build(self, seed, width=GRID_WIDTH, height=GRID_HEIGHT, algorithm=MAZE_ALGORITHM):
+        """
+        不经过内存缓存，从磁盘缓存读取迷宫，没有则生成 (并在设置了 directory 时写入文件)。
+        可以在工作线程中调用 (不修改缓存状态以外的共享数据)。
+        :return: Maze 对象
+        """
+        if self.directory is not None:
+            path = self.directory / maze_filename(seed, width, height, algorithm)
+            if path.exists():
+                try:
+                    maze = load_maze(path)
+                    self.disk_hits += 1
+                    return maze
+                except (OSError, ValueError) as e:
+                    print(f"警告：读取迷宫缓存文件失败，重新生成: {e}")
+            maze = Maze(width, height, algorithm=algorithm, seed=seed)
+            try:
+                save_maze(maze, path)
+            except OSError as e:
+                print(f"警告：写入迷宫缓存文件失败: {e}")
+            return maze
+        return Maze(width, height, algorithm=algorithm, seed=seed)
+
+    def get_or_build(self, seed, width=GRID_WIDTH, height=GRID_HEIGHT, algorithm=MAZE_ALGORITHM):
+        """
+        按种子取得迷宫：内存缓存 -> 磁盘缓存 -> 生成，结果放入内存缓存。
+        :return: Maze 对象
+        """
+        maze = self.get(self.key(seed, width, height, algorithm))
+        if maze is None:
+            maze = self.load_or_build(seed, width, height, algorithm)
+            self.put(maze)
+        return maze
+
+    def summary(self):
+        """命中统计 (一行文本)。"""
+        return f"迷宫缓存: 命中 {self.hits} 次, 未命中 {self.misses} 次, 磁盘命中 {self.disk_hits} 次"
@@ -2,8 +2,8 @@
 
 import pygame as pg
 from settings import * # 导入设置
-from utils import vec # 导入向量类型
-from projectile import Projectile # 导入射弹类
+from utils import vec, lerp_xy # 导入向量类型
+from sprites import get_sprite
 
 class Player:
     def __init__(self, game, x, y):
@@ -19,15 +19,21 @@ class Player:
         self.vel = vec(0, 0) # 玩家的速度向量
         self.pos = vec(x + self.size / 2, y + self.size / 2) # 玩家的中心精确位置向量
         self.rect.center = self.pos # 更新矩形中心
+        self.prev_xy = self.rect.topleft # 上一个模拟 tick 的左上角，绘制时插值用
 
         self.sprinting = False # 玩家是否在加速
         self.last_shot_time = 0 # 上次射击的时间戳
         self.last_move_dir = vec(1, 0) # 记录上次移动的方向，用于射击，默认为右
 
-    def handle_input(self):
-        """处理玩家的键盘输入。"""
+    def handle_input(self, keys=None):
+        """
+        处理玩家的键盘输入。
+        :param keys: 可选，按键状态 (支持 keys[pg.K_x] 索引)，用于无界面模式的脚本输入；
+                     None 表示读取真实键盘 pg.key.get_pressed()
+        """
         self.vel = vec(0, 0) # 每帧开始时重置速度
-        keys = pg.key.get_pressed()
+        if keys is None:
+            keys = pg.key.get_pressed()
 
         # --- 加速 ---
         self.sprinting = keys[pg.K_LSHIFT] or keys[pg.K_p]
@@ -59,41 +65,42 @@ class Player:
 
     def shoot(self):
         """玩家进行射击。"""
-        now = pg.time.get_ticks()
+        now = self.game.get_ticks()
         if now - self.last_shot_time > PLAYER_SHOOT_DELAY:
             self.last_shot_time = now
             # 计算射弹的起始位置 (玩家中心 + 稍微向前偏移一点)
             spawn_pos = self.pos + self.last_move_dir * (self.size / 2 + PROJECTILE_RADIUS)
-            # 创建射弹实例，并将其添加到游戏主类的射弹列表中
-            Projectile(self.game, spawn_pos, self.last_move_dir)
+            # 通过游戏主类发射射弹 (射弹池或 Projectile 对象列表)
+            self.game.spawn_projectile(spawn_pos, self.last_move_dir)
 
 
-    def update(self, wall_rects):
+    def update(self, maze):
         """
         更新玩家的位置，并处理与墙壁的碰撞。
-        :param wall_rects: 包含所有墙壁 Rect 对象的列表
+        :param maze: 当前迷宫对象，通过 maze.walls_near 只查询附近单元格的墙壁
         """
         # --- 更新精确位置 ---
-        # 注意：这里我们不使用 dt (delta time)，因为速度是像素/帧。
-        # 如果需要基于时间的移动，需要乘以 self.game.dt
+        # 注意：这里我们不使用 dt (delta time)，因为速度是像素/tick，
+        # 而 update 以固定的 SIM_RATE 运行 (见 Game.run)，与渲染帧率无关
         self.pos += self.vel # 更新中心位置
 
         # --- 碰撞检测与位置修正 ---
         # 将更新后的中心位置应用到矩形上，分开处理 x 和 y 轴
         self.rect.centerx = self.pos.x
-        self._collide_with_walls(wall_rects, 'x') # 水平碰撞检测和修正
+        self._collide_with_walls(maze.walls_near(self.rect), 'x') # 水平碰撞检测和修正
         self.rect.centery = self.pos.y
-        self._collide_with_walls(wall_rects, 'y') # 垂直碰撞检测和修正
-
-        # --- 确保玩家在屏幕边界内 ---
-        if self.rect.left < 0:
-            self.rect.left = 0
-        if self.rect.right > SCREEN_WIDTH:
-            self.rect.right = SCREEN_WIDTH
-        if self.rect.top < 0:
-            self.rect.top = 0
-        if self.rect.bottom > SCREEN_HEIGHT:
-            self.rect.bottom = SCREEN_HEIGHT
+        self._collide_with_walls(maze.walls_near(self.rect), 'y') # 垂直碰撞检测和修正
+
+        # --- 确保玩家在迷宫边界内 (普通迷宫即屏幕范围) ---
+        bounds = maze.bounds
+        if self.rect.left < bounds.left:
+            self.rect.left = bounds.left
+        if self.rect.right > bounds.right:
+            self.rect.right = bounds.right
+        if self.rect.top < bounds.top:
+            self.rect.top = bounds.top
+        if self.rect.bottom > bounds.bottom:
+            self.rect.bottom = bounds.bottom
 
         # --- 最后，根据修正后的 rect 更新精确位置 pos ---
         self.pos.x = self.rect.centerx
@@ -103,7 +110,7 @@ class Player:
     def _collide_with_walls(self, wall_rects, direction):
         """
         私有方法：检测并处理与墙壁的碰撞。
-        :param wall_rects: 墙壁 Rect 列表
+        :param wall_rects: 墙壁 Rect 列表 (通常是 maze.walls_near 返回的附近墙壁)
         :param direction: 'x' 或 'y'，指示当前处理的轴向
         """
         for wall in wall_rects:
@@ -124,21 +131,47 @@ class Player:
                     self.pos.y = self.rect.centery # 更新精确位置
 
 
-    def draw(self, surface):
+    @staticmethod
+    def paint(surface, rect, sprinting=False):
         """
-        在指定的 Surface 上绘制玩家。
+        用图元绘制玩家的外观 (只在生成精灵时调用，普通和加速两种颜色各一次)。
         :param surface: 目标 Surface
+        :param rect: 玩家在 surface 上的矩形
+        :param sprinting: 是否使用加速时的颜色
+        :return: 绘制覆盖的区域 (Rect)
         """
         # --- 确定玩家颜色 (是否在加速) ---
-        player_color = COLOR_PLAYER_SPRINT if self.sprinting else COLOR_PLAYER
+        player_color = COLOR_PLAYER_SPRINT if sprinting else COLOR_PLAYER
 
         # --- 绘制边框 ---
         # 计算边框矩形 (比玩家矩形稍大一点)
         border_size_increase = 2 # 边框每边多出的像素
-        border_rect = pg.Rect(0, 0, self.rect.width + border_size_increase * 2, self.rect.height + border_size_increase * 2)
-        border_rect.center = self.rect.center # 保持中心对齐
+        border_rect = pg.Rect(0, 0, rect.width + border_size_increase * 2, rect.height + border_size_increase * 2)
+        border_rect.center = rect.center # 保持中心对齐
 
-        pg.draw.rect(surface, COLOR_PLAYER_BORDER, border_rect, border_radius=3)
+        drawn = pg.draw.rect(surface, COLOR_PLAYER_BORDER, border_rect, border_radius=3)
 
         # --- 绘制玩家主体 ---
-        pg.draw.rect(surface, player_color, self.rect, border_radius=3)
\ No newline at end of file
+        pg.draw.rect(surface, player_color, rect, border_radius=3)
+        return drawn
+
+    def sprite_blit(self, offset=(0, 0), alpha=1.0):
+        """
+        当前外观的 (精灵, 屏幕坐标)，可与其他实体一起交给 Surface.blits。
+        :param offset: 摄像机偏移 (像素)
+        :param alpha: 插值系数：在 prev_xy (0) 与当前位置 (1) 之间绘制
+        """
+        size, sprinting = self.size, self.sprinting
+        sprite, (dx, dy) = get_sprite(("player", size, sprinting),
+                                      lambda surface, anchor: Player.paint(surface, pg.Rect(anchor, (size, size)), sprinting))
+        x, y = lerp_xy(self.prev_xy, self.rect.topleft, alpha) if alpha < 1.0 else self.rect.topleft
+        return sprite, (x - offset[0] + dx, y - offset[1] + dy)
+
+    def draw(self, surface, offset=(0, 0)):
+        """
+        在指定的 Surface 上绘制玩家 (blit 预渲染的精灵)。
+        :param surface: 目标 Surface
+        :param offset: 摄像机偏移 (像素)
+        :return: 绘制覆盖的屏幕区域 (Rect，供脏矩形刷新使用)
+        """
+        return surface.blit(*self.sprite_blit(offset))
\ No newline at end of file
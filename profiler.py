@@ -0,0 +1,229 @@
+# profiler.py - 帧阶段性能分析器与屏幕叠加层
+
+import json
+import time
+from collections import deque
+from settings import * # 导入设置
+from utils import draw_text, text_cache
+from maze import TileQueryMixin
+
+class FrameProfiler:
+    """
+    按阶段统计每帧耗时 (perf_counter_ns)，保存最近 PROFILER_WINDOW 帧的样本以计算 p50/p95/p99，
+    并记录实体数、检查的墙壁单元格数、绘制调用数和文本渲染数 (draw_text 缓存未命中的次数)。
+
+    用法：每帧调用 start_frame()，每个阶段结束时调用 mark("阶段名")，帧末调用 end_frame(game)。
+    禁用时这些方法被替换为空函数，开销只剩一次函数调用。
+    """
+
+    def __init__(self, enabled=False, export=False, window=PROFILER_WINDOW):
+        """
+        :param enabled: 是否启用统计 (同时显示叠加层)
+        :param export: 是否把每帧数据写入 JSONL 文件 (导出时总是统计)
+        :param window: 滚动窗口的帧数
+        """
+        self.window = window
+        self.samples = {}        # 阶段名 -> deque[纳秒]
+        self.counters = {}       # 计数名 -> deque[每帧计数]
+        self.frame = {}          # 当前帧各阶段的耗时
+        self.frame_counts = {}   # 当前帧的计数
+        self.frame_index = 0
+        self.enabled = False
+        self.show_overlay = False
+        self._last = 0
+        self._frame_start = 0
+        self._export_file = None
+        self._summary = []       # 叠加层显示的缓存行 (每 PROFILER_OVERLAY_INTERVAL 帧刷新)
+        self._text_misses = text_cache.misses # 上一帧结束时文本缓存的累计未命中数
+        self.export_path = None
+        self.set_enabled(enabled)
+        if export:
+            self.start_export()
+
+    # --- 开关 ---
+
+    def set_enabled(self, enabled):
+        """
+        启用/禁用统计；禁用时把计时方法换成空函数。
+        从禁用切换到启用时不立即开始计时：开关发生的这一帧没有完整的阶段数据 (上次的时间戳已过时)，
+        丢弃这一帧，到帧末的 end_frame 才清零计数并恢复真实方法，下一帧的 start_frame 开始统计。
+        迷宫的墙壁检查计数 (TileQueryMixin.count_walls) 只在启用时打开。
+        """
+        was_enabled = self.enabled
+        self.enabled = enabled or self._export_file is not None
+        self.show_overlay = enabled
+        TileQueryMixin.count_walls = self.enabled
+        if not self.enabled:
+            self.start_frame = self.mark = self.count = self.end_frame = _noop
+        elif not was_enabled:
+            self.start_frame = self.mark = self.count = _noop
+            self.end_frame = self._activate
+
+    def _activate(self, game):
+        """
+        启用后第一个帧末：丢弃这一帧，清零这一帧中累计的墙壁检查和禁用期间的文本渲染计数，恢复类上的真实方法。
+        :param game: Game 对象
+        """
+        if game.maze is not None:
+            game.maze.walls_checked = 0
+        self._text_misses = text_cache.misses
+        self.frame = {}
+        self.frame_counts = {}
+        # 删除实例属性，恢复类上的真实方法
+        for name in ("start_frame", "mark", "count", "end_frame"):
+            self.__dict__.pop(name, None)
+
+    def toggle(self):
+        """切换统计与叠加层 (游戏中按 F3)。"""
+        self.set_enabled(not self.show_overlay)
+
+    def start_export(self, path=None):
+        """
+        开始把每帧数据写入 JSONL 文件 (每行一帧)。
+        :param path: 可选，文件路径；默认在 PROFILE_DIR 下按会话开始时间命名
+        """
+        if path is None:
+            PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+            path = PROFILE_DIR / f"session-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+        self.export_path = path
+        self._export_file = open(path, "w", encoding="utf-8")
+        self.set_enabled(self.show_overlay)
+        print(f"性能数据将导出到: {path}")
+
+    def close(self):
+        """结束导出并关闭文件。"""
+        if self._export_file:
+            self._export_file.close()
+            self._export_file = None
+            self.set_enabled(self.show_overlay)
+
+    # --- 计时 ---
+
+    def start_frame(self):
+        """一帧开始。"""
+        self.frame = {}
+        self.frame_counts = {}
+        self._frame_start = self._last = time.perf_counter_ns()
+
+    def mark(self, phase):
+        """
+        结束一个阶段：把距上次 mark (或帧开始) 的时间计入 phase。
+        :param phase: 阶段名
+        """
+        now = time.perf_counter_ns()
+        self.frame[phase] = self.frame.get(phase, 0) + now - self._last
+        self._last = now
+
+    def count(self, name, amount=1):
+        """
+        累加当前帧的计数。
+        :param name: 计数名 (如 "draw_calls")
+        :param amount: 增加的数量
+        """
+        self.frame_counts[name] = self.frame_counts.get(name, 0) + amount
+
+    def end_frame(self, game):
+        """
+        一帧结束：记录总耗时和实体/墙壁计数，写入滚动窗口和导出文件。
+        :param game: Game 对象，用于读取实体数量和迷宫的墙壁检查计数
+        """
+        now = time.perf_counter_ns()
+        self.frame["frame"] = now - self._frame_start
+        counts = self.frame_counts
+        counts["enemies"] = len(game.enemies)
+        counts["projectiles"] = len(game.projectiles)
+        if game.maze is not None:
+            counts["walls_checked"] = game.maze.walls_checked
+            game.maze.walls_checked = 0
+        counts["text_renders"] = text_cache.misses - self._text_misses
+        self._text_misses = text_cache.misses
+
+        for phase, ns in self.frame.items():
+            self.samples.setdefault(phase, deque(maxlen=self.window)).append(ns)
+        for name, value in counts.items():
+            self.counters.setdefault(name, deque(maxlen=self.window)).append(value)
+
+        if self._export_file:
+            record = {"frame": self.frame_index, "t_ns": now, "phases": self.frame, "counts": counts}
+            self._export_file.write(json.dumps(record) + "\n")
+        if self.frame_index % PROFILER_OVERLAY_INTERVAL == 0:
+            self._summary = self.summary_lines()
+        self.frame_index += 1
+
+    # --- 统计 ---
+
+    def percentiles(self, phase):
+        """
+        计算某阶段在滚动窗口内的 p50/p95/p99 (毫秒)。
+        :return: (p50, p95, p99)，没有样本时返回 None
+        """
+        samples = self.samples.get(phase)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+        return tuple(ordered[round(last * q)] / 1e6 for q in (0.50, 0.95, 0.99))
+
+    def summary_lines(self):
+        """生成叠加层显示的文本行。"""
+        lines = ["阶段            p50    p95    p99 (ms)"]
+        for phase in self.samples:
+            p50, p95, p99 = self.percentiles(phase)
+            lines.append(f"{phase:<14s}{p50:6.2f} {p95:6.2f} {p99:6.2f}")
+        for name, values in self.counters.items():
+            lines.append(f"{name:<14s}{values[-1]:6d}")
+        return lines
+
+    def draw_overlay(self, surface):
+        """
+        在屏幕右上角绘制统计叠加层。
+        :return: 叠加层覆盖的区域 (Rect 列表，未显示时为空)
+        """
+        if not self.show_overlay:
+            return []
+        rects = []
+        y = 8
+        for line in self._summary:
+            rects.append(draw_text(surface, line, 16, COLOR_WHITE, surface.get_width() - 8, y, align="topright"))
+            y += 16
+        return rects
+
+
+def _noop(*args, **kwargs):
+    """禁用时替代计时方法的空函数。"""
+    return None
+
+
+class StartupTimer:
+    """
+    记录启动各阶段的耗时，首帧显示后打印一次分阶段报告 (跟踪从进程启动到首帧的时间)。
+    用法：startup.mark("阶段名") 标记一个阶段结束；首帧 flip 之后调用 report()。
+    """
+
+    def __init__(self, start=None):
+        """
+        :param start: 计时起点 (time.perf_counter() 的值)；None 表示现在
+        """
+        self.start = time.perf_counter() if start is None else start
+        self._last = self.start
+        self.phases = [] # [(阶段名, 秒)]
+        self.reported = False
+
+    def mark(self, phase):
+        """记录从上一次标记到现在的耗时，归入 phase。"""
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    def total(self):
+        """从起点到最后一次标记的总耗时 (秒)。"""
+        return self._last - self.start
+
+    def report(self):
+        """打印分阶段的启动耗时 (只打印一次)。"""
+        if self.reported:
+            return
+        self.reported = True
+        print(f"启动耗时 (到首帧): {self.total() * 1000:.1f} ms")
+        for phase, seconds in self.phases:
+            print(f"  {phase:<14s}{seconds * 1000:8.1f} ms")
@@ -2,7 +2,8 @@
 
 import pygame as pg
 from settings import * # 导入设置
-from utils import vec # 导入向量
+from utils import vec, lerp_xy # 导入向量
+from sprites import get_sprite
 
 class Projectile:
     def __init__(self, game, pos, direction):
@@ -18,7 +19,8 @@ class Projectile:
         self.radius = PROJECTILE_RADIUS
         self.rect = pg.Rect(pos.x - self.radius, pos.y - self.radius,
                              self.radius * 2, self.radius * 2) # 用于粗略碰撞检测的矩形
-        self.spawn_time = pg.time.get_ticks() # 记录生成时间，用于判断寿命
+        self.prev_xy = self.rect.center # 上一个模拟 tick 的中心，绘制时插值用
+        self.spawn_time = game.get_ticks() # 记录生成时间，用于判断寿命
 
         # 将自身添加到游戏主类的射弹列表中
         self.game.projectiles.append(self)
@@ -29,11 +31,12 @@ class Projectile:
         self.rect.center = self.pos # 更新碰撞矩形的位置
 
         # --- 检查寿命 ---
-        # if pg.time.get_ticks() - self.spawn_time > PROJECTILE_LIFETIME:
+        # if self.game.get_ticks() - self.spawn_time > PROJECTILE_LIFETIME:
         #     self.kill() # 标记为待移除
 
-        # --- 检查是否超出屏幕边界 ---
-        if not (0 < self.pos.x < SCREEN_WIDTH and 0 < self.pos.y < SCREEN_HEIGHT):
+        # --- 检查是否超出迷宫边界 (普通迷宫即屏幕范围) ---
+        bounds = self.game.maze.bounds
+        if not (bounds.left < self.pos.x < bounds.right and bounds.top < self.pos.y < bounds.bottom):
             self.kill() # 超出边界也移除
 
     def kill(self):
@@ -41,9 +44,36 @@ class Projectile:
         if self in self.game.projectiles:
             self.game.projectiles.remove(self)
 
-    def draw(self, surface):
+    @staticmethod
+    def sprite(radius):
+        """半径为 radius 的射弹精灵：(Surface, 相对圆心的偏移)。"""
+        return get_sprite(("projectile", radius),
+                          lambda surface, anchor: pg.draw.circle(surface, COLOR_PROJECTILE, anchor, radius))
+
+    @staticmethod
+    def blit_sequence(projectiles, offset=(0, 0), alpha=1.0):
+        """
+        一组射弹的 (精灵, 屏幕坐标) 列表，交给 Surface.blits 一次绘制。
+        :param projectiles: Projectile 列表
+        :param offset: 摄像机偏移 (像素)
+        :param alpha: 插值系数：在 prev_xy (0) 与当前位置 (1) 之间绘制
+        """
+        if not projectiles:
+            return []
+        sprite, (dx, dy) = Projectile.sprite(projectiles[0].radius)
+        if alpha < 1.0:
+            return [(sprite, (x + dx - offset[0], y + dy - offset[1]))
+                    for x, y in (lerp_xy(p.prev_xy, p.rect.center, alpha) for p in projectiles)]
+        dx -= offset[0]
+        dy -= offset[1]
+        return [(sprite, (p.rect.centerx + dx, p.rect.centery + dy)) for p in projectiles]
+
+    def draw(self, surface, offset=(0, 0)):
         """
-        在指定的 Surface 上绘制射弹。
+        在指定的 Surface 上绘制射弹 (blit 预渲染的精灵)。
         :param surface: 目标 Surface
+        :param offset: 摄像机偏移 (像素)
+        :return: 绘制覆盖的屏幕区域 (Rect，供脏矩形刷新使用)
         """
-        pg.draw.circle(surface, COLOR_PROJECTILE, self.rect.center, self.radius)
\ No newline at end of file
+        sprite, (dx, dy) = Projectile.sprite(self.radius)
+        return surface.blit(sprite, (self.rect.centerx - offset[0] + dx, self.rect.centery - offset[1] + dy))
\ No newline at end of file
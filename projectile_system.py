@@ -0,0 +1,263 @@
+# projectile_system.py - 结构数组 (SoA) 射弹池：批量更新、批量碰撞、槽位复用
+
+import math
+import pygame as pg
+from settings import * # 导入设置
+from spatial_hash import overlapping_pairs
+from projectile import Projectile
+from enemy_system import EnemySystem
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+AVAILABLE = np is not None # 射弹池依赖 NumPy
+
+def _remaining(enemies, hit):
+    """
+    移除被击中的敌人。
+    :param enemies: 敌人列表或 EnemySystem
+    :param hit: 被击中的敌人下标集合
+    :return: 新的敌人列表；EnemySystem 则原地移除并返回它本身
+    """
+    if isinstance(enemies, EnemySystem):
+        if hit:
+            enemies.remove(sorted(hit))
+        return enemies
+    if not hit:
+        return list(enemies)
+    hit = set(hit)
+    return [enemy for i, enemy in enumerate(enemies) if i not in hit]
+
+class ProjectileSystem:
+    """
+    用预分配的 NumPy 数组存储所有射弹的位置、速度、生成时间，代替一个个 Projectile 对象。
+    每个 tick 的移动、出界剔除、撞墙判定都是整批的数组运算；被移除的槽位进入空闲列表，
+    下次发射时直接复用，不再分配新对象，也没有 list.remove 的 O(n) 开销。
+
+    碰撞语义与 Projectile 相同：射弹矩形为以 (四舍五入后的) 中心为中心、边长 2 * PROJECTILE_RADIUS 的方形，
+    按发射顺序与敌人逐个判定，一发射弹只能击中一个敌人。
+    """
+
+    def __init__(self, capacity=PROJECTILE_POOL_CAPACITY, radius=PROJECTILE_RADIUS, lifetime=None):
+        """
+        :param capacity: 初始容量 (不够时自动翻倍)
+        :param radius: 射弹半径
+        :param lifetime: 可选，射弹寿命 (毫秒)；None 表示不限寿命
+        """
+        if np is None:
+            raise ImportError("ProjectileSystem 需要 NumPy")
+        self.radius = radius
+        self.lifetime = lifetime
+        self.capacity = 0
+        self.pos = np.zeros((0, 2))                 # 中心位置 (浮点)
+        self.prev = np.zeros((0, 2))                # 上一个模拟 tick 的中心位置 (snapshot 记录，绘制时插值用)
+        self.vel = np.zeros((0, 2))                 # 速度 (像素/帧)
+        self.spawn_time = np.zeros(0, dtype=np.int64) # 生成时间 (毫秒)
+        self.seq = np.zeros(0, dtype=np.int64)      # 发射序号，用于保持“先发射先判定”的顺序
+        self.alive = np.zeros(0, dtype=bool)        # 槽位是否在使用中
+        self.free = []                              # 空闲槽位栈
+        self.count = 0                              # 存活射弹数
+        self._next_seq = 0
+        self._grow(capacity)
+
+    def _grow(self, capacity):
+        """把所有数组扩容到 capacity，新槽位加入空闲列表。"""
+        old = self.capacity
+        extra = capacity - old
+        self.pos = np.concatenate((self.pos, np.zeros((extra, 2))))
+        self.prev = np.concatenate((self.prev, np.zeros((extra, 2))))
+        self.vel = np.concatenate((self.vel, np.zeros((extra, 2))))
+        self.spawn_time = np.concatenate((self.spawn_time, np.zeros(extra, dtype=np.int64)))
+        self.seq = np.concatenate((self.seq, np.zeros(extra, dtype=np.int64)))
+        self.alive = np.concatenate((self.alive, np.zeros(extra, dtype=bool)))
+        # 倒序压栈，使低下标的槽位先被使用
+        self.free.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        """移除所有射弹 (与 list.clear 同名，Game.reset_game 对两种存储统一调用)。"""
+        self.alive[:] = False
+        self.free = list(range(self.capacity - 1, -1, -1))
+        self.count = 0
+
+    def spawn(self, pos, direction, now):
+        """
+        发射一枚射弹。
+        :param pos: 初始中心位置
+        :param direction: 方向向量 (无需归一化)
+        :param now: 当前游戏时间 (毫秒)
+        :return: 占用的槽位
+        """
+        if not self.free:
+            self._grow(max(self.capacity * 2, 16))
+        slot = self.free.pop()
+        vel = pg.math.Vector2(direction).normalize() * PROJECTILE_SPEED
+        self.pos[slot] = self.prev[slot] = (pos[0], pos[1])
+        self.vel[slot] = (vel.x, vel.y)
+        self.spawn_time[slot] = now
+        self.seq[slot] = self._next_seq
+        self._next_seq += 1
+        self.alive[slot] = True
+        self.count += 1
+        return slot
+
+    def snapshot(self):
+        """记录所有射弹当前的位置，作为下一个 tick 之后插值绘制的起点。"""
+        np.copyto(self.prev, self.pos)
+
+    def kill(self, slots):
+        """
+        移除一批射弹，槽位归还空闲列表。
+        :param slots: 槽位下标数组
+        """
+        slots = slots[self.alive[slots]]
+        self.alive[slots] = False
+        self.free.extend(slots.tolist())
+        self.count -= len(slots)
+
+    def _live(self):
+        """存活槽位的下标数组。"""
+        return np.flatnonzero(self.alive)
+
+    def _rects(self, idx):
+        """
+        计算射弹碰撞矩形的左上角 (中心与 Rect.center = pos 相同地四舍五入)。
+        :return: (N, 2) 整数数组，每行为 (left, top)
+        """
+        return np.floor(self.pos[idx] + (0.5 - self.radius)).astype(np.int64)
+
+    def _scalar_rects(self, idx):
+        """少量射弹时使用：按发射顺序返回 [(槽位, Rect)]。"""
+        r = self.radius
+        size = 2 * r
+        order = sorted(zip(self.seq[idx].tolist(), idx.tolist(), self.pos[idx].tolist()))
+        return [(slot, pg.Rect(math.floor(x + 0.5) - r, math.floor(y + 0.5) - r, size, size))
+                for _, slot, (x, y) in order]
+
+    def update(self, bounds, now=None):
+        """
+        整批移动射弹，移除超出边界 (以及超过寿命) 的射弹。
+        :param bounds: 迷宫边界 Rect
+        :param now: 当前游戏时间 (毫秒)，仅在设置了寿命时需要
+        """
+        idx = self._live()
+        if len(idx) == 0:
+            return
+        self.pos[idx] += self.vel[idx]
+        x, y = self.pos[idx, 0], self.pos[idx, 1]
+        dead = ~((bounds.left < x) & (x < bounds.right) & (bounds.top < y) & (y < bounds.bottom))
+        if self.lifetime is not None and now is not None:
+            dead |= now - self.spawn_time[idx] > self.lifetime
+        if dead.any():
+            self.kill(idx[dead])
+
+    def resolve_wall_hits(self, maze):
+        """
+        整批判定射弹在本 tick 移动的线段上是否碰到墙壁 (DDA 扫掠，见 TileQueryMixin.sweep)，碰墙的射弹被移除。
+        只访问线段穿过的单元格，射弹速度超过一个单元格也不会穿墙。
+        :param maze: 提供 sweep / sweep_many (需要 walls_at) 的迷宫对象
+        :return: 撞墙位置 (射弹中心) 的列表 [(x, y)]
+        """
+        idx = self._live()
+        if len(idx) == 0:
+            return []
+        ends = self.pos[idx]
+        starts = ends - self.vel[idx] # update 中 pos += vel，线段起点即上一 tick 的位置
+        if len(idx) <= PROJECTILE_SCALAR_LIMIT:
+            dead, impacts = [], []
+            for slot, start, end in zip(idx.tolist(), starts.tolist(), ends.tolist()):
+                hit = maze.sweep(start, end, self.radius)
+                if hit is not None:
+                    dead.append(slot)
+                    impacts.append(hit[1])
+            if dead:
+                self.kill(np.array(dead))
+            return impacts
+        t = maze.sweep_many(starts, ends, self.radius)
+        hit = t <= 1.0
+        if not hit.any():
+            return []
+        self.kill(idx[hit])
+        impacts = starts[hit] + (ends[hit] - starts[hit]) * t[hit, None]
+        return list(map(tuple, impacts.tolist()))
+
+    def hit_enemies(self, enemies):
+        """
+        射弹 vs 敌人：按敌人顺序，每个敌人被与其重叠的、最早发射的一枚射弹击中，该射弹随即移除。
+        候选对由网格粗筛 (overlapping_pairs) 产生，开销与敌人数 + 射弹数成正比，而不是二者之积。
+        :param enemies: 敌人列表或 EnemySystem
+        :return: 未被击中的敌人 (列表；EnemySystem 则原地移除被击中的敌人并返回它本身)
+        """
+        idx = self._live()
+        if len(idx) == 0 or not enemies:
+            return _remaining(enemies, ())
+        if len(idx) <= PROJECTILE_SCALAR_LIMIT:
+            return self._hit_enemies_scalar(idx, enemies)
+        if isinstance(enemies, EnemySystem):
+            boxes = enemies.boxes()
+        else:
+            boxes = np.array([(e.rect.left, e.rect.top, e.rect.right, e.rect.bottom) for e in enemies])
+        # 网格粗筛得到所有重叠的 (敌人, 射弹) 对，与 Rect.colliderect 的判定相同
+        enemy_idx, proj_idx = overlapping_pairs(boxes, self._rects(idx), 2 * self.radius)
+        if len(enemy_idx) == 0:
+            return _remaining(enemies, ())
+
+        # 按 (敌人, 发射顺序) 排序后逐对结算，保证一发射弹只击中一个敌人
+        order = np.lexsort((self.seq[idx][proj_idx], enemy_idx))
+        available = bytearray(b"\x01") * len(idx)
+        hit_enemies = set()
+        for e, p in zip(enemy_idx[order].tolist(), proj_idx[order].tolist()):
+            if e in hit_enemies or not available[p]:
+                continue
+            available[p] = 0
+            hit_enemies.add(e)
+        if hit_enemies:
+            self.kill(idx[np.frombuffer(available, dtype=np.uint8) == 0])
+        return _remaining(enemies, hit_enemies)
+
+    def _hit_enemies_scalar(self, idx, enemies):
+        """hit_enemies 的逐个判定版本 (与 Projectile 列表的双重循环相同)。"""
+        rects = self._scalar_rects(idx)
+        enemy_rects = enemies.rects() if isinstance(enemies, EnemySystem) else [enemy.rect for enemy in enemies]
+        hit_enemies, dead = [], []
+        for e, enemy_rect in enumerate(enemy_rects):
+            for i, (slot, rect) in enumerate(rects):
+                if rect.colliderect(enemy_rect):
+                    dead.append(slot)
+                    hit_enemies.append(e)
+                    del rects[i]
+                    break
+        if dead:
+            self.kill(np.array(dead))
+        return _remaining(enemies, hit_enemies)
+
+    def blit_sequence(self, offset=(0, 0), alpha=1.0):
+        """
+        所有射弹的 (精灵, 屏幕坐标) 列表 (与 Projectile 共用精灵)，交给 Surface.blits 一次绘制。
+        :param offset: 摄像机偏移 (像素)
+        :param alpha: 插值系数：在 snapshot 记录的位置 (0) 与当前位置 (1) 之间绘制
+        """
+        idx = self._live()
+        if len(idx) == 0:
+            return []
+        sprite, (dx, dy) = Projectile.sprite(self.radius)
+        pos = self.pos[idx]
+        if alpha < 1.0:
+            prev = self.prev[idx]
+            pos = prev + (pos - prev) * alpha
+        corners = np.floor(pos + 0.5).astype(np.int64) + (dx - offset[0], dy - offset[1])
+        return [(sprite, xy) for xy in map(tuple, corners.tolist())]
+
+    def draw(self, surface, offset=(0, 0)):
+        """
+        绘制所有射弹。
+        :param surface: 目标 Surface
+        :param offset: 摄像机偏移 (像素)
+        :return: 每枚射弹绘制覆盖的屏幕区域 (Rect 列表，供脏矩形刷新使用)
+        """
+        return surface.blits(self.blit_sequence(offset))
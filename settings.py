@@ -29,7 +29,11 @@ COLOR_PROJECTILE = (120, 130, 119)
 
 # --- 游戏设置 ---
 GAME_TITLE = "迷宫奔跑者 Redux"
-FPS = 60
+FPS = 60                      # 渲染帧率上限
+# 固定时间步长：update() 每秒固定运行 SIM_RATE 次，与渲染帧率无关 (所有速度都以 像素/tick 为单位)
+SIM_RATE = 60
+MAX_SIM_STEPS_PER_FRAME = 5   # 每个渲染帧最多补跑的模拟 tick 数，超出的积压时间直接丢弃 (游戏变慢，而不是越追越落后)
+RENDER_INTERPOLATION = True   # 绘制时在上一个与当前 tick 的位置之间插值，渲染帧率高于模拟频率时画面依然平滑
 
 # --- 字体设置 ---
 # !! 新增：定义资源和字体目录 !!
@@ -40,6 +44,8 @@ FONT_DIR = ASSETS_DIR / "fonts"
 # !! 新增：指定要使用的字体文件名 (你需要将这个文件放到 assets/fonts/ 目录下) !!
 # 例如使用 "simhei.ttf" (黑体) 或 "msyh.ttf" (微软雅黑) 等
 FONT_NAME = "simhei.ttf"
+TEXT_CACHE_SIZE = 128 # 已渲染文本 Surface 的缓存数量 (draw_text 对不变的文本不再每帧重新渲染)
+FONT_PREWARM_SIZES = (64, 30, 35, 24, 72, 16) # 启动时在后台线程中预先加载的字号 (开始界面的字号在前)
 
 # --- 玩家设置 ---
 PLAYER_SIZE_FACTOR = 0.7
@@ -50,15 +56,65 @@ PLAYER_SHOOT_DELAY = 200
 # --- 敌人设置 ---
 ENEMY_SIZE_FACTOR = 0.6
 ENEMY_SPEED = 2
+ENEMY_CHASE = False # 敌人沿流场追踪玩家 (改变玩法，默认关闭：敌人保持原来的直线移动、撞墙反弹)
+ENEMY_CHASE_RADIUS = 12 # 敌人追踪玩家的路径距离 (格)，超出范围的敌人随机游走；0 表示不追踪
 NUM_ENEMIES = 5
+ENEMY_SYSTEM = True # 敌人很多时使用 NumPy 结构数组敌人系统整批更新 (NumPy 不可用时自动回退为 Enemy 对象列表)
+ENEMY_SYSTEM_MIN_COUNT = 64 # 一关的敌人数达到该值时才启用敌人系统 (敌人很少时 NumPy 的固定开销反而更大)
 
 # --- 射弹设置 ---
 PROJECTILE_RADIUS = 5
 PROJECTILE_SPEED = 8
 PROJECTILE_LIFETIME = 1000 # 可选
+PROJECTILE_POOL = True # 使用 NumPy 结构数组射弹池 (NumPy 不可用时自动回退为 Projectile 对象列表)
+PROJECTILE_POOL_CAPACITY = 256 # 射弹池初始容量 (不够时自动翻倍)
+PROJECTILE_SCALAR_LIMIT = 32 # 存活射弹不超过该数量时逐个判定碰撞 (少量射弹时 NumPy 的固定开销反而更大)
+SPATIAL_HASH_MIN_PAIRS = 256 # 敌人数 × 射弹数超过该值时才建立空间哈希 (否则直接两两比较)
+SPATIAL_HASH_MIN_PAIRS_NUMPY = 20000 # 射弹池的对应阈值 (NumPy 两两比较的矩阵在此规模内更快)
 
 # --- 迷宫生成 ---
+# 生成算法: "dfs" (默认，长走廊), "kruskal", "wilson", "binary_tree", "sidewinder", "eller"
+MAZE_ALGORITHM = "dfs"
 WALL = 'W'
 FLOOR = 'F'
 START = 'S'
-EXIT = 'E'
\ No newline at end of file
+EXIT = 'E'
+
+# --- 紧凑网格编码 (Maze 内部以 uint8 存储，每格只用 2 bit) ---
+CELL_WALL = 0
+CELL_FLOOR = 1
+CELL_START = 2
+CELL_EXIT = 3
+CELL_CHARS = (WALL, FLOOR, START, EXIT) # 编码 -> 字符 (兼容 grid 列表视图)
+CELL_CODES = {char: code for code, char in enumerate(CELL_CHARS)} # 字符 -> 编码
+
+# --- 无尽模式 (流式分块迷宫) ---
+ENDLESS_MODE = False          # 默认是否以无尽模式开始 (开始界面按 E 也可进入)
+ENDLESS_CHUNK_ROWS = 18       # 每个区块的网格行数 (必须为偶数)
+ENDLESS_CHUNKS_AHEAD = 2      # 在玩家所在区块前方预生成的区块数
+ENDLESS_CHUNKS_BEHIND = 1     # 在玩家所在区块后方保留的区块数，更远的区块被回收
+ENDLESS_ENEMIES_PER_CHUNK = 3 # 每个新区块生成的敌人数量
+
+# --- 关卡预生成 ---
+LEVEL_PREFETCH = True         # 游玩当前关卡时在后台线程中生成下一关的迷宫 (False 则在切换关卡时同步生成)
+
+# --- 迷宫种子与缓存 ---
+RUN_SEED = None               # 本局种子 (每关的迷宫种子由它和关卡号派生)；None 表示每次启动随机选择
+MAZE_CACHE_SIZE = 3           # 内存中保留的最近迷宫数量 (重开同一关卡时直接复用)
+MAZE_CACHE_DIR = None         # 可选的磁盘缓存目录 (例如 BASE_DIR / "mazes")；None 表示不写文件
+
+# --- 渲染 ---
+DIRTY_RECTS = True            # 普通迷宫中只重绘并提交实体移动过的区域 (pg.display.update(rects))，而不是每帧整屏 flip
+DIRTY_RECTS_MAX_FRACTION = 0.5 # 脏区域总面积超过屏幕的该比例时退回整屏 flip
+DIRTY_RECTS_MAX_COUNT = 200    # 脏矩形数超过该值时退回整屏 flip
+
+# --- 输入录制与回放 ---
+INPUT_RECORDING = False       # 是否把每一局的种子和逐 tick 按键录制为输入日志 (python headless.py --replay 回放)
+INPUT_LOG_DIR = BASE_DIR / "replays" # 输入日志目录
+
+# --- 性能分析 ---
+PROFILER_ENABLED = False          # 启动时是否显示帧阶段统计叠加层 (游戏中按 F3 切换)
+PROFILER_EXPORT = False           # 是否把每帧的阶段耗时导出为 JSONL 文件
+PROFILER_WINDOW = 300             # 计算 p50/p95/p99 的滚动窗口 (帧数)
+PROFILER_OVERLAY_INTERVAL = 15    # 叠加层文本每隔多少帧刷新一次
+PROFILE_DIR = BASE_DIR / "profiles" # JSONL 导出目录
\ No newline at end of file
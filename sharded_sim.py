@@ -0,0 +1,304 @@
+# sharded_sim.py - 多进程分片模拟：迷宫按水平条带切分，每个工作进程整批更新自己条带内的敌人
+
+import os
+import weakref
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from settings import * # 导入设置
+from maze import Maze
+from flow_field import lookup_steps
+from enemy_system import EnemySystem
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def _bands(tops, band_px, workers):
+    """
+    敌人所属的条带 (工作进程编号)：按碰撞矩形上边所在的条带划分。
+    :param tops: 碰撞矩形上边的像素 y 坐标数组
+    :param band_px: 每个条带的像素高度
+    :param workers: 条带数
+    """
+    return np.clip(tops // band_px, 0, workers - 1)
+
+class SharedBlocks:
+    """
+    一组按名称管理、放在 multiprocessing.shared_memory 中的 NumPy 数组。
+    主进程创建 (create)，工作进程按 spec() 给出的描述映射同一块内存 (attach)，之后每个 tick 不再传递数组内容。
+    """
+
+    def __init__(self):
+        self.blocks = {}   # 名称 -> (SharedMemory, ndarray)
+        self._retired = [] # 已被替换、等待关闭的旧内存块 (工作进程可能仍在映射)
+        self.owner = False # 是否由本进程创建 (关闭时负责 unlink)
+
+    def create(self, name, shape, dtype):
+        """
+        创建 (或替换) 名为 name 的全零数组。旧内存块立即 unlink，工作进程映射的旧内存在其重新 attach 前依然有效。
+        :return: 共享内存上的 ndarray
+        """
+        self.owner = True
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array.fill(0)
+        self._replace(name, shm, array)
+        return array
+
+    def spec(self):
+        """所有数组的描述 {名称: (共享内存名, 形状, dtype)}，发给工作进程用于 attach。"""
+        return {name: (shm.name, array.shape, array.dtype.str) for name, (shm, array) in self.blocks.items()}
+
+    def attach(self, spec):
+        """
+        按 spec 映射主进程创建的数组 (已映射且未改变的不重复映射)。
+        :return: {名称: ndarray}
+        """
+        for name, (shm_name, shape, dtype) in spec.items():
+            current = self.blocks.get(name)
+            if current is not None and current[0].name == shm_name and current[1].shape == tuple(shape):
+                continue
+            shm = shared_memory.SharedMemory(name=shm_name)
+            self._replace(name, shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+        return {name: array for name, (_, array) in self.blocks.items()}
+
+    def _replace(self, name, shm, array):
+        old = self.blocks.get(name)
+        self.blocks[name] = (shm, array)
+        if old is not None:
+            if self.owner:
+                old[0].unlink()
+            self._retired.append(old[0])
+
+    def close(self):
+        """关闭 (由本进程创建的还要 unlink) 所有内存块。调用前应丢弃指向它们的数组。"""
+        for shm, _ in self.blocks.values():
+            if self.owner:
+                shm.unlink()
+            self._retired.append(shm)
+        self.blocks = {}
+        for shm in self._retired:
+            try:
+                shm.close()
+            except BufferError: # 仍有数组指向这块内存，交给进程退出时释放
+                pass
+        self._retired = []
+
+class _SharedFlow:
+    """工作进程中的流场视图：只读共享内存中的查找表，接口与 FlowField.step_arrays 相同。"""
+
+    def __init__(self, keys, steps, width):
+        self.keys, self.steps, self.width = keys, steps, width
+
+    def step_arrays(self, cols, rows):
+        return lookup_steps(self.keys, self.steps, self.width, cols, rows)
+
+def _worker(conn, index, workers):
+    """
+    工作进程主循环：每收到一条 step 消息，就把本条带拥有的敌人 (主进程在 order 中给出的一段下标) 复制到本地 EnemySystem、
+    用与单进程完全相同的代码更新一个 tick、写回共享数组，并为每个敌人写下一个 tick 的所属条带 (越过边界即交接)。
+    :param conn: 与主进程通信的 Pipe 端点
+    :param index: 本进程负责的条带编号
+    :param workers: 条带总数
+    """
+    blocks = SharedBlocks()
+    arrays = {}
+    local = EnemySystem()
+    maze, band_px = None, 1
+    try:
+        while True:
+            message = conn.recv()
+            kind = message[0]
+            if kind == "layout":
+                _, spec, maze_info = message
+                arrays = blocks.attach(spec)
+                if maze_info is not None:
+                    width, height, start, exit_cell, band_px = maze_info
+                    maze = Maze.from_cells(blocks.blocks["cells"][0].buf[:width * height], width, height, start, exit_cell)
+                conn.send(None)
+            elif kind == "step":
+                _, parity, start, stop, flow_len, count_walls = message
+                owner = arrays["owner"]
+                own = arrays["order"][start:stop]
+                m = stop - start
+                if m > len(local.pos):
+                    local._grow(m)
+                local.count = m
+                for name in ("pos", "vel", "size", "xy"):
+                    np.take(arrays[name], own, axis=0, out=getattr(local, name)[:m])
+                flow = None
+                if flow_len >= 0:
+                    flow = _SharedFlow(arrays["flow_keys"][:flow_len], arrays["flow_steps"][:flow_len], maze.grid_width)
+                maze.count_walls = count_walls
+                before = maze.walls_checked
+                local.update(maze, flow)
+                for name in ("pos", "vel", "xy"):
+                    shared, updated = arrays[name], getattr(local, name)
+                    for axis in (0, 1): # 按列写回：二维数组按行的花式索引赋值要慢好几倍
+                        shared[own, axis] = updated[:m, axis]
+                owner[own, 1 - parity] = _bands(local.xy[:m, 1], band_px, workers)
+                conn.send(maze.walls_checked - before)
+            elif kind == "close":
+                break
+    finally:
+        maze = arrays = flow = owner = own = None
+        blocks.close()
+        conn.close()
+
+def _shutdown(conns, procs, blocks):
+    """停止工作进程并释放共享内存 (ShardedEnemySystem.close 或解释器退出时调用)。"""
+    for conn in conns:
+        try:
+            conn.send(("close",))
+        except OSError:
+            pass
+    for process in procs:
+        process.join(timeout=1)
+        if process.is_alive():
+            process.terminate()
+    for conn in conns:
+        conn.close()
+    blocks.close()
+
+class ShardedEnemySystem(EnemySystem):
+    """
+    把 EnemySystem 的更新分到多个工作进程：迷宫按行切成 workers 个水平条带，每个进程只更新上边落在自己条带中的敌人。
+    所有数组 (敌人状态、迷宫网格、流场查找表) 都放在共享内存中，每个 tick 主进程按条带把敌人下标排好 (order 数组)，
+    给每个进程只发一条几个整数的消息 (自己那一段的起止位置)，各进程只读写自己的敌人，原地更新后回复撞墙检测次数。
+
+    越过条带边界的敌人通过双缓冲的 owner 数组交接：进程在 owner[:, 1 - parity] 中写下每个敌人下一个 tick 的条带，
+    下一个 tick 由新条带的进程接手；同一 tick 中不会有两个进程读写同一个敌人。
+    敌人的下标顺序不随交接改变，因此结果 (包括命中判定的顺序) 与单进程的 EnemySystem 完全相同。
+
+    生成、移除、查询、插值绘制都在主进程中进行 (沿用 EnemySystem 的实现)，只能在两个 tick 之间调用。
+    只支持普通迷宫 (Maze)：无尽模式的区块一直在变化。
+    Game 目前不使用它：多核机器上的加速还没有测量过 (基准 sharded_enemy_update)，无法确定值得分片的敌人数。
+    """
+
+    fields = EnemySystem.fields + ("owner",)
+
+    def __init__(self, workers=None, capacity=64):
+        """
+        :param workers: 工作进程 (条带) 数；None 表示 os.cpu_count()
+        :param capacity: 初始容量 (不够时自动翻倍)
+        """
+        if np is None:
+            raise ImportError("ShardedEnemySystem 需要 NumPy")
+        self.workers = workers or os.cpu_count() or 1
+        self._blocks = SharedBlocks()
+        self._layout_changed = True
+        super().__init__(capacity)
+        self.owner = self._alloc("owner", (capacity, 2), np.int16) # 每个敌人所属的条带，[:, parity] 为当前 tick
+        self._parity = 0
+        self._maze = None        # 已复制到共享内存的迷宫
+        self._maze_info = None   # 发给工作进程的迷宫描述 (宽, 高, 起点, 出口, 条带像素高度)
+        self._band_px = 1
+        self._flow_table = None  # 已写入共享内存的流场查找表
+        self._flow_len = -1
+        # 使用 spawn 而不是 fork 启动：主进程中有显示、字体和关卡预生成线程，fork 它们不安全
+        context = mp.get_context("spawn")
+        self._conns, self._procs = [], []
+        for index in range(self.workers):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker, args=(child, index, self.workers),
+                                      name=f"enemy-shard-{index}", daemon=True)
+            process.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(process)
+        # 没有调用 close 就退出时也要停止进程、unlink 共享内存
+        self._shutdown = weakref.finalize(self, _shutdown, self._conns, self._procs, self._blocks)
+
+    def _alloc(self, name, shape, dtype):
+        """所有数组都分配在共享内存中。"""
+        self._layout_changed = True
+        return self._blocks.create(name, shape, dtype)
+
+    def spawn(self, x_center, y_center):
+        super().spawn(x_center, y_center)
+        i = self.count - 1
+        self.owner[i, self._parity] = _bands(self.xy[i, 1], self._band_px, self.workers)
+
+    def _sync_maze(self, maze):
+        """迷宫改变 (新关卡) 时把网格复制到共享内存，并按新的条带重新划分所有敌人。"""
+        if maze is self._maze:
+            return
+        w, h = maze.grid_width, maze.grid_height
+        cells = self._blocks.blocks.get("cells")
+        if cells is None or len(cells[1]) < w * h:
+            self._alloc("cells", (w * h,), np.uint8)
+        self._blocks.blocks["cells"][1][:w * h] = np.frombuffer(maze._buf, dtype=np.uint8)
+        self._band_px = -(-h // self.workers) * TILE_SIZE
+        self._maze = maze
+        self._maze_info = (w, h, maze.start_cell, maze.exit_cell, self._band_px)
+        self._layout_changed = True
+        self.owner[:self.count, self._parity] = _bands(self.xy[:self.count, 1], self._band_px, self.workers)
+
+    def _publish_flow(self, flow):
+        """把流场查找表写入共享内存 (只在流场重新计算后写一次)。:return: 表长度；-1 表示不追踪"""
+        if flow is None:
+            return -1
+        table = flow.table()
+        if table is not self._flow_table:
+            keys, steps = table
+            current = self._blocks.blocks.get("flow_keys")
+            if current is None or len(current[1]) < len(keys):
+                capacity = max(len(keys), 1024)
+                self._alloc("flow_keys", (capacity,), np.int64)
+                self._alloc("flow_steps", (capacity, 2), np.int64)
+            self._blocks.blocks["flow_keys"][1][:len(keys)] = keys
+            self._blocks.blocks["flow_steps"][1][:len(keys)] = steps
+            self._flow_table = table
+            self._flow_len = len(keys)
+        return self._flow_len
+
+    def _group_by_band(self, n):
+        """
+        把前 n 个敌人的下标按当前所属条带分组写入共享的 order 数组 (组内保持下标递增)。
+        :return: 各条带在 order 中的结束位置 (第 i 段为 [ends[i-1], ends[i]))
+        """
+        bands = self.owner[:n, self._parity]
+        order = self._blocks.blocks.get("order")
+        if order is None or len(order[1]) < n:
+            self._alloc("order", (len(self.pos),), np.intp)
+        # int16 的稳定排序是基数排序，O(n)
+        self._blocks.blocks["order"][1][:n] = np.argsort(bands, kind="stable")
+        return np.cumsum(np.bincount(bands, minlength=self.workers))
+
+    def _broadcast(self, message):
+        """把消息发给所有工作进程并收集回复。"""
+        for conn in self._conns:
+            conn.send(message)
+        return [conn.recv() for conn in self._conns]
+
+    def update(self, maze, flow=None):
+        """
+        所有敌人前进一个 tick (与 EnemySystem.update 结果相同)，各条带在工作进程中并行更新。
+        :param maze: 当前迷宫 (Maze)
+        :param flow: 可选，朝向玩家的共享流场
+        """
+        n = self.count
+        if n == 0:
+            return
+        self._sync_maze(maze)
+        flow_len = self._publish_flow(flow)
+        ends = self._group_by_band(n)
+        if self._layout_changed:
+            self._broadcast(("layout", self._blocks.spec(), self._maze_info))
+            self._layout_changed = False
+        start = 0
+        for conn, stop in zip(self._conns, ends.tolist()):
+            conn.send(("step", self._parity, start, stop, flow_len, maze.count_walls))
+            start = stop
+        maze.walls_checked += sum(conn.recv() for conn in self._conns)
+        self._parity = 1 - self._parity
+
+    def close(self):
+        """停止工作进程并释放共享内存 (之后不能再使用)。"""
+        self._maze = self._flow_table = None
+        for name in self.fields:
+            setattr(self, name, None)
+        self._shutdown()
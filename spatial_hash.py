@@ -0,0 +1,145 @@
+# spatial_hash.py - 均匀网格空间哈希：实体之间碰撞检测的粗筛 (broadphase)
+
+from settings import * # 导入设置
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class SpatialHash:
+    """
+    以 cell_size (默认 TILE_SIZE) 为格子边长的空间哈希。
+    每个条目按其 Rect 覆盖的格子登记 (跨格子的条目会出现在多个格子中)，
+    查询时只返回 rect 覆盖的格子里的条目，因此每个实体只需与邻近的对象做精确判定。
+    条目按插入顺序编号，query 按这个顺序返回，调用方可以据此保持“先插入先判定”的语义。
+    """
+
+    def __init__(self, cell_size=TILE_SIZE):
+        """
+        :param cell_size: 格子边长 (像素)
+        """
+        self.cell_size = cell_size
+        self.cells = {}  # (列, 行) -> [(序号, 条目)]
+        self.count = 0   # 已插入的条目数
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        """移除所有条目。"""
+        self.cells.clear()
+        self.count = 0
+
+    def _span(self, rect):
+        """rect 覆盖的格子范围 (c0, r0, c1, r1)，空 rect 的 c1 < c0。"""
+        s = self.cell_size
+        return rect.left // s, rect.top // s, (rect.right - 1) // s, (rect.bottom - 1) // s
+
+    def insert(self, item, rect):
+        """
+        登记一个条目。
+        :param item: 任意对象
+        :param rect: 条目的 Rect
+        """
+        entry = (self.count, item)
+        cells = self.cells
+        c0, r0, c1, r1 = self._span(rect)
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                bucket = cells.get((c, r))
+                if bucket is None:
+                    cells[(c, r)] = [entry]
+                else:
+                    bucket.append(entry)
+        self.count += 1
+
+    def build(self, items):
+        """清空后按顺序插入 items (使用各自的 rect 属性)。"""
+        self.clear()
+        for item in items:
+            self.insert(item, item.rect)
+
+    def query(self, rect):
+        """
+        返回与 rect 覆盖的格子有交集的条目 (只是候选，仍需精确判定)。
+        :param rect: 查询区域
+        :return: [(序号, 条目)]，按插入顺序排列、不重复
+        """
+        c0, r0, c1, r1 = self._span(rect)
+        cells = self.cells
+        if c0 == c1 and r0 == r1:
+            return cells.get((c0, r0), []) # 单个格子：桶内本来就按插入顺序排列
+        found = {}
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                for entry in cells.get((c, r), ()):
+                    found[entry[0]] = entry
+        return [found[i] for i in sorted(found)]
+
+
+def overlapping_pairs(boxes, corners, size, cell_size=TILE_SIZE):
+    """
+    SpatialHash 的 NumPy 版本 (需要 NumPy)：找出所有相互重叠的 (矩形, 方块) 对。
+    方块按左上角所在的格子编号排序；与矩形重叠的方块，其左上角必然落在矩形向左上扩展 size-1 像素后覆盖的格子里，
+    每一行格子在排好序的编号中是连续的一段，用 searchsorted 即可取出，不需要 E × P 的比较。
+    :param boxes: (E, 4) 整数数组，每行为 (left, top, right, bottom)
+    :param corners: (P, 2) 整数数组，方块的左上角 (left, top)
+    :param size: 方块边长
+    :param cell_size: 格子边长
+    :return: (矩形下标, 方块下标) 两个数组，按矩形下标排序，同一矩形内按方块下标升序；
+             重叠判定与 Rect.colliderect 相同
+    """
+    if len(boxes) == 0 or len(corners) == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    if len(boxes) * len(corners) <= SPATIAL_HASH_MIN_PAIRS_NUMPY:
+        # 规模较小时直接算 (E, P) 重叠矩阵，比排序 + 查找的固定开销更低
+        left, top = corners[:, 0], corners[:, 1]
+        overlap = ((left < boxes[:, 2:3]) & (boxes[:, 0:1] < left + size) &
+                   (top < boxes[:, 3:4]) & (boxes[:, 1:2] < top + size))
+        return np.nonzero(overlap)
+    cols = corners[:, 0] // cell_size
+    rows = corners[:, 1] // cell_size
+    # 每个矩形需要查看的格子范围
+    c0 = (boxes[:, 0] - size + 1) // cell_size
+    c1 = (boxes[:, 2] - 1) // cell_size
+    r0 = (boxes[:, 1] - size + 1) // cell_size
+    r1 = (boxes[:, 3] - 1) // cell_size
+
+    # 格子编号 = 行 * stride + 列 (平移到非负)
+    col_min = min(cols.min(), c0.min())
+    row_min = min(rows.min(), r0.min())
+    stride = max(cols.max(), c1.max()) - col_min + 1
+    keys = (rows - row_min) * stride + (cols - col_min)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+
+    # 每一行格子对应 sorted_keys 中的一段 [start, end)
+    starts, ends = [], []
+    for k in range(int((r1 - r0).max()) + 1):
+        row_base = (r0 + k - row_min) * stride
+        start = np.searchsorted(sorted_keys, row_base + (c0 - col_min), side="left")
+        end = np.searchsorted(sorted_keys, row_base + (c1 - col_min), side="right")
+        starts.append(start)
+        ends.append(np.where(r0 + k <= r1, end, start))
+    starts = np.stack(starts, axis=1).ravel()
+    lengths = np.stack(ends, axis=1).ravel() - starts
+    total = int(lengths.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+
+    # 把各段展开成候选对
+    box_idx = np.repeat(np.arange(len(boxes)).repeat(len(ends)), lengths)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    square_idx = order[np.repeat(starts, lengths) + offsets]
+
+    # 精确判定
+    left, top = corners[square_idx, 0], corners[square_idx, 1]
+    b = boxes[box_idx]
+    hit = (left < b[:, 2]) & (b[:, 0] < left + size) & (top < b[:, 3]) & (b[:, 1] < top + size)
+    box_idx, square_idx = box_idx[hit], square_idx[hit]
+    # 同一矩形的候选来自不同行，按方块下标重新排序
+    resort = np.lexsort((square_idx, box_idx))
+    return box_idx[resort], square_idx[resort]
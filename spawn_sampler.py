@@ -0,0 +1,71 @@
+# spawn_sampler.py - 批量抽取出生点：预先生成的坐标数组 + 拒绝抽样
+
+import random
+
+class SpawnSampler:
+    """
+    在一组预先生成的候选坐标 (通常是迷宫所有可通行单元格的中心) 上批量抽取出生点。
+    每个样本先均匀抽一个候选再检查约束 (拒绝抽样)，单次 O(1)；
+    只有约束排除了大部分候选、拒绝次数超出预算时，才一次性筛选出全部合格坐标再抽样。
+    两种方式得到的都是合格坐标上的均匀分布 (可重复)，与逐次调用 get_random_floor_coord 相同。
+    """
+
+    REJECTION_BUDGET = 16 # 每个样本允许的平均拒绝次数，超出后改为一次性筛选
+
+    def __init__(self, points, rng=random):
+        """
+        :param points: 候选坐标 (x, y) 的列表 (调用方负责缓存，采样器不会复制)
+        :param rng: 随机数源
+        """
+        self.points = points
+        self.rng = rng
+
+    def __len__(self):
+        return len(self.points)
+
+    def sample(self, count, exclude_rect=None, min_dist_sq_from=None, source_pos=None):
+        """
+        抽取 count 个满足约束的坐标。
+        :param count: 数量
+        :param exclude_rect: 可选，需要排除的 Rect 区域
+        :param min_dist_sq_from: 可选，与 source_pos 的最小距离平方
+        :param source_pos: 可选，计算最小距离的源点坐标
+        :return: 坐标列表；没有合格坐标时按 get_random_floor_coord 的规则退回到只排除 exclude_rect，
+                 仍然没有则返回空列表
+        """
+        points, rng = self.points, self.rng
+        n = len(points)
+        if n == 0 or count <= 0:
+            return []
+        check_dist = min_dist_sq_from is not None and source_pos is not None
+        if check_dist:
+            sx, sy = source_pos[0], source_pos[1]
+
+        def accepted(p):
+            if exclude_rect and exclude_rect.collidepoint(p):
+                return False
+            return not check_dist or (p[0] - sx)**2 + (p[1] - sy)**2 >= min_dist_sq_from
+
+        # 1. 拒绝抽样
+        result = []
+        budget = self.REJECTION_BUDGET * count
+        while len(result) < count and budget > 0:
+            p = points[rng.randrange(n)]
+            if accepted(p):
+                result.append(p)
+            else:
+                budget -= 1
+        if len(result) == count:
+            return result
+
+        # 2. 合格坐标太少：一次性筛选后直接抽样
+        valid = [p for p in points if accepted(p)]
+        if not valid:
+            # 如果经过筛选后没有合适的点，尝试返回任意一个地板点（除了排除区域）
+            print("警告：无法找到满足所有条件的随机地板坐标，尝试返回备选点。")
+            valid = [p for p in points if not (exclude_rect and exclude_rect.collidepoint(p))]
+            if not valid: # 连备选都没有（迷宫太小或排除区域太大）
+                print("错误：连备选随机地板坐标也找不到！")
+                return result
+        result.extend(rng.choice(valid) for _ in range(count - len(result)))
+        return result
@@ -0,0 +1,44 @@
+# sprites.py - 预渲染的实体精灵：每种外观只用图元光栅化一次，之后每帧只需 blit
+
+import pygame as pg
+from settings import * # 导入设置
+
+SPRITE_COLORKEY = (255, 0, 255) # 精灵的透明色 (实体不使用这个颜色)
+
+_sprite_cache = {} # 外观标识 -> (Surface, (dx, dy), 是否已转换为显示格式)
+
+def _bake(paint):
+    """
+    在一块足够大的画布上以锚点为基准调用 paint，裁剪出实际绘制的区域作为精灵。
+    :return: (Surface, (dx, dy), 是否已转换)：(dx, dy) 是精灵左上角相对锚点的偏移
+    """
+    size = TILE_SIZE * 4
+    anchor = (size // 2, size // 2)
+    canvas = pg.Surface((size, size))
+    canvas.fill(SPRITE_COLORKEY)
+    bounds = paint(canvas, anchor).clip(canvas.get_rect())
+    sprite = canvas.subsurface(bounds).copy()
+    converted = pg.display.get_surface() is not None
+    if converted:
+        sprite = sprite.convert() # 与屏幕像素格式相同，blit 时无需逐像素转换
+    sprite.set_colorkey(SPRITE_COLORKEY, pg.RLEACCEL)
+    return sprite, (bounds.x - anchor[0], bounds.y - anchor[1]), converted
+
+def get_sprite(key, paint):
+    """
+    取得缓存的精灵，第一次请求时生成。
+    窗口创建之前生成的精灵无法转换为显示格式，窗口创建后第一次请求时会重新生成。
+    :param key: 外观标识 (如 ("enemy", 尺寸)、("player", 尺寸, 是否加速))
+    :param paint: callable(surface, anchor) -> Rect：用图元把该外观画在 surface 上 (以 anchor 为基准)，
+                  返回绘制覆盖的区域 (pg.draw.* 的返回值)
+    :return: (Surface, (dx, dy))：把精灵 blit 到 锚点 + (dx, dy) 处，结果与直接用图元绘制的像素相同
+    """
+    entry = _sprite_cache.get(key)
+    if entry is None or (not entry[2] and pg.display.get_surface() is not None):
+        entry = _bake(paint)
+        _sprite_cache[key] = entry
+    return entry[0], entry[1]
+
+def clear_sprites():
+    """清空精灵缓存 (例如更换显示模式后)。"""
+    _sprite_cache.clear()
@@ -3,9 +3,15 @@
 import pygame as pg
 from settings import * # 导入设置以便使用颜色、字体路径等
 from pathlib import Path # 确保导入 Path
+import threading
+from collections import OrderedDict
 
 # --- 字体加载缓存 (优化：避免重复加载同一字体) ---
 font_cache = {}
+# 字体文件是否可用：None 表示尚未尝试；加载失败后其他字号直接使用默认字体，不再重复尝试和打印错误
+_font_file_ok = None
+# FreeType 不是线程安全的：加载和渲染字体都在这把锁内进行 (后台预热线程与主线程共用)
+font_lock = threading.RLock()
 
 def load_font(size):
     """
@@ -14,53 +20,126 @@ def load_font(size):
     :param size: 字体大小
     :return: Pygame Font 对象
     """
-    # 检查缓存
-    if size in font_cache:
-        return font_cache[size]
-
-    # 构建完整的字体文件路径
-    font_path = FONT_DIR / FONT_NAME
-    try:
-        # 尝试加载指定的中文字体文件
-        font = pg.font.Font(str(font_path), size) # Path 对象需要转为字符串
-        print(f"成功加载字体: {font_path} (大小: {size})")
-        font_cache[size] = font # 存入缓存
+    global _font_file_ok
+    # 检查缓存 (命中时不必等待锁)
+    font = font_cache.get(size)
+    if font is not None:
         return font
-    except FileNotFoundError:
-        print(f"错误：找不到字体文件 '{font_path}'。")
-        print("请确保在 'assets/fonts/' 目录下放置了名为 '{FONT_NAME}' 的字体文件。")
-    except pg.error as e:
-        print(f"错误：加载字体 '{font_path}' 时出错: {e}")
-        print("可能是字体文件损坏或不受支持。")
-    except Exception as e: # 捕获其他可能的异常
-        print(f"加载字体时发生未知错误: {e}")
-
-    # --- 回退逻辑 ---
-    print(f"将使用 Pygame 默认字体 (大小: {size}) 作为备选。")
-    try:
-        default_font = pg.font.Font(None, size) # 加载 Pygame 默认字体
-        font_cache[size] = default_font # 默认字体也缓存起来
-        return default_font
-    except Exception as e:
-        print(f"错误：连 Pygame 默认字体也无法加载: {e}")
-        # 极端情况：如果连默认字体都加载失败，返回一个最小的替代品或退出
-        # 这里我们尝试返回一个固定的小字体
+    with font_lock:
+        if size in font_cache: # 可能刚被预热线程加载
+            return font_cache[size]
+
+        # 构建完整的字体文件路径
+        font_path = FONT_DIR / FONT_NAME
+        if _font_file_ok is not False:
+            try:
+                # 尝试加载指定的中文字体文件
+                font = pg.font.Font(str(font_path), size) # Path 对象需要转为字符串
+                if _font_file_ok is None: # 只在第一次成功时打印
+                    print(f"成功加载字体: {font_path}")
+                _font_file_ok = True
+                font_cache[size] = font # 存入缓存
+                return font
+            except FileNotFoundError:
+                print(f"错误：找不到字体文件 '{font_path}'。")
+                print(f"请确保在 'assets/fonts/' 目录下放置了名为 '{FONT_NAME}' 的字体文件。")
+            except pg.error as e:
+                print(f"错误：加载字体 '{font_path}' 时出错: {e}")
+                print("可能是字体文件损坏或不受支持。")
+            except Exception as e: # 捕获其他可能的异常
+                print(f"加载字体时发生未知错误: {e}")
+            # --- 回退逻辑 ---
+            _font_file_ok = False
+            print("将使用 Pygame 默认字体作为备选。")
+
         try:
-            return pg.font.Font(None, 12)
-        except: # 如果连这个也失败... 就没办法了
-             print("!!! 无法加载任何字体，文本将无法显示 !!!")
-             # 返回一个“空”字体对象，避免程序崩溃，但不会渲染任何东西
-             class DummyFont:
-                 def render(self, *args, **kwargs):
-                     return pg.Surface((0,0)) # 返回一个空 Surface
-                 def get_linesize(self):
-                     return 10 # 返回一个合理的值避免其他地方崩溃
-             return DummyFont()
-
-
-def draw_text(surface, text, size, color, x, y, align="center"):
+            default_font = pg.font.Font(None, size) # 加载 Pygame 默认字体
+            font_cache[size] = default_font # 默认字体也缓存起来
+            return default_font
+        except Exception as e:
+            print(f"错误：连 Pygame 默认字体也无法加载: {e}")
+            # 极端情况：如果连默认字体都加载失败，返回一个最小的替代品或退出
+            # 这里我们尝试返回一个固定的小字体
+            try:
+                return pg.font.Font(None, 12)
+            except: # 如果连这个也失败... 就没办法了
+                 print("!!! 无法加载任何字体，文本将无法显示 !!!")
+                 # 返回一个“空”字体对象，避免程序崩溃，但不会渲染任何东西
+                 class DummyFont:
+                     def render(self, *args, **kwargs):
+                         return pg.Surface((0,0)) # 返回一个空 Surface
+                     def get_linesize(self):
+                         return 10 # 返回一个合理的值避免其他地方崩溃
+                 return DummyFont()
+
+def prewarm_fonts(sizes=FONT_PREWARM_SIZES):
+    """
+    在后台线程中加载各个字号的字体 (打开窗口的同时进行，首帧绘制文本时不再等待磁盘和字体解析)。
+    需要在 pg.font.init() 之后调用。
+    :param sizes: 字号列表
+    :return: 已启动的线程 (调用方可以 join 等待其完成)
+    """
+    def work():
+        for size in sizes:
+            load_font(size)
+
+    thread = threading.Thread(target=work, name="font-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+# --- 渲染文本缓存 (优化：不变的文本不必每帧重新渲染) ---
+class TextCache:
     """
-    在屏幕上绘制文本 (使用 load_font 加载字体)。
+    已渲染文本 Surface 的 LRU 缓存，键为 (文本, 字号, 颜色, 抗锯齿)。
+    开始界面、HUD 等几乎不变的文本只在第一次绘制时调用 font.render，之后每帧只需一次 blit。
+    """
+
+    def __init__(self, capacity=TEXT_CACHE_SIZE):
+        """
+        :param capacity: 最多缓存的 Surface 数量 (0 表示不缓存)
+        """
+        self.capacity = capacity
+        self._entries = OrderedDict() # 键 -> Surface，最近使用的在末尾
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """清空缓存 (计数保留)。"""
+        self._entries.clear()
+
+    def render(self, text, size, color, antialias=True):
+        """
+        取得渲染好的文本 Surface (调用方只能 blit，不能修改它)。
+        :param text: 字符串
+        :param size: 字体大小
+        :param color: 文本颜色 (RGB 元组、pg.Color 或颜色名)
+        :param antialias: 是否抗锯齿
+        :return: Surface
+        """
+        key = (text, size, color if isinstance(color, str) else tuple(color), antialias)
+        entries = self._entries
+        text_surface = entries.get(key)
+        if text_surface is not None:
+            entries.move_to_end(key)
+            self.hits += 1
+            return text_surface
+        self.misses += 1
+        with font_lock:
+            text_surface = load_font(size).render(text, antialias, color)
+        if self.capacity > 0:
+            entries[key] = text_surface
+            if len(entries) > self.capacity:
+                entries.popitem(last=False)
+        return text_surface
+
+text_cache = TextCache()
+
+def draw_text(surface, text, size, color, x, y, align="center", antialias=True):
+    """
+    在屏幕上绘制文本 (使用 load_font 加载字体，渲染结果由 text_cache 缓存)。
     :param surface: 目标 Surface 对象 (通常是 screen)
     :param text: 要绘制的字符串
     :param size: 字体大小
@@ -68,13 +147,11 @@ def draw_text(surface, text, size, color, x, y, align="center"):
     :param x: 文本位置的 x 坐标
     :param y: 文本位置的 y 坐标
     :param align: 对齐方式 ("center", "topleft", "topright", 等)
+    :param antialias: 是否开启抗锯齿
+    :return: 文本在 surface 上覆盖的区域 (Rect)
     """
-    # !! 修改：调用 load_font 获取字体对象 !!
-    font = load_font(size)
-    # font = pg.font.Font(None, size) # 旧的使用默认字体的方法（注释掉）
-
-    # 使用 font 对象渲染文本
-    text_surface = font.render(text, True, color) # 第二个参数 True 表示开启抗锯齿
+    # !! 修改：从渲染缓存取得文本 Surface (未命中时用 load_font 的字体渲染) !!
+    text_surface = text_cache.render(text, size, color, antialias)
     text_rect = text_surface.get_rect()
 
     # 根据对齐方式设置文本位置
@@ -95,7 +172,36 @@ def draw_text(surface, text, size, color, x, y, align="center"):
     # 可以根据需要添加更多对齐方式
 
     # 在目标 Surface 上绘制文本
-    surface.blit(text_surface, text_rect)
+    return surface.blit(text_surface, text_rect)
 
 # 创建一个向量类型，方便进行数学运算 (如果需要更复杂移动)
-vec = pg.math.Vector2
\ No newline at end of file
+vec = pg.math.Vector2
+
+def lerp_xy(prev, cur, alpha):
+    """
+    在两个整数坐标之间线性插值 (固定时间步长下，绘制介于两个模拟 tick 之间的实体位置)。
+    :param prev: 上一个 tick 的坐标 (x, y)
+    :param cur: 当前 tick 的坐标 (x, y)
+    :param alpha: 插值系数，0 为 prev，1 为 cur
+    :return: 取整后的坐标 (x, y)
+    """
+    return (prev[0] + round((cur[0] - prev[0]) * alpha), prev[1] + round((cur[1] - prev[1]) * alpha))
+
+
+class KeyState:
+    """
+    脚本化的按键状态，接口与 pg.key.get_pressed() 的返回值相同 (keys[pg.K_x] -> bool)。
+    用于无界面模拟和回放，代替真实键盘。
+    """
+
+    __slots__ = ("pressed",)
+
+    def __init__(self, pressed=()):
+        """:param pressed: 处于按下状态的按键常量集合"""
+        self.pressed = frozenset(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+# 没有任何按键按下的状态
+NO_KEYS = KeyState()
\ No newline at end of file